@@ -0,0 +1,145 @@
+"""
+Micro-benchmark da etapa de regex da extração de acórdãos.
+
+Compara, sobre os PDFs de acordaos_pdf/, as buscas de seção anteriores
+(regex DOTALL independentes para ementa e acórdão, detecção de seção por
+chunk com o texto em maiúsculas) com o registro de padrões compilados e o
+scanner de seção em uma passada. Também confere que ambos produzem o mesmo
+resultado. Não chama o LLM.
+
+Uso:
+    python benchmark_extraction.py [--iterations N] [--pdf-dir DIR]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Adicionar server ao path
+sys.path.insert(0, str(Path(__file__).parent / 'server'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from server.modules.pdf_extractor import AcordaoExtractor
+from server.modules import extraction_patterns as patterns
+from server.modules.load_vectorstore import detect_section_from_content
+
+# Cores para output
+GREEN = '\033[92m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+BOLD = '\033[1m'
+RESET = '\033[0m'
+
+CHUNK_SIZE = 1000
+
+
+def print_header(text: str):
+    """Print header formatado."""
+    print(f"\n{BOLD}{BLUE}{'=' * 70}{RESET}")
+    print(f"{BOLD}{BLUE}{text.center(70)}{RESET}")
+    print(f"{BOLD}{BLUE}{'=' * 70}{RESET}\n")
+
+
+def legacy_sections(text: str) -> tuple:
+    """Buscas de seção como eram feitas em extract_ementa / extract_acordao_llm."""
+    ementa = re.search(
+        r'E\s*M\s*E\s*N\s*T\s*A\s*(.+?)A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O',
+        text,
+        re.DOTALL | re.IGNORECASE
+    )
+    acordao = re.search(
+        r'A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O\s*(.+?)(?:Nabil|Sala\s+das\s+Sess)',
+        text,
+        re.DOTALL | re.IGNORECASE
+    )
+    return (
+        ementa.group(1).strip() if ementa else None,
+        acordao.group(1).strip() if acordao else None,
+    )
+
+
+def scanned_sections(text: str) -> tuple:
+    """Mesmas seções via scanner de uma passada."""
+    sections = patterns.scan_sections(text)
+    return sections.ementa_text(text), sections.acordao_text(text)
+
+
+def legacy_detect_section(content: str) -> str:
+    """detect_section_from_content como era antes do registro de padrões."""
+    content_upper = content.upper()
+    if re.search(r'E\s*M\s*E\s*N\s*T\s*A', content_upper):
+        return 'ementa'
+    if re.search(r'A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O', content_upper):
+        return 'acordao'
+    if 'VOTO' in content_upper or 'FUNDAMENTAÇÃO' in content_upper:
+        return 'voto'
+    if 'RELATÓRIO' in content_upper or 'RELATOR' in content_upper:
+        return 'relatorio'
+    return 'outros'
+
+
+def timed(func, args_list, iterations: int) -> float:
+    """Tempo médio (ms) de uma passada de func sobre todos os argumentos."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for args in args_list:
+            func(*args)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da extração via regex.")
+    parser.add_argument('--iterations', type=int, default=200, help="Repetições de cada medição (padrão: 200).")
+    parser.add_argument('--pdf-dir', type=Path, default=Path("acordaos_pdf"), help="Diretório com os PDFs.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print_header("BENCHMARK DA EXTRAÇÃO VIA REGEX")
+
+    pdfs = sorted(args.pdf_dir.glob("*.pdf"))
+    if not pdfs:
+        print(f"{RED}Nenhum PDF encontrado em: {args.pdf_dir}{RESET}")
+        return
+
+    texts = []
+    for pdf_path in pdfs:
+        cleaned_text, _ = AcordaoExtractor.clean_pages(AcordaoExtractor.extract_pages(pdf_path, workers=1))
+        texts.append((pdf_path, cleaned_text))
+    chunks = [
+        (text[i:i + CHUNK_SIZE],)
+        for _, text in texts
+        for i in range(0, len(text), CHUNK_SIZE)
+    ]
+    print(f"{len(texts)} PDF(s), {sum(len(t) for _, t in texts)} caracteres, {len(chunks)} chunks de {CHUNK_SIZE}\n")
+
+    # Mesmo resultado nos dois caminhos
+    divergentes = [p.name for p, t in texts if legacy_sections(t) != scanned_sections(t)]
+    divergentes += [
+        f"chunk {i}" for i, (c,) in enumerate(chunks)
+        if legacy_detect_section(c) != detect_section_from_content(c)
+    ]
+    if divergentes:
+        print(f"{RED}✗ Resultados divergentes: {divergentes}{RESET}")
+    else:
+        print(f"{GREEN}✓ Seções idênticas nos dois caminhos{RESET}")
+
+    text_args = [(t,) for _, t in texts]
+    medidas = [
+        ("Seções (ementa + acórdão)", legacy_sections, scanned_sections, text_args),
+        ("Seção por chunk", legacy_detect_section, detect_section_from_content, chunks),
+    ]
+
+    print(f"\n{BOLD}{'Etapa':<28}{'Antes (ms)':>12}{'Depois (ms)':>13}{'Ganho':>9}{RESET}")
+    for nome, antes, depois, args_list in medidas:
+        depois_ms = timed(depois, args_list, args.iterations)
+        antes_ms = timed(antes, args_list, args.iterations)
+        ganho = antes_ms / depois_ms if depois_ms > 0 else float('inf')
+        print(f"{nome:<28}{antes_ms:>12.3f}{depois_ms:>13.3f}{ganho:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Benchmark de ponta a ponta da API sem rede: ingestão (/upload_pdfs/) e
+perguntas (/ask/ e /ask/stream), com o LLM fake determinístico e, por padrão,
+embeddings fake.
+
+Sobe a API real (uvicorn) em uma thread, em um diretório de trabalho
+temporário (chroma_store, caches e uploads isolados do ambiente de
+desenvolvimento), envia os PDFs de acordaos_pdf/ e dispara as perguntas com
+concorrência configurável. Mede vazão e latências p50/p95/p99 e, no
+streaming, o tempo até o primeiro token.
+
+Uso:
+    python benchmark_offline.py [--requests 50] [--concurrency 4] [--stream-requests 20]
+                                [--latency-ms 300] [--tokens-per-second 200]
+                                [--extraction] [--force-llm] [--real-embeddings]
+                                [--provider fake|openai] [--report arquivo.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Cores para output
+GREEN = '\033[92m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+BOLD = '\033[1m'
+RESET = '\033[0m'
+
+# Perguntas genéricas (sem número de acórdão: não caem no índice estruturado)
+QUESTIONS = [
+    "Qual o entendimento do conselho sobre isenção de ICMS?",
+    "Quando incide ICMS na substituição tributária?",
+    "Como foram julgados os recursos sobre benefício fiscal?",
+    "O que foi decidido sobre descumprimento de obrigação acessória?",
+    "Quais recursos voluntários tiveram provimento negado?",
+]
+
+
+def print_header(text: str):
+    """Print header formatado."""
+    print(f"\n{BOLD}{BLUE}{'=' * 70}{RESET}")
+    print(f"{BOLD}{BLUE}{text.center(70)}{RESET}")
+    print(f"{BOLD}{BLUE}{'=' * 70}{RESET}\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark offline da API (LLM fake).")
+    parser.add_argument('--requests', type=int, default=50, help="Perguntas enviadas ao /ask/ (padrão: 50).")
+    parser.add_argument('--stream-requests', type=int, default=20, help="Perguntas enviadas ao /ask/stream (padrão: 20).")
+    parser.add_argument('--concurrency', type=int, default=4, help="Perguntas simultâneas (padrão: 4).")
+    parser.add_argument('--pdf-dir', type=Path, default=REPO_DIR / "acordaos_pdf", help="PDFs a ingerir.")
+    parser.add_argument('--workdir', type=Path, default=None, help="Diretório de trabalho (padrão: temporário).")
+    parser.add_argument('--provider', choices=('fake', 'openai'), default='fake',
+                        help="Provedor do LLM (openai = endpoint local em LLM_BASE_URL).")
+    parser.add_argument('--latency-ms', type=float, default=300, help="LLM fake: latência até o primeiro token.")
+    parser.add_argument('--tokens-per-second', type=float, default=200, help="LLM fake: tokens/s (0 = instantâneo).")
+    parser.add_argument('--output-tokens', type=int, default=150, help="LLM fake: tokens por resposta.")
+    parser.add_argument('--real-embeddings', action='store_true', help="Usa o modelo de embeddings real (precisa estar em cache).")
+    parser.add_argument('--extraction', action='store_true', help="Mede também a extração estruturada dos PDFs.")
+    parser.add_argument('--force-llm', action='store_true', help="Na extração, ignora o classificador por regras e usa o LLM.")
+    parser.add_argument('--prompt-variant', choices=('full', 'compact'), default=None,
+                        help="Variante do prompt enviada nas perguntas (padrão: a do servidor).")
+    parser.add_argument('--report', type=Path, default=None, help="Grava os resultados em JSON.")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Variáveis lidas na importação dos módulos: precisam ser definidas antes."""
+    os.environ['LLM_PROVIDER'] = args.provider
+    os.environ['FAKE_LLM_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['FAKE_LLM_TOKENS_PER_SECOND'] = str(args.tokens_per_second)
+    os.environ['FAKE_LLM_OUTPUT_TOKENS'] = str(args.output_tokens)
+    if not args.real_embeddings:
+        os.environ['EMBEDDING_PROVIDER'] = 'fake'
+    # Perguntas que só diferem no sufixo seriam "equivalentes" para o cache semântico
+    os.environ['ANSWER_CACHE_SIMILARITY'] = '0'
+    if args.provider == 'fake':
+        # Sem cota a respeitar: o limitador só distorceria a medida
+        os.environ.setdefault('GROQ_RPM', '0')
+        os.environ.setdefault('GROQ_TPM', '0')
+    if args.force_llm:
+        os.environ['DECISAO_CONFIDENCE_THRESHOLD'] = '1.1'
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list, errors: int, elapsed: float, ttft: list = None) -> dict:
+    summary = {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+    line = (f"{name:<14}{summary['requests']:>6} req  {summary['throughput_rps']:>7.2f} req/s  "
+            f"p50 {summary['p50_ms']:>8.1f} ms  p95 {summary['p95_ms']:>8.1f} ms  p99 {summary['p99_ms']:>8.1f} ms")
+    if ttft is not None:
+        summary['ttft_p50_ms'] = round(percentile(ttft, 50) * 1000, 1)
+        summary['ttft_p95_ms'] = round(percentile(ttft, 95) * 1000, 1)
+        line += f"  TTFT p50 {summary['ttft_p50_ms']:.1f} ms"
+    print(line + (f"  {RED}{errors} erro(s){RESET}" if errors else ""))
+    return summary
+
+
+def start_api() -> tuple:
+    """Sobe a API (server/main.py) em uma porta livre, em uma thread."""
+    import uvicorn
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def bench_ingestion(client, pdfs: list) -> dict:
+    """Envia todos os PDFs em um upload e aguarda o fim do job de ingestão."""
+    start = time.perf_counter()
+    files = [('files', (p.name, p.read_bytes(), 'application/pdf')) for p in pdfs]
+    response = await client.post('/upload_pdfs/', files=files)
+    response.raise_for_status()
+    status_url = response.json()['status_url']
+
+    while True:
+        job = (await client.get(status_url)).json()
+        if job['status'] in ('completed', 'failed'):
+            break
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'pdfs': len(pdfs),
+        'status': job['status'],
+        'seconds': round(elapsed, 2),
+        'pdfs_per_second': round(len(pdfs) / elapsed, 2),
+        'stats': job.get('stats'),
+    }
+    color = GREEN if job['status'] == 'completed' else RED
+    print(f"{'Ingestão':<14}{len(pdfs):>6} PDFs {summary['pdfs_per_second']:>7.2f} PDF/s  "
+          f"{elapsed:.2f}s  {color}{job['status']}{RESET}")
+    return summary
+
+
+async def bench_ask(
+    client, n: int, concurrency: int, stream: bool, prompt_variant: str = None, offset: int = 0
+) -> dict:
+    """
+    Dispara n perguntas distintas (sem acerto de cache) com a concorrência dada.
+    `offset` separa os índices entre fases, para uma fase não repetir as
+    perguntas já respondidas (e guardadas no cache) pela anterior.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(i: int):
+        # Sufixo com 5 dígitos: não é lido como ano pelo query_parser
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} [{i:05d}]"
+        data = {'question': question}
+        if prompt_variant:
+            data['prompt_variant'] = prompt_variant
+        async with semaphore:
+            start = time.perf_counter()
+            first_token = None
+            if stream:
+                async with client.stream('POST', '/ask/stream', data=data) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event['type'] == 'error':
+                            raise RuntimeError(event['detail'])
+                        if event['type'] == 'token' and first_token is None:
+                            first_token = time.perf_counter() - start
+            else:
+                response = await client.post('/ask/', data=data)
+                response.raise_for_status()
+            return time.perf_counter() - start, first_token
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(offset, offset + n)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if not isinstance(r, BaseException)]
+    errors = len(results) - len(ok)
+    for r in results:
+        if isinstance(r, BaseException):
+            print(f"{RED}  erro: {r}{RESET}")
+            break
+    return summarize(
+        '/ask/stream' if stream else '/ask/',
+        [latency for latency, _ in ok],
+        errors,
+        elapsed,
+        [t for _, t in ok if t is not None] if stream else None
+    )
+
+
+def bench_extraction(pdfs: list) -> dict:
+    """Extração estruturada (regex + classificador + LLM via despachante) de cada PDF."""
+    from server.modules.pdf_extractor import AcordaoExtractor
+    from server.modules.llm_dispatcher import llm_dispatcher
+
+    extractor = AcordaoExtractor()
+    start = time.perf_counter()
+    results = [extractor.extract_acordao(p) for p in pdfs]
+    elapsed = time.perf_counter() - start
+    llm_calls = sum(1 for r in results if r.llm_used)
+    summary = {
+        'pdfs': len(pdfs),
+        'sucessos': sum(1 for r in results if r.success),
+        'llm_usado': llm_calls,
+        'seconds': round(elapsed, 2),
+        'pdfs_per_second': round(len(pdfs) / elapsed, 2),
+        'dispatcher': llm_dispatcher.stats(),
+    }
+    print(f"{'Extração':<14}{len(pdfs):>6} PDFs {summary['pdfs_per_second']:>7.2f} PDF/s  "
+          f"{elapsed:.2f}s  sucessos {summary['sucessos']}, LLM em {llm_calls}")
+    return summary
+
+
+async def run(args, base_url: str, pdfs: list) -> dict:
+    import httpx
+
+    report = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        report['ingestion'] = await bench_ingestion(client, pdfs)
+        if report['ingestion']['status'] != 'completed':
+            return report
+        # Aquecimento: primeira pergunta paga a abertura de índices
+        await client.post('/ask/', data={'question': QUESTIONS[0]})
+        if args.requests:
+            report['ask'] = await bench_ask(client, args.requests, args.concurrency, False, args.prompt_variant)
+        if args.stream_requests:
+            report['ask_stream'] = await bench_ask(
+                client, args.stream_requests, args.concurrency, True, args.prompt_variant, offset=args.requests
+            )
+        report['metrics'] = (await client.get('/metrics')).json()
+    for variant, usage in report['metrics']['prompt']['variants'].items():
+        if usage['requests']:
+            print(f"Prompt {variant:<8} sistema {usage['system_tokens']} tokens, "
+                  f"média {usage['avg_prompt_tokens']} tokens/pergunta ({usage['requests']} chamadas)")
+    return report
+
+
+def main():
+    args = parse_args()
+    pdfs = sorted(args.pdf_dir.resolve().glob("*.pdf"))
+    if not pdfs:
+        print(f"{RED}Nenhum PDF encontrado em: {args.pdf_dir}{RESET}")
+        return
+
+    configure_environment(args)
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="ragbot-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    report_path = args.report.resolve() if args.report else None
+    # Caminhos relativos (chroma_store, caches, uploads) passam a apontar para o workdir
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_DIR / 'server'))
+    sys.path.insert(0, str(REPO_DIR))
+
+    print_header("BENCHMARK OFFLINE DA API")
+    print(f"Provedor LLM: {args.provider} (latência {args.latency_ms:g} ms, "
+          f"{args.tokens_per_second:g} tokens/s, {args.output_tokens} tokens)")
+    print(f"Embeddings: {'modelo real' if args.real_embeddings else 'fake'}; diretório de trabalho: {workdir}\n")
+
+    server, base_url = start_api()
+    try:
+        report = asyncio.run(run(args, base_url, pdfs))
+        if args.extraction:
+            report['extraction'] = bench_extraction(pdfs)
+    finally:
+        server.should_exit = True
+
+    report['config'] = {
+        'provider': args.provider,
+        'latency_ms': args.latency_ms,
+        'tokens_per_second': args.tokens_per_second,
+        'output_tokens': args.output_tokens,
+        'concurrency': args.concurrency,
+        'real_embeddings': args.real_embeddings,
+        'prompt_variant': args.prompt_variant,
+    }
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n{GREEN}✓ Relatório salvo em: {report_path}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
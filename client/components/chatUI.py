@@ -1,7 +1,9 @@
 # Em components/chat.py
 
+import json
+
 import streamlit as st
-from utils.api import ask_question
+from utils.api import ask_question_stream
 
 def render_chat():
     """
@@ -28,24 +30,38 @@ def render_chat():
         st.chat_message("user").markdown(user_input)
         st.session_state.messages.append({"role": "user", "content": user_input})
 
-        # Adiciona o indicador de carregamento enquanto espera a resposta
-        with st.spinner("O assistente está pensando..."):
-            response = ask_question(user_input)
-            
-            if response.status_code == 200:
-                data = response.json()
-                answer = data["response"]
-                sources = data.get("sources", [])
-
-                # Exibe a resposta do assistente
-                st.chat_message("assistant").markdown(answer)
-                
-                # Exibe as fontes, se houver
-                if sources:
-                    sources_text = "📄 **Fontes:**\n" + "\n".join([f"- `{src}`" for src in sources])
-                    st.markdown(sources_text)
-                
-                # Salva a resposta do assistente no histórico (sem as fontes)
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-            else:
-                st.error(f"Erro ao contatar a API: {response.text}")
\ No newline at end of file
+        # Envia a pergunta e renderiza a resposta à medida que os tokens chegam
+        response = ask_question_stream(user_input)
+
+        if response.status_code == 200:
+            sources = []
+            errors = []
+
+            def stream_tokens():
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "sources":
+                        sources.extend(event["sources"])
+                    elif event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "error":
+                        errors.append(event["detail"])
+
+            # Exibe a resposta do assistente incrementalmente
+            with st.chat_message("assistant"):
+                answer = st.write_stream(stream_tokens())
+
+            if errors:
+                st.error(f"Erro ao contatar a API: {errors[0]}")
+
+            # Exibe as fontes, se houver
+            if sources:
+                sources_text = "📄 **Fontes:**\n" + "\n".join([f"- `{src}`" for src in sources])
+                st.markdown(sources_text)
+
+            # Salva a resposta do assistente no histórico (sem as fontes)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+        else:
+            st.error(f"Erro ao contatar a API: {response.text}")
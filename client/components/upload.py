@@ -1,5 +1,39 @@
+import time
+
 import streamlit as st
-from utils.api import upload_pdfs_api
+from utils.api import upload_pdfs_api, get_job_status
+
+# Intervalo entre consultas ao status do job de ingestão (segundos)
+JOB_POLL_INTERVAL = 1.0
+
+
+def wait_for_ingestion_job(job_id):
+    """
+    Acompanha o job de ingestão no servidor, exibindo o progresso por arquivo.
+    """
+    progress_bar = st.sidebar.progress(0.0, text="Indexando documentos...")
+    while True:
+        response = get_job_status(job_id)
+        if response.status_code != 200:
+            st.sidebar.error(f"Error: {response.text}")
+            return
+
+        job = response.json()
+        done, total = job["progress"]["done"], job["progress"]["total"]
+        progress_bar.progress(done / total if total else 1.0, text=f"Indexando documentos... {done}/{total}")
+
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(JOB_POLL_INTERVAL)
+
+    for file in job["files"]:
+        if file["status"] == "failed":
+            st.sidebar.warning(f"{file['filename']}: {file['error']}")
+
+    if job["status"] == "completed":
+        st.sidebar.success("Uploaded successfully")
+    else:
+        st.sidebar.error(f"Error: {job.get('error') or 'falha na indexação'}")
 
 
 def render_uploader():
@@ -7,7 +41,7 @@ def render_uploader():
     uploaded_files=st.sidebar.file_uploader("Upload  multiple PDFs", type="pdf", accept_multiple_files=True)
     if st.sidebar.button("Upload to DB") and uploaded_files:
         response=upload_pdfs_api(uploaded_files)
-        if response.status_code==200:
-            st.sidebar.success("Uploaded successfully")
+        if response.status_code in (200, 202):
+            wait_for_ingestion_job(response.json()["job_id"])
         else:
-            st.sidebar.error(f"Error: {response.text}")
\ No newline at end of file
+            st.sidebar.error(f"Error: {response.text}")
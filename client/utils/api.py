@@ -1,9 +1,45 @@
+import uuid
+
 import requests
 from config import API_URL
 
+# Tamanho do bloco enviado por vez no upload em streaming
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _multipart_stream(files, boundary):
+    """
+    Gera o corpo multipart/form-data em blocos, sem carregar os PDFs inteiros
+    em memória de uma só vez.
+    """
+    for f in files:
+        f.seek(0)
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="files"; filename="{f.name}"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode("utf-8")
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("utf-8")
+
+
 def upload_pdfs_api(files):
-    files_payload=[("files", (f.name, f.read(), "application/pdf")) for f in files]
-    return requests.post(f"{API_URL}/upload_pdfs/", files=files_payload)
+    boundary = uuid.uuid4().hex
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    # Um gerador como corpo faz o requests enviar com Transfer-Encoding: chunked
+    return requests.post(f"{API_URL}/upload_pdfs/", data=_multipart_stream(files, boundary), headers=headers)
+
+def get_job_status(job_id):
+    return requests.get(f"{API_URL}/jobs/{job_id}")
 
 def ask_question(question):
-    return requests.post(f"{API_URL}/ask/", data={"question":question})
\ No newline at end of file
+    return requests.post(f"{API_URL}/ask/", data={"question":question})
+
+def ask_question_stream(question):
+    """
+    Faz a pergunta ao endpoint de streaming e retorna a resposta HTTP aberta;
+    o corpo é NDJSON (um evento JSON por linha) e deve ser lido com iter_lines().
+    """
+    return requests.post(f"{API_URL}/ask/stream", data={"question":question}, stream=True)
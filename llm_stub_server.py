@@ -0,0 +1,197 @@
+"""
+Servidor stub compatível com a API de chat do Groq/OpenAI, para testar o
+despachante LLM sem rede nem gasto de cota.
+
+Responde em /openai/v1/chat/completions (caminho do SDK Groq) e
+/v1/chat/completions (OpenAI) com um JSON fixo de decisão, simulando latência,
+limite de requisições por minuto (429 com Retry-After) e falhas 503 aleatórias.
+
+Uso:
+    # Servidor em primeiro plano
+    python llm_stub_server.py --port 8765 --rpm 60 --latency-ms 300
+    GROQ_BASE_URL=http://127.0.0.1:8765 python reindex_with_structured_chunking.py
+
+    LLM_PROVIDER=openai LLM_BASE_URL=http://127.0.0.1:8765/v1 python test_extraction.py
+
+    # Carga: sobe o stub em segundo plano e dispara N chamadas pelo despachante
+    python llm_stub_server.py --check 100 --rpm 120 --fail-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+STUB_CONTENT = json.dumps({
+    "decisao": "improvido",
+    "votacao": "unanimidade",
+    "participantes": ["Nabil Ibrahim Chamchoum", "Breno Geovane Azevedo Caetano"]
+}, ensure_ascii=False)
+
+CHAT_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions')
+
+
+class StubState:
+    """Configuração e contadores compartilhados entre as threads do servidor."""
+
+    def __init__(self, latency_ms: float, rpm: int, fail_rate: float):
+        self.latency_ms = latency_ms
+        self.rpm = rpm
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.counts = {'ok': 0, 'rate_limited': 0, 'failed': 0}
+
+    def admit(self) -> float:
+        """0 se a requisição cabe na janela de 60 s; senão os segundos até liberar."""
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] >= 60:
+                self.window.popleft()
+            if self.rpm and len(self.window) >= self.rpm:
+                self.counts['rate_limited'] += 1
+                return 60 - (now - self.window[0])
+            self.window.append(now)
+            return 0.0
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+
+def make_handler(state: StubState):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if self.path not in CHAT_PATHS:
+                self._send(404, {'error': {'message': f'Caminho desconhecido: {self.path}'}})
+                return
+
+            retry_after = state.admit()
+            if retry_after:
+                self._send(
+                    429,
+                    {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_exceeded'}},
+                    {'Retry-After': f"{retry_after:.2f}"}
+                )
+                return
+            if random.random() < state.fail_rate:
+                state.count('failed')
+                self._send(503, {'error': {'message': 'Service unavailable'}})
+                return
+
+            time.sleep(state.latency_ms / 1000)
+            prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4 + 1
+            completion_tokens = len(STUB_CONTENT) // 4 + 1
+            state.count('ok')
+            self._send(200, {
+                'id': f"stub-{time.time_ns()}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': STUB_CONTENT},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens,
+                },
+            })
+
+    return StubHandler
+
+
+def start_server(port: int, state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_check(args, state: StubState):
+    """Dispara `args.check` chamadas simultâneas pelo despachante contra o stub."""
+    server = start_server(0, state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    sys.path.insert(0, str(Path(__file__).parent))
+    from server.modules.llm_dispatcher import LLMDispatcher
+
+    # O SDK Groq acrescenta /openai/v1 à URL base; o da OpenAI espera a URL com /v1
+    dispatcher = LLMDispatcher(
+        provider=args.provider,
+        base_url=base_url if args.provider == 'groq' else f"{base_url}/v1",
+        rpm=args.client_rpm,
+        tpm=args.client_tpm,
+        max_in_flight=args.max_in_flight,
+    )
+    messages = [{"role": "user", "content": "Classifique a decisão do acórdão. " * 40}]
+
+    start = time.perf_counter()
+    futures = [dispatcher.submit(messages, model='stub') for _ in range(args.check)]
+    erros = 0
+    for future in futures:
+        try:
+            future.result()
+        except Exception:
+            erros += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.check} chamadas em {elapsed:.1f}s ({args.check / elapsed:.1f} req/s), {erros} erro(s)")
+    print(f"Stub: {state.counts}")
+    print(f"Despachante: {dispatcher.stats()}")
+    server.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor stub da API de chat (Groq/OpenAI).")
+    parser.add_argument('--port', type=int, default=8765, help="Porta do servidor (padrão: 8765; o --check usa uma porta livre).")
+    parser.add_argument('--latency-ms', type=float, default=300, help="Latência simulada por resposta.")
+    parser.add_argument('--rpm', type=int, default=0, help="Requisições por minuto antes de 429 (0 = sem limite).")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fração de respostas 503 (0 a 1).")
+    parser.add_argument('--check', type=int, default=0, help="Dispara N chamadas pelo despachante e sai.")
+    parser.add_argument('--client-rpm', type=float, default=0, help="Limite de req/min do despachante no --check.")
+    parser.add_argument('--client-tpm', type=float, default=0, help="Limite de tokens/min do despachante no --check.")
+    parser.add_argument('--provider', choices=('groq', 'openai'), default='groq',
+                        help="Cliente usado pelo despachante no --check (padrão: groq).")
+    parser.add_argument('--max-in-flight', type=int, default=8, help="Chamadas simultâneas do despachante no --check.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    state = StubState(args.latency_ms, args.rpm, args.fail_rate)
+    if args.check:
+        run_check(args, state)
+        return
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(state))
+    print(f"Stub LLM em http://127.0.0.1:{server.server_address[1]} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nContadores: {state.counts}")
+
+
+if __name__ == "__main__":
+    main()
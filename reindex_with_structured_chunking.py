@@ -2,17 +2,26 @@
 Script para reindexar PDFs usando chunking estrutural e metadados enriquecidos.
 
 Este script:
-1. Extrai estrutura de PDFs para JSON (se ainda não existir)
+1. Extrai estrutura de PDFs para JSON (reaproveitando o cache de extração
+   quando o PDF, pelo hash, e a versão do extrator não mudaram)
 2. Cria chunks estruturados baseados nas seções (ementa, acórdão)
 3. Adiciona metadados ricos ao vectorstore
 4. Permite reconstruir o vectorstore do zero com as melhorias
 
+O processamento é em pipeline: leitura dos PDFs em um pool de processos,
+extração em um pool de threads (as chamadas ao LLM passam pelo despachante,
+que respeita os limites de requisições/tokens da conta Groq) e uma única
+etapa de embedding + escrita no Chroma ao final.
+
 Uso:
-    python reindex_with_structured_chunking.py
+    python reindex_with_structured_chunking.py [--rebuild] [--workers N] [--llm-workers N]
 """
 
+import argparse
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 import json
 import shutil
@@ -20,9 +29,14 @@ import shutil
 # Adicionar server ao path
 sys.path.insert(0, str(Path(__file__).parent / 'server'))
 
-from server.modules.pdf_extractor import extract_pdf_to_json
-from server.modules.load_vectorstore import add_documents_with_structured_chunking, PERSIST_DIR, EXTRACTED_JSON_DIR
+from server.modules.pdf_extractor import AcordaoExtractor
+from server.modules.llm_dispatcher import GROQ_MAX_IN_FLIGHT, llm_dispatcher
+from server.modules.load_vectorstore import add_structured_documents, PERSIST_DIR, EXTRACTED_JSON_DIR
 from server.logger import setup_logger
+from modules.vectorstore_registry import reset_vectorstore
+from modules.bm25_index import bm25_index
+from modules.document_registry import sha256_file
+from modules.pdf_handlers import original_filename
 
 log = setup_logger(__name__)
 
@@ -42,101 +56,174 @@ def print_header(text: str):
     print(f"{BOLD}{BLUE}{'=' * 70}{RESET}\n")
 
 
+def parse_args():
+    """Argumentos de linha de comando (execução não interativa)."""
+    parser = argparse.ArgumentParser(description="Reindexação com chunking estrutural.")
+    parser.add_argument(
+        '--rebuild', action='store_true',
+        help="Apaga o vectorstore existente e recria do zero (padrão: adiciona ao existente)."
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 1,
+        help="Processos para leitura dos PDFs (padrão: número de CPUs)."
+    )
+    parser.add_argument(
+        '--llm-workers', type=int, default=GROQ_MAX_IN_FLIGHT,
+        help=f"Extrações simultâneas (padrão: GROQ_MAX_IN_FLIGHT = {GROQ_MAX_IN_FLIGHT}); "
+             "o despachante limita a taxa real de chamadas ao LLM."
+    )
+    parser.add_argument(
+        '--pdf-dir', type=Path, default=Path("uploaded_pdfs"),
+        help="Diretório com os PDFs (padrão: uploaded_pdfs/)."
+    )
+    return parser.parse_args()
+
+
+def parse_pdf(pdf_path: Path, sha256: str) -> tuple:
+    """
+    Etapa 1 (pool de processos): texto limpo do PDF (do cache de extração, se já lido).
+    As páginas são lidas em série: o paralelismo aqui já é entre PDFs.
+
+    Returns:
+        Tupla (pdf_path, sha256, texto limpo ou None, offsets das páginas ou None, erro ou None)
+    """
+    try:
+        cleaned_text, page_offsets = AcordaoExtractor.load_text(pdf_path, sha256, workers=1)
+        return pdf_path, sha256, cleaned_text, page_offsets, None
+    except Exception as e:
+        return pdf_path, sha256, None, None, str(e)
+
+
+def save_json(filename: str, json_data: dict) -> Path:
+    """Grava a estrutura extraída em extracted_json/ (lida pelo índice de acórdãos da API)."""
+    json_path = Path(EXTRACTED_JSON_DIR) / f"{Path(filename).stem}.json"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(json_data, f, indent=2, ensure_ascii=False, default=str)
+    return json_path
+
+
 def main():
     """Reindexação completa com chunking estrutural."""
+    args = parse_args()
     print_header("REINDEXAÇÃO COM CHUNKING ESTRUTURAL + METADADOS ENRIQUECIDOS")
 
     # 1. Localizar PDFs
-    pdf_dir = Path("uploaded_pdfs")
+    pdf_dir = args.pdf_dir
     if not pdf_dir.exists():
-        print(f"{RED}Erro: Diretório 'uploaded_pdfs/' não encontrado.{RESET}")
+        print(f"{RED}Erro: Diretório '{pdf_dir}/' não encontrado.{RESET}")
         print(f"{YELLOW}Faça upload de PDFs via interface antes de reindexar.{RESET}")
         return
 
     pdfs = list(pdf_dir.glob("*.pdf"))
     if not pdfs:
-        print(f"{RED}Erro: Nenhum PDF encontrado em 'uploaded_pdfs/'.{RESET}")
+        print(f"{RED}Erro: Nenhum PDF encontrado em '{pdf_dir}/'.{RESET}")
         return
 
-    print(f"Encontrados {GREEN}{len(pdfs)}{RESET} PDFs para processar\n")
+    print(f"Encontrados {GREEN}{len(pdfs)}{RESET} PDFs para processar "
+          f"({args.workers} processo(s) de leitura, {args.llm_workers} chamada(s) LLM simultâneas)\n")
 
-    # 2. Perguntar se deseja limpar vectorstore existente
+    # 2. Limpar vectorstore existente, se solicitado
     if os.path.exists(PERSIST_DIR):
-        print(f"{YELLOW}⚠ Vectorstore existente detectado em '{PERSIST_DIR}'{RESET}")
-        resposta = input("Deseja DELETAR e recriar do zero? (s/N): ").strip().lower()
-
-        if resposta == 's':
-            print(f"{YELLOW}Deletando vectorstore antigo...{RESET}")
+        if args.rebuild:
+            print(f"{YELLOW}Deletando vectorstore antigo em '{PERSIST_DIR}'...{RESET}")
             shutil.rmtree(PERSIST_DIR)
+            reset_vectorstore()
+            bm25_index.reset()
             print(f"{GREEN}✓ Vectorstore deletado{RESET}")
         else:
-            print(f"{BLUE}→ Adicionando documentos ao vectorstore existente{RESET}")
+            print(f"{BLUE}→ Adicionando documentos ao vectorstore existente (use --rebuild para recriar){RESET}")
 
     # 3. Criar diretório para JSONs extraídos
     Path(EXTRACTED_JSON_DIR).mkdir(exist_ok=True)
 
-    # 4. Processar cada PDF
-    sucessos = 0
-    falhas = 0
-
-    for i, pdf_path in enumerate(pdfs, 1):
-        print(f"\n{BOLD}[{i}/{len(pdfs)}] Processando: {pdf_path.name}{RESET}")
-
-        # Verificar se JSON já existe
-        json_path = Path(EXTRACTED_JSON_DIR) / f"{pdf_path.stem}.json"
-
-        if json_path.exists():
-            print(f"  {BLUE}→ JSON já existe, carregando...{RESET}")
-            with open(json_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-            extraction_success = True
+    start = time.perf_counter()
+    to_index = []  # (pdf_path, json_data, sha256)
+    falhas = []
+
+    # 4. PDFs inalterados (mesmo hash) já extraídos com esta versão dispensam leitura e LLM
+    pendentes = []
+    # Uploads da API ficam como <sha256>.pdf; o nome original vem do .meta.json
+    names = {pdf_path: original_filename(pdf_path) for pdf_path in pdfs}
+    for pdf_path in pdfs:
+        sha256 = sha256_file(pdf_path)
+        cached = AcordaoExtractor.cached_result(sha256, names[pdf_path])
+        if cached is not None:
+            json_data = cached.documento.model_dump(mode='json')
+            save_json(names[pdf_path], json_data)
+            to_index.append((pdf_path, json_data, sha256))
+            print(f"  {BLUE}→ {names[pdf_path]}: extração em cache, reaproveitada{RESET}")
         else:
-            # Extrair estrutura do PDF
-            print(f"  {BLUE}→ Extraindo estrutura do PDF...{RESET}")
-            result = extract_pdf_to_json(pdf_path)
+            pendentes.append((pdf_path, sha256))
+
+    # 5. Pipeline: leitura (processos) → extração LLM (threads), sobrepostas
+    if pendentes:
+        extractor = AcordaoExtractor()
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as parse_pool, \
+                ThreadPoolExecutor(max_workers=max(1, args.llm_workers)) as llm_pool:
+            parse_futures = [parse_pool.submit(parse_pdf, p, sha) for p, sha in pendentes]
+            llm_futures = {}
+
+            for future in as_completed(parse_futures):
+                pdf_path, sha256, cleaned_text, page_offsets, error = future.result()
+                if error:
+                    print(f"  {RED}✗ {names[pdf_path]}: falha na leitura: {error}{RESET}")
+                    falhas.append(pdf_path)
+                    continue
+                llm_future = llm_pool.submit(
+                    extractor.extract_from_text, cleaned_text, names[pdf_path], page_offsets, sha256
+                )
+                llm_futures[llm_future] = (pdf_path, sha256)
+
+            for future in as_completed(llm_futures):
+                pdf_path, sha256 = llm_futures[future]
+                result = future.result()
+                if not result.success:
+                    print(f"  {RED}✗ {names[pdf_path]}: falha na extração: {', '.join(result.errors)}{RESET}")
+                    falhas.append(pdf_path)
+                    continue
 
-            if result.success:
                 json_data = result.documento.model_dump(mode='json')
-                # Salvar JSON
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=2, ensure_ascii=False, default=str)
-                print(f"  {GREEN}✓ Estrutura extraída e salva em {json_path.name}{RESET}")
-                extraction_success = True
+                json_path = save_json(names[pdf_path], json_data)
+                print(f"  {GREEN}✓ {names[pdf_path]}: estrutura extraída e salva em {json_path.name}{RESET}")
+                to_index.append((pdf_path, json_data, sha256))
+
+    # 6. Etapa única de embedding + escrita no Chroma
+    sucessos = 0
+    stats = {}
+    if to_index:
+        print(f"\n{BLUE}→ Criando chunks estruturados e indexando {len(to_index)} PDF(s)...{RESET}")
+        try:
+            vectorstore, stats = add_structured_documents(to_index)
+            if vectorstore:
+                sucessos = len(to_index)
+                print(f"  {GREEN}✓ Indexado com sucesso{RESET}")
             else:
-                print(f"  {RED}✗ Falha na extração: {', '.join(result.errors)}{RESET}")
-                extraction_success = False
-                json_data = None
-
-        # Indexar com chunking estrutural
-        if extraction_success:
-            print(f"  {BLUE}→ Criando chunks estruturados e indexando...{RESET}")
-            try:
-                vectorstore = add_documents_with_structured_chunking(
-                    pdf_path=pdf_path,
-                    json_data=json_data
-                )
+                falhas.extend(p for p, _, _ in to_index)
+        except Exception as e:
+            print(f"  {RED}✗ Erro na indexação: {e}{RESET}")
+            falhas.extend(p for p, _, _ in to_index)
 
-                if vectorstore:
-                    print(f"  {GREEN}✓ Indexado com sucesso{RESET}")
-                    sucessos += 1
-                else:
-                    print(f"  {RED}✗ Falha na indexação{RESET}")
-                    falhas += 1
-            except Exception as e:
-                print(f"  {RED}✗ Erro na indexação: {e}{RESET}")
-                falhas += 1
-        else:
-            falhas += 1
+    elapsed = time.perf_counter() - start
 
-    # 5. Relatório final
+    # 7. Relatório final
     print_header("RELATÓRIO FINAL DE REINDEXAÇÃO")
 
     print(f"{BOLD}Resumo:{RESET}")
     print(f"  Total de PDFs: {len(pdfs)}")
     print(f"  {GREEN}Sucessos: {sucessos}{RESET}")
 
-    if falhas > 0:
-        print(f"  {RED}Falhas: {falhas}{RESET}")
+    if falhas:
+        print(f"  {RED}Falhas: {len(falhas)}{RESET}")
+    print(f"  Tempo total: {elapsed:.1f}s")
+    llm_stats = llm_dispatcher.stats()
+    if llm_stats['requests']:
+        print(f"  Chamadas ao LLM: {llm_stats['requests']} "
+              f"(novas tentativas: {llm_stats['retries']}, 429: {llm_stats['rate_limited']}, "
+              f"espera por limite: {llm_stats['throttle_seconds']}s)")
+    if stats:
+        print(f"  Chunks novos: {stats['new_chunks']} "
+              f"(duplicados ignorados: {stats['duplicate_chunks']})")
+        print(f"  Embedding + escrita: {stats['seconds']}s ({stats['chunks_per_second']} chunks/s)")
 
     if sucessos > 0:
         print(f"\n{GREEN}✓ Reindexação concluída com sucesso!{RESET}")
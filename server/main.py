@@ -1,46 +1,69 @@
 # Em server/main.py
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from contextlib import asynccontextmanager
+import json
 import os
 
 # Importa as funções refatoradas dos nossos módulos
-from modules.pdf_handlers import process_uploaded_pdf
-from modules.load_vectorstore import add_documents_to_vectorstore, PERSIST_DIR
-from modules.llm import get_llm_chain
-from modules.query_handlers import query_chain
+from modules.pdf_handlers import discard_saved_pdfs, save_uploaded_pdf, UploadTooLargeError
+from modules.ingestion_jobs import IngestionJobManager
+from modules.vectorstore_registry import PERSIST_DIR, get_vectorstore, get_embeddings, get_registry_metrics
+from modules.chain_manager import ChainManager
+from modules.query_handlers import (
+    SEARCH_MAX_RESULTS, SEARCH_PAGE_SIZE, query_chain, prepare_query, astream_answer, format_sources, search_documents
+)
+from modules.query_executor import BoundedQueryExecutor
+from modules.answer_cache import AnswerCache
+from modules.cross_encoder import CROSS_ENCODER_ENABLED, cross_encoder_reranker
+from modules.bm25_index import HYBRID_SEARCH_ENABLED, bm25_index
+from modules.acordao_store import acordao_store
+from modules.context_packer import context_packer
+from modules.llm import PROMPT_VARIANTS, prompt_token_stats
 from logger import setup_logger
 
-# Nossas variáveis globais para manter o estado da aplicação
-# Elas serão inicializadas durante o evento de "lifespan"
-chain = None
+# Nosso estado global: o gerenciador mantém a cadeia RAG atual
+# Ela será montada durante o evento de "lifespan" ou após o primeiro upload
+chain_manager = ChainManager()
+# Pool limitado onde rodam retrieval, rerank e LLM, fora do event loop
+query_executor = BoundedQueryExecutor()
+# Respostas de perguntas repetidas, invalidadas a cada ingestão
+answer_cache = AnswerCache()
 log = setup_logger()
 
+
+def on_ingestion_complete(vectorstore):
+    """Publica a cadeia com o vectorstore atualizado e descarta respostas antigas."""
+    chain_manager.refresh(vectorstore)
+    answer_cache.invalidate()
+
+
+# Fila de ingestão: ao fim de cada job, atualiza a cadeia e o cache
+ingestion_jobs = IngestionJobManager(on_complete=on_ingestion_complete)
+
 # O "lifespan manager" é a forma moderna de executar código na inicialização e no desligamento
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Código a ser executado ANTES de a aplicação começar a receber requisições
     log.info("Iniciando a aplicação...")
-    global chain
+    # Carrega o modelo de embeddings uma única vez, antes do primeiro upload/pergunta
+    get_embeddings()
+    if CROSS_ENCODER_ENABLED:
+        cross_encoder_reranker.load()
+    # Índice dos acórdãos estruturados (respostas factuais sem LLM)
+    acordao_store.load()
     if os.path.exists(PERSIST_DIR):
         log.info("Carregando vectorstore existente e montando a cadeia RAG...")
         # Se o banco de dados já existe, carrega-o e monta a cadeia principal
-        #from langchain_community.vectorstores import Chroma
-        from langchain_chroma import Chroma
-        #from langchain_community.embeddings import HuggingFaceEmbeddings
-        from langchain_huggingface import HuggingFaceEmbeddings
-
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=HuggingFaceEmbeddings(
-                model_name="all-MiniLM-L12-v2",
-                model_kwargs={'device': 'cpu'}
-            )
-        )
-        chain = get_llm_chain(vectorstore)
+        vectorstore = get_vectorstore()
+        # Carrega o índice BM25 (ou o reconstrói a partir do Chroma): além da busca
+        # híbrida, suas postings alimentam o match de termos do reranker
+        bm25_index.ensure_built(vectorstore)
+        chain_manager.refresh(vectorstore)
         log.info("Cadeia RAG pronta.")
     else:
         log.warning("Nenhum vectorstore encontrado. A cadeia não foi montada. Faça o upload de PDFs para começar.")
@@ -48,6 +71,8 @@ async def lifespan(app: FastAPI):
     yield # A aplicação fica rodando aqui
     
     # Código a ser executado APÓS a aplicação ser desligada (opcional)
+    query_executor.shutdown()
+    ingestion_jobs.shutdown()
     log.info("Aplicação encerrada.")
 
 app = FastAPI(title="RagBot2.0", lifespan=lifespan)
@@ -62,54 +87,260 @@ app.add_middleware(
 )
 
 
-@app.post("/upload_pdfs/")
+@app.post("/upload_pdfs/", status_code=202)
 async def upload_pdfs(files: List[UploadFile] = File(...)):
     """
-    Recebe uma lista de PDFs, os processa e atualiza o vectorstore e a cadeia RAG.
+    Recebe uma lista de PDFs, salva-os em disco e enfileira um job de ingestão.
+    O processamento (páginas, chunks, embeddings) ocorre em segundo plano;
+    acompanhe o progresso em GET /jobs/{job_id}.
     """
-    global chain
     log.info(f"Recebidos {len(files)} arquivos para processamento.")
-    
-    all_docs = []
+
+    saved_uploads = []
     for file in files:
-        # 1. Processa cada PDF para extrair seus documentos (páginas)
-        docs = process_uploaded_pdf(file)
-        if docs:
-            all_docs.extend(docs)
-    
-    if not all_docs:
+        # 1. Salva cada PDF em disco em blocos (fora do event loop)
+        try:
+            saved = await run_in_threadpool(save_uploaded_pdf, file)
+        except UploadTooLargeError as e:
+            # O lote inteiro é rejeitado: os PDFs já salvos nele não seriam indexados
+            await run_in_threadpool(discard_saved_pdfs, saved_uploads)
+            raise HTTPException(status_code=413, detail=str(e))
+        if saved:
+            saved_uploads.append(saved)
+
+    if not saved_uploads:
         raise HTTPException(status_code=400, detail="Nenhum documento válido pôde ser processado.")
 
-    # 2. Adiciona os documentos extraídos ao banco de dados vetorial
-    vectorstore = add_documents_to_vectorstore(all_docs)
-    
-    # 3. CRUCIAL: Recria a cadeia RAG com o banco de dados atualizado
-    chain = get_llm_chain(vectorstore)
-    
-    log.info("Documentos adicionados e cadeia RAG atualizada com sucesso.")
-    return {"message": "Arquivos processados e vectorstore atualizado com sucesso."}
+    # 2. Enfileira a ingestão; a cadeia RAG é atualizada ao fim do job
+    job = ingestion_jobs.submit(saved_uploads)
+    return {
+        "message": "Arquivos recebidos. A indexação está em andamento.",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Retorna o status de um job de ingestão, com o progresso de cada arquivo.
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job.to_dict()
+
+
+def explicit_filters(tipo_tributo, ano, decisao, acordao_numero) -> dict:
+    """Filtros de metadados enviados explicitamente no formulário."""
+    return {
+        'tipo_tributo': tipo_tributo,
+        'ano': ano,
+        'decisao': decisao,
+        'acordao_numero': acordao_numero,
+    }
+
+
+def validate_prompt_variant(prompt_variant: Optional[str]) -> Optional[str]:
+    """Variante de prompt pedida no formulário; 400 se não existir."""
+    if prompt_variant is not None and prompt_variant not in PROMPT_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"prompt_variant inválido: '{prompt_variant}'. Use: {', '.join(PROMPT_VARIANTS)}."
+        )
+    return prompt_variant
 
 
 @app.post("/ask/")
-async def ask_question(question: str = Form(...)):
+async def ask_question(
+    question: str = Form(...),
+    tipo_tributo: Optional[str] = Form(None),
+    ano: Optional[str] = Form(None),
+    decisao: Optional[str] = Form(None),
+    acordao_numero: Optional[str] = Form(None),
+    prompt_variant: Optional[str] = Form(None),
+):
     """
     Recebe uma pergunta e a responde usando a cadeia RAG pré-carregada.
+    Filtros opcionais (tipo_tributo, ano, decisao, acordao_numero) restringem a
+    busca; sem eles, os filtros são detectados na própria pergunta.
+    prompt_variant ('full' ou 'compact') escolhe o prompt; a resposta traz os
+    tokens de prompt gastos (prompt_tokens).
     """
-    global chain
+    prompt_variant = validate_prompt_variant(prompt_variant)
+
+    # Consultas factuais sobre um acórdão/processo são respondidas pelo índice estruturado
+    fast_answer = acordao_store.answer(question)
+    if fast_answer is not None:
+        return fast_answer
+
+    chain = chain_manager.get()
     if chain is None:
         log.error("Tentativa de fazer uma pergunta sem a cadeia RAG estar pronta.")
         raise HTTPException(status_code=400, detail="O sistema não está pronto. Por favor, envie os documentos PDF primeiro.")
     
     try:
         log.info(f"Recebida a pergunta do usuário: '{question}'")
-        # 4. Executa a cadeia de forma rápida e eficiente
-        result = query_chain(chain, question)
+        # 4. Executa a cadeia no pool limitado, sem bloquear o event loop
+        filters = explicit_filters(tipo_tributo, ano, decisao, acordao_numero)
+        result = await query_executor.run(query_chain, chain, question, answer_cache, filters, prompt_variant)
         log.info("Pergunta respondida com sucesso.")
         return result
     except Exception as e:
         log.exception("Erro ao processar a pergunta.")
         raise HTTPException(status_code=500, detail=f"Erro interno ao processar a pergunta: {e}")
 
+@app.post("/ask/stream")
+async def ask_question_stream(
+    question: str = Form(...),
+    tipo_tributo: Optional[str] = Form(None),
+    ano: Optional[str] = Form(None),
+    decisao: Optional[str] = Form(None),
+    acordao_numero: Optional[str] = Form(None),
+    prompt_variant: Optional[str] = Form(None),
+):
+    """
+    Versão em streaming do /ask/ (NDJSON): emite primeiro as fontes e depois
+    os tokens do LLM à medida que chegam.
+
+    Eventos: {"type": "sources", "sources": [...]}, {"type": "token", "content": "..."},
+    {"type": "done", "prompt_variant": ..., "prompt_tokens": ...} ou {"type": "error", "detail": "..."}.
+    """
+    prompt_variant = validate_prompt_variant(prompt_variant)
+
+    def event(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    fast_answer = acordao_store.answer(question)
+    if fast_answer is not None:
+        async def fast_events():
+            yield event({"type": "sources", "sources": fast_answer["sources"]})
+            yield event({"type": "token", "content": fast_answer["response"]})
+            yield event({"type": "done", "fast_path": fast_answer["fast_path"]})
+        return StreamingResponse(fast_events(), media_type="application/x-ndjson")
+
+    chain = chain_manager.get()
+    if chain is None:
+        log.error("Tentativa de fazer uma pergunta sem a cadeia RAG estar pronta.")
+        raise HTTPException(status_code=400, detail="O sistema não está pronto. Por favor, envie os documentos PDF primeiro.")
+
+    log.info(f"Recebida a pergunta do usuário (streaming): '{question}'")
+    try:
+        # Retrieval + rerank no pool limitado; a geração é assíncrona
+        filters = explicit_filters(tipo_tributo, ano, decisao, acordao_numero)
+        prepared = await query_executor.run(
+            prepare_query, chain, question, answer_cache, filters, prompt_variant
+        )
+    except Exception as e:
+        log.exception("Erro ao processar a pergunta.")
+        raise HTTPException(status_code=500, detail=f"Erro interno ao processar a pergunta: {e}")
+
+    async def events():
+        if prepared.cached is not None:
+            yield event({"type": "sources", "sources": prepared.cached.get("sources", [])})
+            yield event({"type": "token", "content": prepared.cached["response"]})
+            yield event({
+                "type": "done",
+                "cache": prepared.cached.get("cache"),
+                "prompt_variant": prepared.cached.get("prompt_variant"),
+                "prompt_tokens": prepared.cached.get("prompt_tokens"),
+            })
+            return
+
+        sources = format_sources(prepared.docs)
+        yield event({"type": "sources", "sources": sources})
+
+        parts, usage = [], {}
+        try:
+            async for token in astream_answer(chain, question, prepared.docs, prompt_variant, usage):
+                parts.append(token)
+                yield event({"type": "token", "content": token})
+        except Exception as e:
+            log.exception("Erro durante o streaming da resposta.")
+            yield event({"type": "error", "detail": f"Erro interno ao gerar a resposta: {e}"})
+            return
+
+        answer_cache.put(
+            question, prepared.chunk_ids,
+            {"response": "".join(parts), "sources": sources, **usage},
+            prepared.query_vector, prepared.cache_scope
+        )
+        log.info("Pergunta respondida com sucesso (streaming).")
+        yield event({"type": "done", **usage})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/search")
+async def search(
+    q: str,
+    tipo_tributo: Optional[str] = None,
+    ano: Optional[str] = None,
+    decisao: Optional[str] = None,
+    acordao_numero: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_RESULTS),
+):
+    """
+    Trechos de acórdãos mais relevantes para `q`, com score e metadados, sem
+    chamar o LLM. Usa a mesma busca (vetorial + BM25) e o mesmo reranking do
+    /ask/, com os mesmos filtros, paginados.
+    """
+    chain = chain_manager.get()
+    if chain is None:
+        log.error("Tentativa de busca sem a cadeia RAG estar pronta.")
+        raise HTTPException(status_code=400, detail="O sistema não está pronto. Por favor, envie os documentos PDF primeiro.")
+
+    try:
+        filters = explicit_filters(tipo_tributo, ano, decisao, acordao_numero)
+        return await query_executor.run(search_documents, chain, q, filters, page, page_size)
+    except Exception as e:
+        log.exception("Erro ao processar a busca.")
+        raise HTTPException(status_code=500, detail=f"Erro interno ao processar a busca: {e}")
+
+
+@app.get("/acordaos")
+async def list_acordaos(
+    processo: Optional[str] = None,
+    recorrente: Optional[str] = None,
+    relator: Optional[str] = None,
+):
+    """
+    Lista os acórdãos estruturados, filtrando por processo (exato), recorrente
+    ou relator (trecho do nome).
+    """
+    records = acordao_store.find(processo=processo, recorrente=recorrente, relator=relator)
+    return {"total": len(records), "acordaos": records}
+
+
+@app.get("/acordaos/{numero:path}")
+async def get_acordao(numero: str):
+    """
+    Retorna os dados estruturados de um acórdão pelo número (ex.: /acordaos/11/2017).
+    """
+    record = acordao_store.get(numero)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Acórdão não encontrado.")
+    return record
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Expõe métricas do registro de embeddings/vectorstore (tempo de carga, memória).
+    """
+    return {
+        "vectorstore_registry": get_registry_metrics(),
+        "ask_executor": query_executor.metrics(),
+        "answer_cache": answer_cache.stats(),
+        "cross_encoder": cross_encoder_reranker.metrics(),
+        "bm25_index": bm25_index.stats(),
+        "acordao_store": acordao_store.stats(),
+        "context_packer": context_packer.stats(),
+        "prompt": prompt_token_stats.stats(),
+    }
+
+
 @app.get("/test")
 async def test():
     return {"message": "Servidor RagBot2.0 está no ar!"}
\ No newline at end of file
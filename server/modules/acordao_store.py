@@ -0,0 +1,243 @@
+"""
+Índice em memória dos acórdãos estruturados (JSONs em extracted_json/).
+
+Perguntas factuais sobre um acórdão ou processo específico ("qual a decisão
+do acórdão 23/2017?", "quem foi o relator do processo 2014/10/32144?") são
+respondidas direto dos campos extraídos pelo AcordaoExtractor, sem busca
+vetorial nem chamada ao LLM.
+
+Os JSONs só são gerados por reindex_with_structured_chunking.py (o upload
+pelo /upload_pdfs/ não passa pelo AcordaoExtractor), por isso o índice é
+carregado no startup: após uma reindexação, reinicie o servidor.
+"""
+
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from logger import setup_logger
+from modules.load_vectorstore import EXTRACTED_JSON_DIR
+from modules.query_parser import ACORDAO_PATTERN, PROCESSO_PATTERN
+
+log = setup_logger()
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Minúsculas, sem acentos e sem espaços repetidos (chave de busca)."""
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def normalize_numero(numero: Optional[str]) -> str:
+    """Número do acórdão sem zeros à esquerda nem espaços ("011 / 2017" -> "11/2017")."""
+    if not numero:
+        return ''
+    parts = re.split(r'\s*/\s*', str(numero).strip())
+    return '/'.join(part.lstrip('0') or '0' for part in parts)
+
+
+def _relator_nome(record: Dict) -> Optional[str]:
+    relator = record.get('relator') or {}
+    return relator.get('nome')
+
+
+def _format_relator(record: Dict) -> Optional[str]:
+    relator = record.get('relator') or {}
+    if not relator.get('nome'):
+        return None
+    return f"{relator['tipo']} {relator['nome']}" if relator.get('tipo') else relator['nome']
+
+
+def _format_decisao(record: Dict) -> Optional[str]:
+    acordao = record.get('acordao') or {}
+    if not acordao.get('decisao'):
+        return None
+    votacao = f", por {acordao['votacao']}" if acordao.get('votacao') else ''
+    return f"Recurso {acordao['decisao']}{votacao}"
+
+
+# Campo perguntado -> (padrão na pergunta normalizada, rótulo, extrator)
+# Todas as intenções reconhecidas na pergunta são respondidas, nesta ordem.
+FIELD_INTENTS = [
+    ('relator', re.compile(r'\brelator'), 'Relator', _format_relator),
+    ('recorrente', re.compile(r'\brecorrente|\bquem recorreu'), 'Recorrente', lambda r: r.get('recorrente')),
+    ('advogado', re.compile(r'\badvogad'), 'Advogado', lambda r: r.get('advogado')),
+    ('procurador_fiscal', re.compile(r'\bprocurador'), 'Procurador fiscal', lambda r: r.get('procurador_fiscal')),
+    ('votacao', re.compile(r'\bvotacao|\bunanim|\bmaioria'), 'Votação',
+     lambda r: (r.get('acordao') or {}).get('votacao')),
+    ('decisao', re.compile(r'\bdecisao|\bdecidi|\bresultado|\bprovid|\bprovimento'), 'Decisão', _format_decisao),
+    ('tipo_tributo', re.compile(r'\btributo|\bimposto'), 'Tributo',
+     lambda r: (r.get('ementa') or {}).get('tipo_tributo')),
+    ('data_sessao', re.compile(r'\bdata\b|\bquando\b|\bsessao|\bjulgad'), 'Data da sessão', lambda r: r.get('data_sessao')),
+    ('ementa', re.compile(r'\bementa'), 'Ementa', lambda r: (r.get('ementa') or {}).get('texto_completo')),
+    ('processo', re.compile(r'\bprocesso'), 'Processo', lambda r: r.get('processo')),
+    ('acordao_numero', re.compile(r'\bnumero do acordao|\bqual (?:o )?acordao'), 'Acórdão', lambda r: r.get('acordao_numero')),
+]
+
+
+# Só consultas diretas a um campo ("qual o relator...", "quem recorreu...",
+# "quando foi julgado...") usam o índice; pedidos de explicação vão para o RAG,
+# mesmo citando um campo ("por que o acórdão negou provimento?").
+LOOKUP_QUESTION = re.compile(r'^(?:e\s+)?(?:qual|quais|quem|quando|que|em que)\b')
+REASONING_QUESTION = re.compile(
+    r'\bpor ?que\b|\bpor qual (?:motivo|razao)|\bexpli|\bfundament|\bcomo\b|\bentend'
+    r'|\bjustific|\bmotiv|\braz(?:ao|oes)\b|\bargument'
+)
+
+
+def is_field_lookup(normalized_question: str) -> bool:
+    """Pergunta (já normalizada) que pede um campo, e não o raciocínio da decisão."""
+    question = normalized_question.lstrip(' "\'¿-')
+    return bool(LOOKUP_QUESTION.match(question)) and not REASONING_QUESTION.search(question)
+
+
+class AcordaoStore:
+    """Acórdãos indexados por número, processo, recorrente e relator."""
+
+    def __init__(self, directory: str = EXTRACTED_JSON_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._by_numero: Dict[str, Dict] = {}
+        self._by_processo: Dict[str, List[Dict]] = {}
+        self._by_recorrente: Dict[str, List[Dict]] = {}
+        self._by_relator: Dict[str, List[Dict]] = {}
+        self._fast_path_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._by_numero)
+
+    def load(self) -> int:
+        """
+        (Re)carrega todos os JSONs do diretório e reconstrói os índices.
+
+        Returns:
+            Número de acórdãos indexados
+        """
+        by_numero, by_processo, by_recorrente, by_relator = {}, {}, {}, {}
+        if self.directory.exists():
+            for json_path in sorted(self.directory.glob("*.json")):
+                try:
+                    with open(json_path, 'r', encoding='utf-8') as f:
+                        record = json.load(f)
+                except (OSError, ValueError):
+                    log.exception(f"JSON inválido ignorado: {json_path}")
+                    continue
+                record.setdefault('source_file', f"{json_path.stem}.pdf")
+                numero = record.get('acordao_numero')
+                if not numero:
+                    continue
+                by_numero[normalize_numero(numero)] = record
+                by_processo.setdefault(normalize_key(record.get('processo')), []).append(record)
+                by_recorrente.setdefault(normalize_key(record.get('recorrente')), []).append(record)
+                by_relator.setdefault(normalize_key(_relator_nome(record)), []).append(record)
+
+        with self._lock:
+            self._by_numero = by_numero
+            self._by_processo = by_processo
+            self._by_recorrente = by_recorrente
+            self._by_relator = by_relator
+        log.info(f"Índice de acórdãos carregado: {len(by_numero)} acórdão(s) de '{self.directory}'.")
+        return len(by_numero)
+
+    def get(self, numero: str) -> Optional[Dict]:
+        """Busca um acórdão pelo número (ex.: '11/2017' ou '011/2017')."""
+        with self._lock:
+            return self._by_numero.get(normalize_numero(numero))
+
+    def find(
+        self,
+        processo: Optional[str] = None,
+        recorrente: Optional[str] = None,
+        relator: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Busca acórdãos por processo (exato) e/ou recorrente e relator (trecho do nome).
+
+        Returns:
+            Acórdãos que satisfazem todos os critérios informados
+        """
+        with self._lock:
+            if processo:
+                records = list(self._by_processo.get(normalize_key(processo), []))
+            else:
+                records = list(self._by_numero.values())
+
+            if recorrente:
+                termo = normalize_key(recorrente)
+                matches = {id(r) for key, rs in self._by_recorrente.items() if termo in key for r in rs}
+                records = [r for r in records if id(r) in matches]
+            if relator:
+                termo = normalize_key(relator)
+                matches = {id(r) for key, rs in self._by_relator.items() if termo in key for r in rs}
+                records = [r for r in records if id(r) in matches]
+            return records
+
+    def answer(self, question: str) -> Optional[Dict]:
+        """
+        Responde perguntas factuais sobre um acórdão/processo específico.
+        Perguntas que pedem explicação ou fundamentos seguem para o RAG.
+
+        Args:
+            question: Pergunta do usuário
+
+        Returns:
+            Resposta no formato do /ask/ ou None se a pergunta não for uma consulta direta
+        """
+        normalized = normalize_key(question)
+        if not is_field_lookup(normalized):
+            return None
+
+        identifier_field = None
+        record = None
+        acordao = ACORDAO_PATTERN.search(question)
+        if acordao:
+            identifier_field = 'acordao_numero'
+            record = self.get(acordao.group(1))
+        else:
+            processo = PROCESSO_PATTERN.search(question)
+            if processo:
+                identifier_field = 'processo'
+                records = self.find(processo=processo.group(0))
+                record = records[0] if len(records) == 1 else None
+        if record is None:
+            return None
+
+        answers = []
+        for field, pattern, label, extract in FIELD_INTENTS:
+            if field == identifier_field or not pattern.search(normalized):
+                continue
+            value = extract(record)
+            if not value:
+                # Campo não extraído: deixa a pergunta seguir para o RAG
+                return None
+            answers.append((field, label, value))
+        if not answers:
+            return None
+
+        with self._lock:
+            self._fast_path_hits += 1
+        fields = [field for field, _, _ in answers]
+        log.info(f"Pergunta respondida pelo índice de acórdãos ({', '.join(fields)}).")
+        header = f"Acórdão nº {record['acordao_numero']} (processo {record.get('processo', 'não informado')})"
+        return {
+            "response": header + "\n" + "\n".join(f"- {label}: {value}" for _, label, value in answers),
+            "sources": [record.get('source_file', 'Fonte desconhecida')],
+            "fast_path": fields,
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'acordaos': len(self._by_numero),
+                'directory': str(self.directory),
+                'fast_path_hits': self._fast_path_hits,
+            }
+
+
+acordao_store = AcordaoStore()
@@ -0,0 +1,155 @@
+"""
+Cache de respostas para perguntas repetidas ou quase idênticas.
+
+Dois níveis de busca:
+1. Exato: pergunta normalizada + conjunto de IDs dos chunks recuperados.
+2. Semântico (opcional): similaridade de cosseno entre o embedding da pergunta
+   e o das perguntas já respondidas, acima de ANSWER_CACHE_SIMILARITY.
+
+Os dois níveis são separados por escopo (modelo + variante do prompt): uma
+resposta gerada com o prompt completo não é servida a quem pediu o compacto.
+
+Entradas expiram por TTL, são descartadas por LRU e todo o cache é
+invalidado quando novos documentos são ingeridos.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from logger import setup_logger
+
+log = setup_logger()
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv('ANSWER_CACHE_TTL_SECONDS', '86400'))
+# 0 desativa a busca por similaridade; ~0.95 é um bom ponto de partida com MiniLM
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0'))
+
+
+def normalize_question(question: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços colapsados."""
+    text = unicodedata.normalize('NFKD', question.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s/]', ' ', text)
+    return ' '.join(text.split())
+
+
+class AnswerCache:
+    """Cache LRU com TTL de respostas do /ask/."""
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # chave -> (timestamp, resposta, vetor normalizado da pergunta ou None)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict, Optional[np.ndarray]]]" = OrderedDict()
+        self._hits_exact = 0
+        self._hits_similar = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    @staticmethod
+    def _key(question: str, chunk_ids: Iterable[str], scope: str) -> Tuple:
+        return scope, normalize_question(question), frozenset(chunk_ids)
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _is_expired(self, timestamp: float) -> bool:
+        return time.time() - timestamp > self.ttl_seconds
+
+    def get(self, question: str, chunk_ids: Iterable[str], scope: str = '') -> Optional[Dict]:
+        """Busca exata por pergunta normalizada + IDs dos chunks recuperados, no escopo dado."""
+        key = self._key(question, chunk_ids, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry[0]):
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits_exact += 1
+            return entry[1]
+
+    def get_similar(self, query_vector: List[float], scope: str = '') -> Optional[Dict]:
+        """Busca a resposta de uma pergunta semanticamente equivalente, no escopo dado."""
+        if not self.similarity_enabled:
+            return None
+        query = self._unit(query_vector)
+        with self._lock:
+            keys, vectors = [], []
+            for key, (timestamp, _, vector) in self._entries.items():
+                if vector is not None and key[0] == scope and not self._is_expired(timestamp):
+                    keys.append(key)
+                    vectors.append(vector)
+            if not vectors:
+                return None
+
+            similarities = np.stack(vectors) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self._hits_similar += 1
+            log.debug(f"Cache de respostas: hit semântico (similaridade {similarities[best]:.3f}).")
+            return self._entries[keys[best]][1]
+
+    def put(
+        self,
+        question: str,
+        chunk_ids: Iterable[str],
+        response: Dict,
+        query_vector: Optional[List[float]] = None,
+        scope: str = ''
+    ) -> None:
+        """Armazena a resposta de uma pergunta no escopo (modelo + variante do prompt)."""
+        key = self._key(question, chunk_ids, scope)
+        vector = self._unit(query_vector) if query_vector is not None else None
+        with self._lock:
+            self._entries[key] = (time.time(), response, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Descarta todas as respostas (chamado após cada ingestão)."""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+        log.info("Cache de respostas invalidado após ingestão de novos documentos.")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits_exact + self._hits_similar + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'similarity_threshold': self.similarity_threshold,
+                'hits_exact': self._hits_exact,
+                'hits_similar': self._hits_similar,
+                'misses': self._misses,
+                'hit_rate': round((self._hits_exact + self._hits_similar) / lookups, 3) if lookups else None,
+                'invalidations': self._invalidations,
+            }
@@ -0,0 +1,375 @@
+"""
+Índice invertido BM25 em memória, persistido junto ao Chroma.
+
+Complementa a busca vetorial em consultas com identificadores exatos
+(número de acórdão "11/2017", processo "2014/10/32144", artigos), que o
+MiniLM representa mal. O índice é atualizado incrementalmente a cada
+ingestão e salvo em PERSIST_DIR; se o arquivo não existir (coleção criada
+antes do índice), é reconstruído a partir do Chroma no startup.
+
+Só as postings e o tamanho de cada chunk vão para o disco (mais os campos de
+filtro); o texto e os metadados dos resultados vêm do Chroma. O arquivo é um
+snapshot seguido de deltas anexados a cada ingestão, e é recarregado quando
+outro processo o reescreve (ex.: reindex_with_structured_chunking.py).
+
+As mesmas postings servem ao reranker: cada chunk recebe uma linha e cada
+termo guarda (sob demanda) o array NumPy das linhas que o contêm, de modo que
+contar os termos da pergunta presentes em cada candidato é um np.isin por termo.
+"""
+
+import math
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from logger import setup_logger
+from modules.vectorstore_registry import PERSIST_DIR
+from modules.document_registry import chunk_id_for_text
+from modules.query_parser import FILTER_FIELDS, matches_filters
+
+log = setup_logger()
+
+BM25_INDEX_PATH = os.path.join(PERSIST_DIR, "bm25_index.pkl")
+# Busca híbrida (BM25 + vetorial) no /ask/; desative com HYBRID_SEARCH_ENABLED=false
+HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+# Candidatos vindos do BM25 antes da fusão
+BM25_CANDIDATES = int(os.getenv('BM25_CANDIDATES', '8'))
+RRF_K = int(os.getenv('RRF_K', '60'))
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Identificadores com separadores ("11/2017", "2014/10/32144", "1.234") viram um único termo
+TOKEN_PATTERN = re.compile(r'\d+(?:[./-]\d+)+|\w+')
+# Deltas acumulados no arquivo a partir dos quais o startup grava um novo snapshot
+BM25_COMPACT_DELTAS = 50
+_INDEX_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos em minúsculas e sem acentos, preservando identificadores numéricos."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(text)
+
+
+class BM25Index:
+    """Índice BM25 thread-safe com postings term -> {chunk_id: frequência}."""
+
+    def __init__(self, path: str = BM25_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._filter_meta: Dict[str, Dict] = {}  # chunk_id -> campos de FILTER_FIELDS
+        self._store_ids: Dict[str, str] = {}  # chunk_id -> ID no Chroma, quando diferente
+        self._rows: Dict[str, int] = {}  # chunk_id -> linha (ordem de inserção)
+        self._term_rows: Dict[str, np.ndarray] = {}  # termo -> linhas, calculado sob demanda
+        self._total_len = 0
+        self._pending: List[Tuple] = []  # chunks ainda não gravados no arquivo
+        self._deltas = 0  # deltas anexados ao snapshot do arquivo
+        self._needs_snapshot = True  # arquivo ausente, incompatível ou truncado
+        self._signature: Optional[Tuple[int, int]] = None  # (mtime_ns, tamanho) do último load/save
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _clear(self) -> None:
+        self._postings = {}
+        self._doc_len = {}
+        self._filter_meta = {}
+        self._store_ids = {}
+        self._rows = {}
+        self._term_rows = {}
+        self._total_len = 0
+        self._pending = []
+        self._deltas = 0
+        self._needs_snapshot = True
+
+    def _index_chunk(self, chunk_id: str, counts: Dict[str, int], filter_meta: Dict, store_id: Optional[str]) -> None:
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+            self._term_rows.pop(term, None)
+        length = sum(counts.values())
+        self._doc_len[chunk_id] = length
+        self._rows[chunk_id] = len(self._rows)
+        if filter_meta:
+            self._filter_meta[chunk_id] = filter_meta
+        if store_id is not None and store_id != chunk_id:
+            self._store_ids[chunk_id] = store_id
+        self._total_len += length
+
+    def _refresh(self) -> None:
+        """Carrega o índice do disco no primeiro uso e sempre que o arquivo mudar (chamar com o lock)."""
+        signature = self._file_signature()
+        if self._loaded and signature == self._signature:
+            return
+        if self._loaded:
+            log.info("Índice BM25 alterado em disco; recarregando.")
+            self._clear()
+        self._loaded = True
+        self._signature = signature
+        if signature is None:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+                if snapshot.get('version') != _INDEX_VERSION:
+                    log.warning("Índice BM25 em versão antiga; será reconstruído.")
+                    return
+                self._postings = snapshot['postings']
+                self._doc_len = snapshot['doc_len']
+                self._filter_meta = snapshot['filter_meta']
+                self._store_ids = snapshot['store_ids']
+                self._rows = {chunk_id: row for row, chunk_id in enumerate(self._doc_len)}
+                self._total_len = sum(self._doc_len.values())
+                self._needs_snapshot = False
+                while True:
+                    try:
+                        delta = pickle.load(f)
+                    except EOFError:
+                        break
+                    for chunk_id, counts, filter_meta, store_id in delta:
+                        if chunk_id not in self._doc_len:
+                            self._index_chunk(chunk_id, counts, filter_meta, store_id)
+                    self._deltas += 1
+            log.info(
+                f"Índice BM25 carregado: {len(self._doc_len)} chunks, {len(self._postings)} termos "
+                f"({self._deltas} delta(s))."
+            )
+        except Exception:
+            # Ex.: delta truncado por uma gravação interrompida; o próximo save grava um snapshot
+            self._needs_snapshot = True
+            log.exception(f"Falha ao carregar o índice BM25 em '{self.path}'; será regravado.")
+
+    def save(self, compact: bool = False) -> None:
+        """
+        Grava os chunks novos: um delta anexado ao arquivo ou, se não houver
+        snapshot válido (ou compact=True), um snapshot completo de forma
+        atômica (arquivo temporário + rename).
+        """
+        with self._lock:
+            if not (self._pending or compact or self._needs_snapshot):
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if compact or self._needs_snapshot:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(
+                        {
+                            'version': _INDEX_VERSION,
+                            'postings': self._postings,
+                            'doc_len': self._doc_len,
+                            'filter_meta': self._filter_meta,
+                            'store_ids': self._store_ids,
+                        },
+                        f,
+                        protocol=pickle.HIGHEST_PROTOCOL
+                    )
+                os.replace(tmp_path, self.path)
+                self._needs_snapshot = False
+                self._deltas = 0
+            else:
+                with open(self.path, 'ab') as f:
+                    pickle.dump(self._pending, f, protocol=pickle.HIGHEST_PROTOCOL)
+                self._deltas += 1
+            self._pending = []
+            self._signature = self._file_signature()
+
+    def add(self, chunks: List[Document], store_ids: Optional[List[str]] = None) -> int:
+        """
+        Indexa chunks ainda ausentes do índice (idempotente por chunk_id).
+
+        Args:
+            chunks: Chunks com metadata['chunk_id'] (ou texto para calcular o ID)
+            store_ids: IDs dos chunks no Chroma, se diferentes do chunk_id
+                (coleções antigas); usados para buscar o texto dos resultados
+
+        Returns:
+            Número de chunks novos no índice
+        """
+        added = 0
+        with self._lock:
+            self._refresh()
+            for i, chunk in enumerate(chunks):
+                chunk_id = chunk.metadata.get('chunk_id') or chunk_id_for_text(chunk.page_content)
+                if chunk_id in self._doc_len:
+                    continue
+                counts = dict(Counter(tokenize(chunk.page_content)))
+                filter_meta = {
+                    name: chunk.metadata[name] for name in FILTER_FIELDS if chunk.metadata.get(name) is not None
+                }
+                store_id = store_ids[i] if store_ids is not None else None
+                self._index_chunk(chunk_id, counts, filter_meta, store_id)
+                self._pending.append((chunk_id, counts, filter_meta, store_id))
+                added += 1
+        return added
+
+    def ensure_built(self, vectorstore) -> None:
+        """Reconstrói o índice a partir do Chroma se ele estiver vazio."""
+        with self._lock:
+            self._refresh()
+            if self._doc_len:
+                if self._deltas >= BM25_COMPACT_DELTAS:
+                    self.save(compact=True)
+                    log.info(f"Índice BM25 compactado em um único snapshot ({len(self._doc_len)} chunks).")
+                return
+            start = time.perf_counter()
+            data = vectorstore.get(include=['documents', 'metadatas'])
+            chunks = [
+                Document(page_content=text or '', metadata=metadata or {})
+                for text, metadata in zip(data['documents'], data['metadatas'])
+            ]
+            if not chunks:
+                return
+            self.add(chunks, store_ids=data['ids'])
+            self.save()
+            log.info(f"Índice BM25 reconstruído do Chroma: {len(chunks)} chunks em {time.perf_counter() - start:.2f}s.")
+
+    def search(
+        self,
+        query: str,
+        vectorstore,
+        k: int = 8,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Busca os k chunks com maior score BM25 para a query.
+
+        Args:
+            query: Pergunta do usuário
+            vectorstore: Chroma de onde vêm o texto e os metadados dos resultados
+            k: Número máximo de resultados
+            filters: Igualdade exigida nos metadados (mesmos filtros do Chroma)
+
+        Returns:
+            Lista de (chunk, score) em ordem decrescente de score
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self._refresh()
+            n_docs = len(self._doc_len)
+            if not n_docs or not terms:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for chunk_id, tf in postings.items():
+                    if filters and not matches_filters(self._filter_meta.get(chunk_id, {}), filters):
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = nlargest(k, scores.items(), key=lambda item: item[1])
+            top = [(self._store_ids.get(cid, cid), score) for cid, score in top]
+        if not top:
+            return []
+
+        # Texto e metadados vêm do Chroma, fora do lock
+        data = vectorstore.get(ids=[sid for sid, _ in top], include=['documents', 'metadatas'])
+        found = {sid: (text, metadata) for sid, text, metadata in zip(data['ids'], data['documents'], data['metadatas'])}
+        return [
+            (Document(page_content=found[sid][0] or '', metadata=found[sid][1] or {}), score)
+            for sid, score in top
+            if sid in found
+        ]
+
+    def _rows_with_term(self, term: str) -> np.ndarray:
+        """Linhas (ordenadas) dos chunks que contêm o termo; chamar com o lock."""
+        rows = self._term_rows.get(term)
+        if rows is None:
+            postings = self._postings.get(term) or {}
+            rows = np.sort(np.fromiter((self._rows[cid] for cid in postings), dtype=np.int64, count=len(postings)))
+            self._term_rows[term] = rows
+        return rows
+
+    def term_match_counts(self, chunk_ids: List[str], terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantos dos termos cada chunk contém, pelas postings do índice.
+
+        Args:
+            chunk_ids: IDs dos chunks candidatos
+            terms: Termos já tokenizados (tokenize)
+
+        Returns:
+            Tupla (contagem por chunk, máscara dos chunks presentes no índice;
+            os ausentes ficam com contagem 0)
+        """
+        with self._lock:
+            self._refresh()
+            rows = np.fromiter((self._rows.get(cid, -1) for cid in chunk_ids), dtype=np.int64, count=len(chunk_ids))
+            counts = np.zeros(len(rows), dtype=np.int64)
+            for term in terms:
+                term_rows = self._rows_with_term(term)
+                if term_rows.size:
+                    counts += np.isin(rows, term_rows)
+        return counts, rows >= 0
+
+    def reset(self) -> None:
+        """Esvazia o índice em memória (ex.: após apagar PERSIST_DIR na reindexação)."""
+        with self._lock:
+            self._clear()
+            self._loaded = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'chunks': len(self._doc_len),
+                'terms': len(self._postings),
+                'deltas': self._deltas,
+                'path': self.path,
+            }
+
+
+bm25_index = BM25Index()
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]],
+    k: int = RRF_K,
+    top_n: Optional[int] = None
+) -> List[Document]:
+    """
+    Combina várias listas ordenadas com Reciprocal Rank Fusion.
+
+    Args:
+        rankings: Listas de documentos, cada uma em ordem de relevância
+        k: Constante do RRF (atenua o peso das primeiras posições)
+        top_n: Número de documentos a retornar (todos, se None)
+
+    Returns:
+        Documentos únicos (por chunk_id) em ordem decrescente de score RRF
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            chunk_id = doc.metadata.get('chunk_id') or chunk_id_for_text(doc.page_content)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(chunk_id, doc)
+    # sorted é estável: empates mantêm a ordem da primeira lista
+    fused = sorted(scores, key=lambda cid: scores[cid], reverse=True)
+    if top_n is not None:
+        fused = fused[:top_n]
+    return [docs[cid] for cid in fused]
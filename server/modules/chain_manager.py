@@ -0,0 +1,67 @@
+"""
+Gerenciador da cadeia RAG compartilhada pela API.
+
+O cliente do LLM e o prompt são criados uma única vez e reaproveitados; após
+cada ingestão apenas a visão do recuperador sobre a coleção é recriada e a
+nova cadeia é trocada de forma atômica, sem afetar perguntas em andamento.
+"""
+
+import threading
+from typing import Optional
+
+from langchain.chains import RetrievalQA
+from logger import setup_logger
+from modules.llm import build_combine_documents_chain, get_llm_chain
+
+log = setup_logger()
+
+
+class ChainManager:
+    """Mantém a cadeia RAG atual e o LLM/prompt de longa duração."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._combine_documents_chain = None
+        self._chain: Optional[RetrievalQA] = None
+        self._vectorstore = None
+        self.refresh_count = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self._chain is not None
+
+    def get(self) -> Optional[RetrievalQA]:
+        """
+        Retorna a cadeia atual. Quem chama deve manter a referência obtida
+        durante toda a pergunta, assim uma troca concorrente não a afeta.
+        """
+        return self._chain
+
+    def refresh(self, vectorstore) -> RetrievalQA:
+        """
+        Recria apenas o recuperador sobre o vectorstore e troca a cadeia atual.
+
+        Args:
+            vectorstore: Vectorstore (compartilhado) com a coleção atualizada.
+
+        Returns:
+            A nova cadeia publicada.
+        """
+        with self._lock:
+            if self._combine_documents_chain is None:
+                log.info("Inicializando cliente LLM e prompt da cadeia RAG.")
+                self._combine_documents_chain = build_combine_documents_chain()
+
+            if self._chain is not None and vectorstore is self._vectorstore:
+                # O handle do Chroma é o mesmo: o recuperador já enxerga os novos chunks
+                log.debug("Vectorstore inalterado, cadeia RAG mantida.")
+                return self._chain
+
+            new_chain = get_llm_chain(vectorstore, self._combine_documents_chain)
+            # Atribuição de referência é atômica: perguntas concorrentes veem a
+            # cadeia antiga ou a nova, nunca um estado intermediário.
+            self._chain = new_chain
+            self._vectorstore = vectorstore
+            self.refresh_count += 1
+            log.info(f"Cadeia RAG publicada (atualização #{self.refresh_count}).")
+            return new_chain
@@ -0,0 +1,195 @@
+"""
+Empacotamento do contexto enviado ao LLM dentro de um orçamento de tokens.
+
+Os chunks reranqueados chegam ao prompt com tamanhos muito diferentes (um
+chunk estruturado de acórdão pode ter ~3000 caracteres), e o tamanho do
+prompt — e com ele a latência e o custo do Groq — variava a cada pergunta.
+Aqui cada chunk é dividido em frases, frases repetidas entre chunks do mesmo
+documento (overlap do splitter, ementa repetida no acórdão) são descartadas e
+as frases mais relevantes para a pergunta são escolhidas até
+CONTEXT_TOKEN_BUDGET tokens, preservando a ordem original dentro de cada chunk.
+Acórdãos diferentes costumam ter dispositivos idênticos ("ACORDAM ... negar
+provimento ao recurso"), por isso a deduplicação nunca cruza documentos, e todo
+chunk recebido mantém ao menos uma frase.
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+from logger import setup_logger
+from modules.reranker import MIN_TERM_LENGTH, TERM_PATTERN
+
+log = setup_logger()
+
+# Orçamento de tokens do contexto (só os trechos, sem o template do prompt)
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500'))
+CONTEXT_PACKING_ENABLED = os.getenv('CONTEXT_PACKING_ENABLED', 'true').lower() == 'true'
+
+# Estimativa para português com o tokenizer do LLaMA 3: ~1,3 token por palavra,
+# pontuação à parte. Não precisa ser exata, só estável entre perguntas.
+TOKENS_PER_WORD = 1.3
+WORD_PATTERN = re.compile(r'\w+')
+PUNCT_PATTERN = re.compile(r'[^\w\s]')
+# Fim de frase seguido de maiúscula (não quebra em "art. 5º" nem em "nº 123")
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.;!?])\s+(?=[A-ZÁÉÍÓÚÂÊÔÃÕÇ"“(])')
+# Marca de trecho omitido entre frases escolhidas do mesmo chunk
+OMISSION = '[...]'
+# Peso da posição do chunk no ranking (1º = 1,0; 5º = 0,5)
+RANK_DECAY = 0.25
+# Frases sem termo da pergunta ainda podem preencher o orçamento, com score baixo
+BASE_SCORE = 0.05
+
+
+def count_tokens(text: str) -> int:
+    """Estimativa do número de tokens de um texto."""
+    words = len(WORD_PATTERN.findall(text))
+    return math.ceil(words * TOKENS_PER_WORD) + len(PUNCT_PATTERN.findall(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Frases de um chunk, com espaços colapsados e sem frases vazias."""
+    return [s for s in (' '.join(p.split()) for p in SENTENCE_BOUNDARY.split(text)) if s]
+
+
+def _terms(text: str) -> frozenset:
+    return frozenset(t for t in TERM_PATTERN.findall(text.lower()) if len(t) >= MIN_TERM_LENGTH)
+
+
+def _dedup_key(sentence: str) -> str:
+    # Espaços nas pontas: a busca de um trecho em outro respeita limites de termo
+    terms = TERM_PATTERN.findall(sentence.lower())
+    return f" {' '.join(terms)} " if terms else ''
+
+
+def _document_key(doc: Document) -> str:
+    """Documento de origem do chunk; só há overlap entre chunks do mesmo documento."""
+    return str(doc.metadata.get('acordao_numero') or doc.metadata.get('source') or '')
+
+
+class ContextPacker:
+    """Seleciona frases dos chunks até o orçamento de tokens e acumula métricas."""
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, enabled: bool = CONTEXT_PACKING_ENABLED):
+        self.budget = budget
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._packed = 0
+        self._tokens_before = 0
+        self._tokens_after = 0
+        self._duplicates_removed = 0
+
+    def pack(self, docs: List[Document], query: str) -> Tuple[List[Document], Dict]:
+        """
+        Monta o contexto da pergunta dentro do orçamento.
+
+        Args:
+            docs: Documentos reranqueados, do mais ao menos relevante
+            query: Pergunta do usuário
+
+        Returns:
+            Tupla (novos documentos com o texto empacotado, mesmos metadados;
+            estatísticas {tokens_before, tokens_after, duplicates_removed})
+        """
+        tokens_before = sum(count_tokens(doc.page_content) for doc in docs)
+        if not self.enabled or not docs:
+            return docs, {'tokens_before': tokens_before, 'tokens_after': tokens_before, 'duplicates_removed': 0}
+
+        # 1. Frases únicas de cada chunk; trechos já vistos no mesmo documento
+        # (inteiros ou como pedaço de uma frase anterior, efeito do overlap)
+        # são descartados, exceto se o chunk ficaria vazio
+        query_terms = _terms(query)
+        seen_keys: Dict[str, List[str]] = {}  # documento -> chaves já vistas
+        candidates = []  # (score, doc_idx, pos, tokens)
+        sentences_by_doc: List[List[str]] = []
+        duplicates = 0
+        for doc_idx, doc in enumerate(docs):
+            seen = seen_keys.setdefault(_document_key(doc), [])
+            all_sentences = split_sentences(doc.page_content)
+            sentences = []
+            for sentence_idx, sentence in enumerate(all_sentences):
+                key = _dedup_key(sentence)
+                is_last = sentence_idx == len(all_sentences) - 1
+                if not key or any(key in other for other in seen):
+                    if sentences or not is_last:
+                        duplicates += 1
+                        continue
+                if key:
+                    seen.append(key)
+                overlap = len(query_terms & _terms(sentence))
+                relevance = overlap / math.sqrt(len(query_terms)) if query_terms else 0.0
+                rank_weight = 1.0 / (1.0 + RANK_DECAY * doc_idx)
+                candidates.append((
+                    (relevance + BASE_SCORE) * rank_weight,
+                    doc_idx,
+                    len(sentences),
+                    count_tokens(sentence)
+                ))
+                sentences.append(sentence)
+            sentences_by_doc.append(sentences)
+
+        # 2. Tudo cabe: só remove as duplicatas
+        total = sum(c[3] for c in candidates)
+        if total <= self.budget:
+            selected = {(c[1], c[2]) for c in candidates}
+        else:
+            # 3. A melhor frase de cada chunk entra sempre (mantém todas as
+            # fontes, mesmo estourando o orçamento), depois as demais por score
+            ordered = sorted(candidates, key=lambda c: (-c[0], c[1], c[2]))
+            best_per_doc = {}
+            for c in ordered:
+                best_per_doc.setdefault(c[1], c)
+            selected = {(c[1], c[2]) for c in best_per_doc.values()}
+            used = sum(c[3] for c in best_per_doc.values())
+            for c in ordered:
+                if (c[1], c[2]) in selected or used + c[3] > self.budget:
+                    continue
+                selected.add((c[1], c[2]))
+                used += c[3]
+
+        # 4. Remonta cada chunk na ordem original, marcando as omissões
+        packed_docs = []
+        for doc_idx, (doc, sentences) in enumerate(zip(docs, sentences_by_doc)):
+            parts, previous = [], None
+            for pos, sentence in enumerate(sentences):
+                if (doc_idx, pos) not in selected:
+                    continue
+                if previous is not None and pos != previous + 1:
+                    parts.append(OMISSION)
+                parts.append(sentence)
+                previous = pos
+            if parts:
+                packed_docs.append(Document(page_content=' '.join(parts), metadata=dict(doc.metadata)))
+
+        tokens_after = sum(count_tokens(doc.page_content) for doc in packed_docs)
+        with self._lock:
+            self._packed += 1
+            self._tokens_before += tokens_before
+            self._tokens_after += tokens_after
+            self._duplicates_removed += duplicates
+        log.info(
+            f"Contexto empacotado: {tokens_before} → {tokens_after} tokens "
+            f"({len(packed_docs)}/{len(docs)} chunks, {duplicates} frase(s) duplicada(s))"
+        )
+        return packed_docs, {
+            'tokens_before': tokens_before,
+            'tokens_after': tokens_after,
+            'duplicates_removed': duplicates,
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'budget': self.budget,
+                'packed': self._packed,
+                'avg_tokens_before': round(self._tokens_before / self._packed, 1) if self._packed else None,
+                'avg_tokens_after': round(self._tokens_after / self._packed, 1) if self._packed else None,
+                'duplicates_removed': self._duplicates_removed,
+            }
+
+
+context_packer = ContextPacker()
@@ -0,0 +1,112 @@
+"""
+Etapa opcional de reranking com cross-encoder local (sentence-transformers, CPU).
+
+Roda depois da busca vetorial e do reranking heurístico: todos os pares
+(pergunta, chunk) candidatos são avaliados em um único forward pass. O
+modelo fica em memória durante todo o processo e o número de pares é
+limitado pelo orçamento de latência, estimado a partir das execuções anteriores.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from logger import setup_logger
+
+log = setup_logger()
+
+CROSS_ENCODER_ENABLED = os.getenv('CROSS_ENCODER_ENABLED', 'false').lower() == 'true'
+# Modelo multilíngue (os acórdãos são em português)
+CROSS_ENCODER_MODEL = os.getenv('CROSS_ENCODER_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+# Candidatos buscados no Chroma e avaliados pelo cross-encoder
+CROSS_ENCODER_CANDIDATES = int(os.getenv('CROSS_ENCODER_CANDIDATES', '50'))
+# Orçamento de latência da etapa; limita quantos pares são avaliados
+CROSS_ENCODER_BUDGET_MS = float(os.getenv('CROSS_ENCODER_BUDGET_MS', '400'))
+
+
+class CrossEncoderReranker:
+    """Cross-encoder carregado uma vez por processo, com limite de latência."""
+
+    def __init__(
+        self,
+        model_name: str = CROSS_ENCODER_MODEL,
+        max_candidates: int = CROSS_ENCODER_CANDIDATES,
+        budget_ms: float = CROSS_ENCODER_BUDGET_MS
+    ):
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.budget_ms = budget_ms
+        self._model = None
+        self._lock = threading.Lock()
+        # Média móvel do custo por par (ms), usada para respeitar o orçamento
+        self._ms_per_pair: Optional[float] = None
+        self._calls = 0
+        self._load_seconds: Optional[float] = None
+
+    def load(self):
+        """Carrega o modelo (apenas na primeira chamada)."""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                log.info(f"Carregando cross-encoder '{self.model_name}'...")
+                start = time.perf_counter()
+                self._model = CrossEncoder(self.model_name, device='cpu')
+                self._load_seconds = round(time.perf_counter() - start, 3)
+                log.info(f"Cross-encoder carregado em {self._load_seconds}s.")
+            return self._model
+
+    def _pair_limit(self) -> int:
+        if self._ms_per_pair is None:
+            return self.max_candidates
+        return max(1, min(self.max_candidates, int(self.budget_ms / self._ms_per_pair)))
+
+    def rerank(self, query: str, chunks: List[Document], top_k: int = 5) -> List[Tuple[Document, float]]:
+        """
+        Reordena os candidatos pelo score do cross-encoder.
+
+        Args:
+            query: Pergunta do usuário
+            chunks: Candidatos já ordenados pelo reranking heurístico
+            top_k: Número de chunks a retornar
+
+        Returns:
+            Lista de (chunk, score) em ordem decrescente de score
+        """
+        if not chunks:
+            return []
+
+        model = self.load()
+        # Os melhores candidatos heurísticos entram primeiro se o orçamento cortar a lista
+        candidates = chunks[:self._pair_limit()]
+        pairs = [(query, chunk.page_content) for chunk in candidates]
+
+        start = time.perf_counter()
+        scores = model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        per_pair = elapsed_ms / len(pairs)
+        self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+        self._calls += 1
+        log.info(f"Cross-encoder: {len(pairs)} pares em {elapsed_ms:.0f}ms.")
+
+        ranked = sorted(zip(candidates, (float(s) for s in scores)), key=lambda x: x[1], reverse=True)
+        return ranked[:top_k]
+
+    def metrics(self) -> Dict:
+        return {
+            'enabled': CROSS_ENCODER_ENABLED,
+            'model': self.model_name,
+            'loaded': self._model is not None,
+            'load_seconds': self._load_seconds,
+            'max_candidates': self.max_candidates,
+            'budget_ms': self.budget_ms,
+            'ms_per_pair': round(self._ms_per_pair, 2) if self._ms_per_pair is not None else None,
+            'pair_limit': self._pair_limit(),
+            'calls': self._calls,
+        }
+
+
+cross_encoder_reranker = CrossEncoderReranker()
@@ -0,0 +1,251 @@
+"""
+Classificador determinístico da decisão e da votação de um acórdão.
+
+Lê o dispositivo da seção ACÓRDÃO ("ACORDAM os membros ... à unanimidade de
+votos, em negar provimento ao recurso ...") com padrões de frase e monta a
+lista de participantes a partir dos conselheiros citados no texto e das
+assinaturas. Devolve também uma confiança: abaixo de
+DECISAO_CONFIDENCE_THRESHOLD o extrator recorre ao LLM.
+
+O texto extraído dos PDFs costuma vir com espaços no meio das palavras
+("por maior ia", "Geo vane"), por isso as frases são comparadas sem espaços.
+Os limites de palavra do texto original são guardados: um trecho só conta se
+começa e termina em um deles ("provido" não vale dentro de "improvido").
+"""
+
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# Abaixo desta confiança a decisão é extraída pelo LLM
+DECISAO_CONFIDENCE_THRESHOLD = float(os.getenv('DECISAO_CONFIDENCE_THRESHOLD', '0.8'))
+
+# Peso de uma frase do dispositivo e de um indício fora dele
+STRONG_WEIGHT = 1.0
+WEAK_WEIGHT = 0.6
+# Penalidades quando só há indícios fracos ou a votação não foi encontrada
+WEAK_ONLY_FACTOR = 0.7
+NO_VOTACAO_FACTOR = 0.9
+
+# Dispositivo: de "ACORDAM" até o primeiro ponto final (antes de votos vencidos etc.)
+DISPOSITIVO = re.compile(r'acordam\b(.+?)(?:\.\s|\.$|$)', re.DOTALL)
+
+# Verbos do dispositivo, com os clíticos ("dar-lhe", "nega-se-lhe")
+DAR = r'(?:dar|deu|dado|dou|da|deram|dando)'
+NEGAR = r'(?:negar|negou|negado|nega|negam|negaram|negando)'
+CLITICO = r'(?:-?se)?(?:-?lhes?)?'
+
+# Padrões sobre o texto normalizado e sem espaços. Ordem importa: os trechos
+# reconhecidos são apagados antes dos padrões seguintes, para que
+# "não dar provimento", "dar provimento parcial" e "improvido" não contem
+# também como "provido". As negações vêm antes de tudo.
+# "Procedente"/"improcedente" ficam de fora: "julgar procedente o auto de
+# infração" é derrota do contribuinte, o oposto de "provido". Só a
+# procedência parcial é inequívoca.
+DECISAO_PATTERNS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('improvido', re.compile(
+        rf'nao(?:se)?{DAR}{CLITICO}(?:o)?provimento'
+        r'|nao(?:foi|sendo)?provid[oa]s?'
+    )),
+    ('parcial', re.compile(
+        rf'{DAR}{CLITICO}(?:provimentoparcial|parcialprovimento)'
+        r'|parcialmenteprovid[oa]s?|provid[oa]s?parcialmente'
+        r'|procedenciaparcial|parcialprocedencia|parcialmenteprocedentes?'
+        r'|procedentes?emparte|procedentes?parcialmente'
+    )),
+    ('improvido', re.compile(
+        rf'{NEGAR}{CLITICO}(?:o)?provimento'
+        r'|improvimento|improvid[oa]s?|desprovid[oa]s?|desprovimento'
+    )),
+    ('provido', re.compile(
+        rf'{DAR}{CLITICO}provimento|provid[oa]s?'
+    )),
+)
+# Indícios indiretos (efeito sobre a decisão recorrida), usados com peso menor
+DECISAO_HINTS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('improvido', re.compile(
+        r'(?:manter|mantendo)(?:-se)?(?:a|o)?decisao|mantid[oa]adecisao|decisaomantida'
+    )),
+    ('provido', re.compile(
+        r'(?:reformar|reformando)(?:-se)?(?:a|o)?decisao|reformad[oa]adecisao|decisaoreformada'
+    )),
+)
+VOTACAO_PATTERNS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('unanimidade', re.compile(r'unanimidade|unanime')),
+    ('maioria', re.compile(r'pormaioria|maioriadevotos|amaioria')),
+)
+
+# Listas de nomes: "Participaram do julgamento os Conselheiros a seguir nominados: A, B e C."
+# e "Votos vencidos dos Conselheiros ...: A e B."
+LISTA_CONSELHEIROS = re.compile(r'Conselheir[oa]s\b[^:.]{0,80}:\s*(.+?)(?:\s\.|\.\s|,\s*conforme\b|$)', re.IGNORECASE)
+SEPARADOR_NOMES = re.compile(r'\s*,\s*|\s+e\s+')
+PARENTESES = re.compile(r'\([^)]*\)')
+
+
+@dataclass
+class DecisionClassification:
+    """Resultado do classificador; decisao None quando nada foi reconhecido."""
+    decisao: Optional[str] = None
+    votacao: Optional[str] = None
+    participantes: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    evidencias: List[str] = field(default_factory=list)
+
+    def to_acordao_dict(self, texto_acordao: str) -> Dict:
+        """Mesmo formato do dicionário devolvido por extract_acordao_llm."""
+        return {
+            'decisao': self.decisao,
+            'votacao': self.votacao,
+            'participantes': self.participantes,
+            'texto_completo': texto_acordao,
+        }
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def _compact(text: str) -> str:
+    return text.replace(' ', '')
+
+
+def _compact_with_boundaries(text: str) -> Tuple[str, Set[int]]:
+    """
+    Texto sem espaços e as posições (no texto compacto) onde havia limite de
+    palavra: espaços, pontuação e as pontas. Espaços espúrios do PDF só
+    acrescentam limites; os verdadeiros nunca se perdem.
+    """
+    chars: List[str] = []
+    boundaries = {0}
+    for c in text:
+        if c == ' ':
+            boundaries.add(len(chars))
+            continue
+        if not c.isalnum():
+            boundaries.add(len(chars))
+            chars.append(c)
+            boundaries.add(len(chars))
+            continue
+        chars.append(c)
+    boundaries.add(len(chars))
+    return ''.join(chars), boundaries
+
+
+def _match_all(text: str, rules: Tuple[Tuple[str, re.Pattern], ...]) -> List[Tuple[str, str]]:
+    """
+    (rótulo, trecho) de cada ocorrência delimitada por limites de palavra,
+    apagando o trecho para os padrões seguintes.
+
+    Args:
+        text: Texto normalizado (_normalize), ainda com espaços
+        rules: Padrões sobre o texto sem espaços, na ordem de prioridade
+    """
+    text, boundaries = _compact_with_boundaries(text)
+    found = []
+    for label, pattern in rules:
+        spans = [
+            m.span() for m in pattern.finditer(text)
+            if m.start() in boundaries and m.end() in boundaries
+        ]
+        for start, end in spans:
+            found.append((label, text[start:end]))
+        for start, end in spans:
+            text = text[:start] + '#' * (end - start) + text[end:]
+    return found
+
+
+def _split_names(lista: str) -> List[str]:
+    names = []
+    for nome in SEPARADOR_NOMES.split(PARENTESES.sub(' ', lista)):
+        nome = ' '.join(nome.split()).strip(' .;')
+        if nome.endswith(' e'):
+            nome = nome[:-2]
+        if len(nome.split()) >= 2:
+            names.append(nome)
+    return names
+
+
+def extract_participantes(texto: str, assinaturas: Optional[List[Dict]] = None) -> List[str]:
+    """
+    Conselheiros citados no texto e nas assinaturas, sem repetição.
+
+    Nomes quebrados pelo PDF ("Geo vane") são identificados pela forma sem
+    espaços; a grafia da assinatura, quando existe, prevalece.
+    """
+    texto = ' '.join(texto.split())
+    participantes: Dict[str, str] = {}
+    for lista in LISTA_CONSELHEIROS.finditer(texto):
+        for nome in _split_names(lista.group(1)):
+            participantes.setdefault(_compact(_normalize(nome)), nome)
+
+    for assinatura in assinaturas or []:
+        nome = ' '.join((assinatura.get('nome') or '').split())
+        if not nome or 'procurador' in _normalize(assinatura.get('cargo') or ''):
+            continue
+        participantes[_compact(_normalize(nome))] = nome
+    return list(participantes.values())
+
+
+def classify_acordao(
+    texto_acordao: str,
+    assinaturas: Optional[List[Dict]] = None,
+    texto_participantes: Optional[str] = None
+) -> DecisionClassification:
+    """
+    Classifica decisão e votação a partir da seção ACÓRDÃO.
+
+    A confiança é a fração do peso das evidências que aponta para a decisão
+    vencedora, reduzida quando só há indícios fracos ou a votação não aparece.
+
+    Args:
+        texto_acordao: Texto da seção ACÓRDÃO
+        assinaturas: Assinaturas extraídas (extract_assinaturas), para os participantes
+        texto_participantes: Trecho onde procurar as listas de conselheiros; a seção
+            ACÓRDÃO termina no primeiro "Nabil", que pode estar no meio da lista
+
+    Returns:
+        DecisionClassification
+    """
+    normalized = _normalize(texto_acordao)
+    dispositivo = DISPOSITIVO.search(normalized)
+    strong_text = dispositivo.group(1) if dispositivo else normalized
+
+    scores: Dict[str, float] = {}
+    evidencias = []
+    strong = _match_all(strong_text, DECISAO_PATTERNS)
+    weight = STRONG_WEIGHT if dispositivo else WEAK_WEIGHT
+    for label, trecho in strong:
+        scores[label] = scores.get(label, 0.0) + weight
+        evidencias.append(f"{label}: {trecho}")
+    for label, trecho in _match_all(normalized, DECISAO_HINTS):
+        scores[label] = scores.get(label, 0.0) + WEAK_WEIGHT
+        evidencias.append(f"{label} (indício): {trecho}")
+
+    votacao = next(
+        (label for label, _ in _match_all(strong_text, VOTACAO_PATTERNS)),
+        None
+    )
+    participantes = extract_participantes(texto_participantes or texto_acordao, assinaturas)
+
+    if not scores:
+        return DecisionClassification(votacao=votacao, participantes=participantes)
+
+    decisao = max(scores, key=scores.get)
+    confidence = scores[decisao] / sum(scores.values())
+    if not strong or not dispositivo:
+        confidence *= WEAK_ONLY_FACTOR
+    if votacao is None:
+        confidence *= NO_VOTACAO_FACTOR
+
+    return DecisionClassification(
+        decisao=decisao,
+        votacao=votacao,
+        participantes=participantes,
+        confidence=round(confidence, 3),
+        evidencias=evidencias,
+    )
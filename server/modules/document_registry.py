@@ -0,0 +1,105 @@
+"""
+Registro de documentos já ingeridos, para deduplicação por conteúdo.
+
+Cada PDF é identificado pelo SHA-256 dos seus bytes (e pelo modo de chunking
+usado), e cada chunk pelo SHA-256 do seu texto. O ID do chunk é passado ao
+Chroma, então reenviar o mesmo acórdão ou rodar a reindexação novamente sem
+apagar o chroma_store não gera chunks duplicados nem recalcula embeddings.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from logger import setup_logger
+from modules.vectorstore_registry import PERSIST_DIR
+
+log = setup_logger()
+
+# Fica dentro do PERSIST_DIR: apagar o vectorstore também zera o registro
+REGISTRY_DB_PATH = os.path.join(PERSIST_DIR, "document_registry.sqlite3")
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    """Calcula o SHA-256 de um arquivo lendo-o em blocos."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def chunk_id_for_text(text: str) -> str:
+    """ID determinístico de um chunk: SHA-256 do seu texto."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentRegistry:
+    """Registro SQLite de PDFs e chunks já indexados."""
+
+    def __init__(self, db_path: str = REGISTRY_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: o arquivo pode ser apagado pela reindexação
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT NOT NULL,
+                chunking TEXT NOT NULL,
+                filename TEXT,
+                chunk_count INTEGER,
+                ingested_at REAL,
+                PRIMARY KEY (sha256, chunking)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                doc_sha256 TEXT NOT NULL
+            )"""
+        )
+        return conn
+
+    def is_ingested(self, sha256: str, chunking: str) -> bool:
+        """Indica se o PDF já foi indexado com o modo de chunking informado."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT 1 FROM documents WHERE sha256 = ? AND chunking = ?",
+                    (sha256, chunking)
+                ).fetchone()
+                return row is not None
+            finally:
+                conn.close()
+
+    def register(self, sha256: str, chunking: str, filename: str, chunk_ids: Iterable[str]) -> None:
+        """Registra um PDF indexado e os IDs dos chunks produzidos por ele."""
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                        (sha256, chunking, filename, len(chunk_ids), time.time())
+                    )
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                        [(cid, sha256) for cid in chunk_ids]
+                    )
+            finally:
+                conn.close()
+        log.debug(f"Documento '{filename}' registrado ({chunking}, {len(chunk_ids)} chunks).")
+
+
+document_registry = DocumentRegistry()
@@ -0,0 +1,219 @@
+"""
+Cache persistente de embeddings, chaveado pelo hash do texto e pelo nome do modelo.
+
+Fica na frente do HuggingFaceEmbeddings: textos já vistos (reindexação de um
+corpus inalterado, chunking legado e estrutural do mesmo PDF, ementas
+repetidas) não passam de novo pelo transformer. O armazenamento é SQLite com
+vetores float32 em BLOB e descarte LRU quando excede o número máximo de entradas.
+
+Só embeddings de documentos vão para o SQLite: as perguntas (embed_query) usam
+um LRU pequeno em memória, fora do lock do banco, e não dividem chaves com os
+documentos (modelos assimétricos embedam pergunta e trecho de forma diferente).
+O total de linhas é mantido em memória e os last_access dos hits são gravados
+em lote.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from logger import setup_logger
+
+log = setup_logger()
+
+# Fora do chroma_store: o cache sobrevive a uma reconstrução do vectorstore
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', './embedding_cache/embeddings.sqlite3')
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+# Perguntas recentes mantidas em memória (0 desativa)
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv('EMBEDDING_QUERY_CACHE_SIZE', '1024'))
+# Hits acumulados antes de gravar os last_access no SQLite
+ACCESS_FLUSH_SIZE = 1000
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings com cache SQLite na frente de um modelo subjacente."""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        db_path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._pending_access: Dict[str, float] = {}
+        self.query_cache_size = query_cache_size
+        self._query_lock = threading.Lock()
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_hits = 0
+        self._query_misses = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+            )
+        # Contado uma vez; depois acompanhado nas inserções e descartes
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch]
+            ).fetchall()
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        if found:
+            now = time.time()
+            self._pending_access.update((h, now) for h in found)
+            if len(self._pending_access) >= ACCESS_FLUSH_SIZE:
+                self._flush_access()
+        return found
+
+    def _flush_access(self) -> None:
+        """Grava em lote os last_access dos hits acumulados."""
+        if not self._pending_access:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                [(ts, self.model_name, h) for h, ts in self._pending_access.items()]
+            )
+        self._pending_access.clear()
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        before = self._conn.total_changes
+        with self._conn:
+            # IGNORE: outra thread pode ter gravado o mesmo texto entre a busca e aqui
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)",
+                [
+                    (self.model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now)
+                    for h, v in items.items()
+                ]
+            )
+        self._entries += self._conn.total_changes - before
+        self._evict_if_needed()
+
+    def _evict_if_needed(self) -> None:
+        excess = self._entries - self.max_entries
+        if excess <= 0:
+            return
+        # Ordem LRU correta: grava os acessos pendentes antes de escolher quem sai
+        self._flush_access()
+        # Remove um pouco além do excesso para não descartar a cada inserção
+        to_remove = excess + self.max_entries // 10
+        with self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                (to_remove,)
+            ).rowcount
+        self._entries -= removed
+        self._evictions += removed
+        log.info(f"Cache de embeddings: {removed} entradas antigas descartadas (LRU).")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [_text_hash(t) for t in texts]
+        with self._lock:
+            cached = self._lookup(hashes)
+
+        missing = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._store(computed)
+            cached.update(computed)
+
+        with self._lock:
+            self._misses += len(missing)
+            self._hits += len(texts) - len(missing)
+
+        if texts:
+            log.debug(f"Cache de embeddings: {len(texts) - len(missing)}/{len(texts)} hits.")
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache_size <= 0:
+            return self.underlying.embed_query(text)
+
+        with self._query_lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+                self._query_hits += 1
+                return vector
+            self._query_misses += 1
+
+        vector = self.underlying.embed_query(text)
+        with self._query_lock:
+            self._query_cache[text] = vector
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return vector
+
+    def stats(self) -> Dict:
+        """Retorna hits, misses, taxa de acerto e número de entradas em disco e do cache de perguntas."""
+        with self._query_lock:
+            query_total = self._query_hits + self._query_misses
+            queries = {
+                'entries': len(self._query_cache),
+                'max_entries': self.query_cache_size,
+                'hits': self._query_hits,
+                'misses': self._query_misses,
+                'hit_rate': round(self._query_hits / query_total, 3) if query_total else None,
+            }
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'path': self.db_path,
+                'entries': self._entries,
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 3) if total else None,
+                'evictions': self._evictions,
+                'queries': queries,
+            }
@@ -0,0 +1,162 @@
+"""
+Cache de extração endereçado por conteúdo.
+
+Dois níveis, ambos chaveados pelo SHA-256 dos bytes do PDF:
+1. Texto: texto limpo e offsets das páginas, por versão do parser
+   (pdf_to_text + clean_text). Evita reler o PDF.
+2. Resultado: offsets das seções e o AcordaoDocumento validado, por versão
+   do extrator (regex + prompt + limiar do classificador de decisão) e modelo
+   LLM. Evita regex e chamadas ao LLM.
+
+Um PDF alterado com o mesmo nome gera outro hash e é reprocessado; mudar a
+lógica de extração (nova versão) reaproveita o texto já lido.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from server.logger import setup_logger
+
+log = setup_logger(__name__)
+
+# Fora do chroma_store: o cache sobrevive a uma reconstrução do vectorstore
+EXTRACTION_CACHE_PATH = os.getenv('EXTRACTION_CACHE_PATH', './extraction_cache/extractions.sqlite3')
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def pdf_sha256(pdf_path: Path) -> str:
+    """SHA-256 dos bytes do PDF, lido em blocos."""
+    hasher = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class ExtractionCache:
+    """Cache SQLite de textos e resultados de extração."""
+
+    def __init__(self, db_path: str = EXTRACTION_CACHE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._hits = {'text': 0, 'result': 0}
+        self._misses = {'text': 0, 'result': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: usado por processos e threads do reindex
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS texts (
+                sha256 TEXT NOT NULL,
+                parser_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                page_offsets TEXT NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (sha256, parser_version)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                sha256 TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                llm_model TEXT NOT NULL,
+                sections TEXT NOT NULL,
+                documento TEXT NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (sha256, extractor_version, llm_model)
+            )"""
+        )
+        return conn
+
+    def _count(self, kind: str, hit: bool) -> None:
+        with self._lock:
+            (self._hits if hit else self._misses)[kind] += 1
+
+    def get_text(self, sha256: str, parser_version: str) -> Optional[Tuple[str, List[int]]]:
+        """Texto limpo e offsets das páginas de um PDF já lido."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT text, page_offsets FROM texts WHERE sha256 = ? AND parser_version = ?",
+                (sha256, parser_version)
+            ).fetchone()
+        finally:
+            conn.close()
+        self._count('text', row is not None)
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put_text(self, sha256: str, parser_version: str, text: str, page_offsets: List[int]) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?, ?)",
+                    (sha256, parser_version, text, json.dumps(page_offsets), time.time())
+                )
+        finally:
+            conn.close()
+
+    def get_result(self, sha256: str, extractor_version: str, llm_model: str) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Resultado validado de uma extração anterior.
+
+        Returns:
+            Tupla (offsets das seções, AcordaoDocumento serializado) ou None
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT sections, documento FROM results "
+                "WHERE sha256 = ? AND extractor_version = ? AND llm_model = ?",
+                (sha256, extractor_version, llm_model)
+            ).fetchone()
+        finally:
+            conn.close()
+        self._count('result', row is not None)
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put_result(
+        self,
+        sha256: str,
+        extractor_version: str,
+        llm_model: str,
+        sections: Dict,
+        documento: Dict
+    ) -> None:
+        """Armazena uma extração bem-sucedida (falhas não são cacheadas)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        sha256, extractor_version, llm_model,
+                        json.dumps(sections), json.dumps(documento, ensure_ascii=False, default=str),
+                        time.time()
+                    )
+                )
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'hits': dict(self._hits),
+                'misses': dict(self._misses),
+                'path': self.db_path,
+            }
+
+
+extraction_cache = ExtractionCache()
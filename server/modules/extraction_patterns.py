@@ -0,0 +1,162 @@
+"""
+Registro de expressões regulares da extração de acórdãos, compiladas uma vez.
+
+Também fornece o scanner de seções: uma única passada sobre o texto localiza
+os marcadores E M E N T A, A C Ó R D Ã O e o fim do acórdão (assinaturas /
+"Sala das Sessões") e devolve os offsets usados pelos extratores de campos,
+em vez de cada extrator repetir buscas DOTALL sobre o documento inteiro.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# ===== Limpeza do texto =====
+BLANK_LINES = re.compile(r'\n\s*\n')
+MULTIPLE_SPACES = re.compile(r' +')
+PAGE_HEADER = re.compile(r'ESTADO DO ACRE\s+Secretaria.*?Conselho.*?\n', re.IGNORECASE)
+
+# ===== Metadados do cabeçalho =====
+ACORDAO_NUMERO = re.compile(r'ACÓRDÃO\s+N[º°]\s*(\d+/\d{4})', re.IGNORECASE)
+PROCESSO = re.compile(r'PROCESSO\s+N[º°]\s*([\d/]+)', re.IGNORECASE)
+RECORRENTE = re.compile(r'RECORRENTE:\s*(.+?)(?:\n|ADVOGADO)', re.IGNORECASE)
+ADVOGADO = re.compile(r'ADVOGADO[S]?:\s*(.+?)(?:\n|RECORRIDA)', re.IGNORECASE)
+RECORRIDA = re.compile(r'RECORRIDA:\s*(.+?)(?:\n|PROCURADOR)', re.IGNORECASE)
+PROCURADOR_FISCAL = re.compile(r'PROCURADOR\s+FISCAL:\s*(.+?)(?:\n|RELATOR)', re.IGNORECASE)
+RELATOR = re.compile(r'(?:CONSELHEIRO\s+)?RELATOR:\s*(?:Cons\.\s*)?(.+?)(?:\n|REDATOR|DATA)', re.IGNORECASE)
+RELATOR_TIPO = re.compile(r'(Cons\.|CONSELHEIRO\s+TITULAR)', re.IGNORECASE)
+RELATOR_TIPO_PREFIX = re.compile(r'(Cons\.|CONSELHEIRO\s+TITULAR)\s*', re.IGNORECASE)
+REDATOR = re.compile(r'REDATOR\s+DO\s+AC[ÓO]RD[ÃA]O[:\s]+(?:Cons\.\s*)?(.+?)(?:\n|DATA)', re.IGNORECASE)
+REDATOR_TIPO = re.compile(r'(Cons\.|CONSELHEIRO)', re.IGNORECASE)
+REDATOR_TIPO_PREFIX = re.compile(r'(Cons\.|CONSELHEIRO)\s*', re.IGNORECASE)
+DATA_EXTENSO = re.compile(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', re.IGNORECASE)
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
+    'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
+    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
+
+# ===== Ementa =====
+# Ordem importa: o primeiro tributo encontrado na primeira linha é o adotado
+TRIBUTOS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('ICMS', re.compile(r'\bICMS\b', re.IGNORECASE)),
+    ('IPVA', re.compile(r'\bIPVA\b', re.IGNORECASE)),
+    ('ITCD', re.compile(r'\bITCD\b', re.IGNORECASE)),
+)
+TEMAS: Dict[str, re.Pattern] = {
+    'BENEFÍCIO FISCAL': re.compile(r'BENEF[IÍ]CIO\s+FISCAL', re.IGNORECASE),
+    'ISENÇÃO': re.compile(r'ISEN[ÇC][ÃA]O', re.IGNORECASE),
+    'SUBSTITUIÇÃO TRIBUTÁRIA': re.compile(r'SUBSTITUI[ÇC][ÃA]O\s+TRIBUT[ÁA]RIA', re.IGNORECASE),
+    'OBRIGAÇÃO ACESSÓRIA': re.compile(r'OBRIGA[ÇC][ÃA]O\s+ACESS[ÓO]RIA', re.IGNORECASE),
+}
+
+# ===== Resposta do LLM =====
+JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+# ===== Assinaturas (últimas linhas do documento) =====
+ASSINATURA_PRESIDENTE = re.compile(r'(\w[\w\s]+?)\s+Presidente', re.IGNORECASE)
+ASSINATURA_CONSELHEIRO = re.compile(
+    r'(\w[\w\s]+?)\s+(Conselheiro\s*-?\s*(?:Relator|Suplente|Redator(?:\s+do\s+Ac[óo]rd[ãa]o)?))',
+    re.IGNORECASE
+)
+ASSINATURA_PROCURADOR = re.compile(r'(\w[\w\s]+?)\s+Procurador\s+Fiscal', re.IGNORECASE)
+
+# ===== Marcadores de seção =====
+# Para texto já em maiúsculas (detect_section_from_content): sem IGNORECASE o
+# motor salta direto para as ocorrências da primeira letra, bem mais rápido
+EMENTA_MARKER = re.compile(r'E\s*M\s*E\s*N\s*T\s*A')
+ACORDAO_MARKER = re.compile(r'A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O')
+# Uma passada: cada marcador seguido dos espaços que o separam do conteúdo.
+# Roda sobre o texto em minúsculas: sem IGNORECASE, o lookahead pela primeira
+# letra descarta rapidamente as posições que não podem iniciar um marcador.
+SECTION_SCANNER = re.compile(
+    r'(?=[eans])(?:'
+    r'(?P<ementa>e\s*m\s*e\s*n\s*t\s*a\s*)'
+    r'|(?P<acordao>a\s*c\s*[óo]\s*r\s*d\s*[ãa]\s*o\s*)'
+    r'|(?P<fim>nabil|sala\s+das\s+sess))'
+)
+# Para textos cujo lower() muda o comprimento (os offsets deixariam de valer)
+SECTION_SCANNER_IGNORECASE = re.compile(
+    r'(?P<ementa>E\s*M\s*E\s*N\s*T\s*A\s*)'
+    r'|(?P<acordao>A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O\s*)'
+    r'|(?P<fim>Nabil|Sala\s+das\s+Sess)',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class SectionOffsets:
+    """Spans (início, fim) do conteúdo de cada seção no texto; None se ausente."""
+    ementa: Optional[Tuple[int, int]] = None
+    acordao: Optional[Tuple[int, int]] = None
+
+    def ementa_text(self, text: str) -> Optional[str]:
+        return text[self.ementa[0]:self.ementa[1]].strip() if self.ementa else None
+
+    def acordao_text(self, text: str) -> Optional[str]:
+        return text[self.acordao[0]:self.acordao[1]].strip() if self.acordao else None
+
+
+def scan_sections(text: str) -> SectionOffsets:
+    """
+    Localiza as seções do acórdão em uma única passada.
+
+    Equivale às buscas anteriores
+    'E M E N T A\\s*(.+?)A C Ó R D Ã O' e 'A C Ó R D Ã O\\s*(.+?)(?:Nabil|Sala das Sess)':
+    a ementa vai do primeiro marcador EMENTA até o primeiro marcador ACÓRDÃO
+    seguinte; o acórdão vai do primeiro marcador ACÓRDÃO até o primeiro
+    marcador de fim seguinte.
+
+    Args:
+        text: Texto limpo do PDF
+
+    Returns:
+        SectionOffsets com os spans encontrados
+    """
+    # Como nas regex originais, o conteúdo começa após os espaços que seguem o
+    # marcador e tem ao menos um caractere. Só se não houver marcador final
+    # depois disso vale um que comece logo após os espaços (conteúdo = espaços).
+    ementa_start = ementa_end = ementa_fallback = None
+    acordao_start = acordao_end = acordao_fallback = None
+    ementa_space = acordao_space = False
+
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        matches = SECTION_SCANNER.finditer(lowered)
+    else:
+        matches = SECTION_SCANNER_IGNORECASE.finditer(text)
+
+    for match in matches:
+        kind = match.lastgroup
+        has_space = match.end() > match.start() + len(match.group().rstrip())
+        if kind == 'ementa':
+            if ementa_start is None:
+                ementa_start, ementa_space = match.end(), has_space
+            continue
+
+        if kind == 'acordao':
+            if ementa_start is not None and ementa_end is None:
+                if match.start() > ementa_start:
+                    ementa_end = match.start()
+                elif ementa_space and ementa_fallback is None:
+                    ementa_fallback = match.start()
+            if acordao_start is None:
+                acordao_start, acordao_space = match.end(), has_space
+        elif acordao_start is not None and acordao_end is None:
+            if match.start() > acordao_start:
+                acordao_end = match.start()
+            elif acordao_space and acordao_fallback is None:
+                acordao_fallback = match.start()
+
+        if ementa_end is not None and acordao_end is not None:
+            break
+
+    if ementa_end is None:
+        ementa_end = ementa_fallback
+    if acordao_end is None:
+        acordao_end = acordao_fallback
+
+    return SectionOffsets(
+        ementa=(ementa_start, ementa_end) if ementa_end is not None else None,
+        acordao=(acordao_start, acordao_end) if acordao_end is not None else None,
+    )
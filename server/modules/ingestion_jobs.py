@@ -0,0 +1,180 @@
+"""
+Fila de jobs de ingestão de PDFs processada por um pool de workers.
+
+O endpoint de upload apenas salva os arquivos e enfileira um job; a extração
+das páginas, o chunking, os embeddings e a escrita no Chroma acontecem aqui,
+fora da requisição HTTP. O progresso por arquivo fica disponível em GET /jobs/{id}.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional
+
+from logger import setup_logger
+from modules.pdf_handlers import SavedPdf, load_pdf_documents
+from modules.load_vectorstore import add_page_documents
+from modules.document_registry import document_registry
+
+log = setup_logger()
+
+# Workers que processam jobs em paralelo (o Chroma serializa as escritas internamente)
+INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', '1'))
+# Quantos jobs finalizados são mantidos em memória para consulta
+MAX_TRACKED_JOBS = 200
+# Jobs nesses status podem ser descartados; os demais ainda estão na fila ou rodando
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+@dataclass
+class FileProgress:
+    """Progresso de um arquivo dentro de um job."""
+    filename: str
+    status: str = "queued"  # queued, loading, indexing, done, duplicate, failed
+    sha256: Optional[str] = None
+    pages: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestionJob:
+    """Job de ingestão de um lote de PDFs."""
+    id: str
+    files: List[FileProgress]
+    uploads: List[SavedPdf] = field(repr=False)
+    status: str = "queued"  # queued, running, completed, failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    stats: Dict = field(default_factory=dict)  # chunks novos/duplicados, chunks/s
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop('uploads')
+        done = sum(1 for f in self.files if f.status in ("done", "duplicate", "failed"))
+        data['progress'] = {'done': done, 'total': len(self.files)}
+        return data
+
+
+class IngestionJobManager:
+    """Enfileira e executa jobs de ingestão em um pool de threads."""
+
+    def __init__(
+        self,
+        on_complete: Optional[Callable] = None,
+        max_workers: int = INGESTION_WORKERS
+    ):
+        """
+        Args:
+            on_complete: Chamado com o vectorstore atualizado ao fim de cada job
+                que indexou ao menos um arquivo.
+            max_workers: Número de jobs processados simultaneamente.
+        """
+        self._on_complete = on_complete
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="ingestion-worker"
+        )
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, uploads: List[SavedPdf]) -> IngestionJob:
+        """
+        Cria um job para os PDFs já salvos em disco e o coloca na fila.
+
+        Args:
+            uploads: PDFs salvos (caminho e SHA-256) a indexar.
+
+        Returns:
+            O job criado (status 'queued').
+        """
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            files=[FileProgress(filename=u.filename, sha256=u.sha256) for u in uploads],
+            uploads=list(uploads)
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+
+        self._pool.submit(self._run, job)
+        log.info(f"Job de ingestão {job.id} enfileirado com {len(uploads)} arquivo(s).")
+        return job
+
+    def _evict_finished(self) -> None:
+        """Descarta os jobs finalizados mais antigos acima de MAX_TRACKED_JOBS (com o lock)."""
+        excess = len(self._jobs) - MAX_TRACKED_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in TERMINAL_STATUSES]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestionJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        vectorstore = None
+
+        try:
+            # 1. Extrai as páginas de cada arquivo
+            loaded = []
+            for upload, progress in zip(job.uploads, job.files):
+                # PDF idêntico já indexado: não extrai nem recalcula embeddings
+                if document_registry.is_ingested(upload.sha256, 'legado'):
+                    progress.status = "duplicate"
+                    continue
+
+                progress.status = "loading"
+                documents = load_pdf_documents(upload.path, upload.filename)
+                if not documents:
+                    progress.status = "failed"
+                    progress.error = "Nenhum documento válido pôde ser extraído do PDF."
+                    continue
+
+                progress.pages = len(documents)
+                progress.status = "indexing"
+                loaded.append((documents, upload.sha256, progress))
+
+            # 2. Uma única ingestão em lote para todos os arquivos do job
+            if loaded:
+                try:
+                    vectorstore, job.stats = add_page_documents(
+                        [(documents, sha256) for documents, sha256, _ in loaded]
+                    )
+                    for _, _, progress in loaded:
+                        progress.status = "done"
+                except Exception as e:
+                    log.exception(f"Falha ao indexar os arquivos do job {job.id}.")
+                    for _, _, progress in loaded:
+                        progress.status = "failed"
+                        progress.error = str(e)
+
+            if vectorstore is not None and self._on_complete:
+                self._on_complete(vectorstore)
+
+            succeeded = any(f.status in ("done", "duplicate") for f in job.files)
+            job.status = "completed" if succeeded else "failed"
+            if not succeeded:
+                job.error = "Nenhum documento válido pôde ser processado."
+        except Exception as e:
+            log.exception(f"Erro inesperado no job de ingestão {job.id}.")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            log.info(
+                f"Job {job.id} finalizado com status '{job.status}' "
+                f"em {job.finished_at - job.started_at:.1f}s."
+            )
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
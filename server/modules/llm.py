@@ -1,18 +1,28 @@
 import os
+import threading
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from langchain.chains.question_answering import load_qa_chain
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
-from typing import List
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from typing import List, Optional
+
+from modules.cross_encoder import CROSS_ENCODER_ENABLED, CROSS_ENCODER_CANDIDATES
+from modules.context_packer import count_tokens
+from modules.llm_providers import build_chat_model
 
 # Carrega as variáveis do arquivo .env para o ambiente do sistema
 load_dotenv()
 
-# Prompt especializado para documentos jurídicos (acórdãos SEFAZ Acre)
-JURIDICAL_PROMPT_TEMPLATE = """Você é um assistente jurídico especializado em acórdãos da SEFAZ Acre (Secretaria de Fazenda do Estado do Acre).
+# Prompt especializado para documentos jurídicos (acórdãos SEFAZ Acre).
+# As regras vão na mensagem de sistema, idêntica em todas as perguntas, para
+# que provedores com cache de prefixo a reaproveitem; só a mensagem do usuário
+# (contexto + pergunta) muda a cada chamada.
+JURIDICAL_SYSTEM_PROMPT = """Você é um assistente jurídico especializado em acórdãos da SEFAZ Acre (Secretaria de Fazenda do Estado do Acre).
 
 REGRAS OBRIGATÓRIAS (siga rigorosamente):
 1. Base suas respostas EXCLUSIVAMENTE nos trechos de documentos fornecidos abaixo
@@ -29,11 +39,20 @@ FORMATO DE CITAÇÃO CORRETO:
 
 EXEMPLO DE BOA RESPOSTA:
 Pergunta: "Qual a decisão sobre isenção de ICMS para produtos da cesta básica?"
-Resposta: "O Acórdão-2017-145.pdf (página 3) decidiu pelo IMPROVIMENTO do recurso, mantendo a autuação fiscal. O colegiado entendeu que 'não se aplica isenção de ICMS a operações internas destinadas a consumidor final, conforme artigo 5º da Lei Estadual 1234/2010' (Ementa, página 1). A decisão foi por unanimidade, com participação dos conselheiros Nabil Ibrahim Chamchoum, Breno Geovane Azevedo Caetano e Luiz Rogério Amaral Colturato."
+Resposta: "O Acórdão-2017-145.pdf (página 3) decidiu pelo IMPROVIMENTO do recurso, mantendo a autuação fiscal. O colegiado entendeu que 'não se aplica isenção de ICMS a operações internas destinadas a consumidor final, conforme artigo 5º da Lei Estadual 1234/2010' (Ementa, página 1). A decisão foi por unanimidade, com participação dos conselheiros Nabil Ibrahim Chamchoum, Breno Geovane Azevedo Caetano e Luiz Rogério Amaral Colturato.\""""
 
----
+# Variante compacta: as mesmas regras de ancoragem e citação, sem o exemplo
+JURIDICAL_SYSTEM_PROMPT_COMPACT = """Você é um assistente jurídico especializado em acórdãos da SEFAZ Acre.
 
-CONTEXTO DOS DOCUMENTOS (use APENAS estas informações):
+REGRAS OBRIGATÓRIAS:
+1. Responda EXCLUSIVAMENTE com base nos trechos fornecidos; nunca invente nem infira
+2. SEMPRE cite a fonte: "Conforme [nome do documento] (página [X]): '[trecho literal relevante]'"
+3. Use terminologia jurídica: "recorrente", "decisão colegiada", "provimento", "improvimento", "ementa"
+4. Informações conflitantes: mencione ambas, cada uma com sua fonte
+5. Sem informação suficiente, responda: "Não há informações suficientes nos documentos indexados para responder esta questão"
+6. Copie números de acórdãos e processos exatamente como aparecem no documento"""
+
+JURIDICAL_USER_TEMPLATE = """CONTEXTO DOS DOCUMENTOS (use APENAS estas informações):
 {context}
 
 ---
@@ -45,40 +64,140 @@ PERGUNTA DO USUÁRIO:
 
 RESPOSTA FUNDAMENTADA (com citações obrigatórias das fontes):"""
 
-def get_llm_chain(vectorstore):
+PROMPT_VARIANTS = {
+    'full': JURIDICAL_SYSTEM_PROMPT,
+    'compact': JURIDICAL_SYSTEM_PROMPT_COMPACT,
+}
+# Variante usada quando a requisição não escolhe uma
+PROMPT_VARIANT = os.getenv('PROMPT_VARIANT', 'full')
+
+# Número de chunks buscados no vectorstore (reranking será aplicado depois no query_handlers).
+# O reranker é vetorizado, então valores de 100-200 cabem no mesmo orçamento de latência.
+RETRIEVAL_K = int(os.getenv('RETRIEVAL_K', '8'))
+if CROSS_ENCODER_ENABLED:
+    # Com o cross-encoder, busca mais largo e deixa o modelo escolher os 5 melhores
+    RETRIEVAL_K = max(RETRIEVAL_K, CROSS_ENCODER_CANDIDATES)
+
+
+def build_llm() -> BaseChatModel:
     """
-    Cria e configura a cadeia de Pergunta e Resposta com Recuperação (RAG).
-    Usa prompt especializado para documentos jurídicos com ancoragem obrigatória em fontes.
-    Reranking será aplicado no query_handlers.py.
+    Inicializa o LLM (cérebro) do provedor configurado em LLM_PROVIDER:
+    Groq (padrão, LLaMA 3.3), endpoint local compatível com OpenAI ou o
+    modelo fake determinístico para testes de carga offline.
     """
-    # 1. Inicializa o LLM (cérebro)
-    # Pega a chave da API do ambiente e configura o modelo LLaMA3 via Groq.
-    llm = ChatGroq(
-        groq_api_key=os.getenv('GROQ_API_KEY'),
-        model_name='llama-3.3-70b-versatile',  # Modelo atualizado
-        temperature=0.1  # Reduzido para 0.1 para respostas mais determinísticas e precisas
-    )
+    # Temperatura 0.1 para respostas mais determinísticas e precisas
+    return build_chat_model(temperature=0.1)
 
-    # 2. Cria o Recuperador padrão
-    # Busca 8 chunks (reranking será aplicado depois no query_handlers)
-    retriever = vectorstore.as_retriever(search_kwargs={'k': 8})
 
-    # 3. Cria o prompt customizado
-    prompt = PromptTemplate(
-        template=JURIDICAL_PROMPT_TEMPLATE,
-        input_variables=["context", "question"]
-    )
+def build_prompt(variant: str = PROMPT_VARIANT) -> ChatPromptTemplate:
+    """
+    Cria o prompt jurídico: mensagem de sistema fixa + mensagem do usuário.
+
+    Args:
+        variant: 'full' (regras + exemplo) ou 'compact'.
 
-    # 4. Monta a Cadeia Final com prompt customizado
-    # Une o cérebro (llm) e o bibliotecário (retriever) em uma única cadeia.
-    # 'chain_type="stuff"' significa que ele vai "enfiar" os trechos encontrados
-    # diretamente no prompt do LLM.
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
+    Raises:
+        ValueError: variante desconhecida.
+    """
+    if variant not in PROMPT_VARIANTS:
+        raise ValueError(f"Variante de prompt desconhecida: '{variant}' (use {', '.join(PROMPT_VARIANTS)})")
+    return ChatPromptTemplate.from_messages([
+        ("system", PROMPT_VARIANTS[variant]),
+        ("human", JURIDICAL_USER_TEMPLATE),
+    ])
+
+
+_PROMPTS = {}
+
+
+def get_prompt(variant: str) -> ChatPromptTemplate:
+    """Prompt já construído da variante (reaproveitado entre perguntas)."""
+    if variant not in _PROMPTS:
+        _PROMPTS[variant] = build_prompt(variant)
+    return _PROMPTS[variant]
+
+
+class PromptTokenStats:
+    """Tokens de prompt por variante: tamanho da mensagem de sistema e média por pergunta."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {variant: 0 for variant in PROMPT_VARIANTS}
+        self._tokens = {variant: 0 for variant in PROMPT_VARIANTS}
+        # Medido uma vez: é o custo fixo de cada variante em toda pergunta
+        self.system_tokens = {variant: count_tokens(text) for variant, text in PROMPT_VARIANTS.items()}
+
+    def record(self, variant: str, messages: List[BaseMessage], usage: Optional[dict] = None) -> int:
+        """
+        Registra os tokens de prompt de uma chamada ao LLM.
+
+        Args:
+            variant: Variante de prompt usada.
+            messages: Mensagens enviadas.
+            usage: usage_metadata da resposta, se o provedor informar.
+
+        Returns:
+            Tokens de prompt (os do provedor ou, sem eles, a estimativa).
+        """
+        if usage and usage.get('input_tokens'):
+            tokens = usage['input_tokens']
+        else:
+            tokens = sum(count_tokens(str(m.content)) for m in messages)
+        with self._lock:
+            self._requests[variant] += 1
+            self._tokens[variant] += tokens
+        return tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'default_variant': PROMPT_VARIANT,
+                'variants': {
+                    variant: {
+                        'system_tokens': self.system_tokens[variant],
+                        'requests': self._requests[variant],
+                        'avg_prompt_tokens': (
+                            round(self._tokens[variant] / self._requests[variant], 1)
+                            if self._requests[variant] else None
+                        ),
+                    }
+                    for variant in PROMPT_VARIANTS
+                },
+            }
+
+
+prompt_token_stats = PromptTokenStats()
+
+
+def build_combine_documents_chain(llm=None, prompt: ChatPromptTemplate = None):
+    """
+    Cria a cadeia que "enfia" os trechos encontrados diretamente no prompt do LLM
+    ('stuff'). Não depende do vectorstore, então pode ser reaproveitada entre
+    atualizações da coleção.
+    """
+    return load_qa_chain(
+        llm=llm or build_llm(),
         chain_type='stuff',
-        retriever=retriever,
-        return_source_documents=True,  # Importante: retorna os trechos usados como fonte
-        chain_type_kwargs={"prompt": prompt}  # Usa o prompt customizado
+        prompt=prompt or build_prompt()
     )
 
-    return qa_chain
\ No newline at end of file
+
+def get_llm_chain(vectorstore, combine_documents_chain=None) -> RetrievalQA:
+    """
+    Cria e configura a cadeia de Pergunta e Resposta com Recuperação (RAG).
+    Usa prompt especializado para documentos jurídicos com ancoragem obrigatória em fontes.
+    Reranking será aplicado no query_handlers.py.
+
+    Args:
+        vectorstore: Vectorstore usado pelo recuperador.
+        combine_documents_chain: Cadeia LLM+prompt já construída. Se None, uma nova é criada.
+    """
+    # 1. Cria o Recuperador padrão
+    retriever = vectorstore.as_retriever(search_kwargs={'k': RETRIEVAL_K})
+
+    # 2. Monta a Cadeia Final unindo o cérebro (llm + prompt) e o bibliotecário (retriever)
+    return RetrievalQA(
+        combine_documents_chain=combine_documents_chain or build_combine_documents_chain(),
+        retriever=retriever,
+        return_source_documents=True  # Importante: retorna os trechos usados como fonte
+    )
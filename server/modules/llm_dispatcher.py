@@ -0,0 +1,280 @@
+"""
+Despachante assíncrono de chamadas ao LLM para a extração em lote.
+
+Todas as chamadas passam por um único event loop em uma thread de fundo, com:
+- token bucket de requisições e de tokens por minuto (limites da conta Groq);
+- limite de requisições simultâneas;
+- novas tentativas com backoff exponencial e jitter em 429, 5xx e erros de
+  conexão, respeitando o cabeçalho Retry-After.
+
+O código síncrono (AcordaoExtractor, pools de threads do reindex) usa
+complete(); código assíncrono pode aguardar acomplete() diretamente no loop
+do despachante. O provedor (Groq, endpoint compatível com OpenAI ou fake)
+vem de LLM_PROVIDER (ver llm_providers.py); GROQ_BASE_URL permite apontar o
+Groq para um servidor stub local (ver llm_stub_server.py).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from server.logger import setup_logger
+from server.modules.llm_providers import LLM_PROVIDER, LLMBackendError, create_backend
+
+load_dotenv()
+log = setup_logger(__name__)
+
+# Limites da conta (llama-3.3-70b-versatile no plano gratuito: 30 RPM, 12k TPM); 0 = sem limite
+GROQ_RPM = float(os.getenv('GROQ_RPM', '30'))
+GROQ_TPM = float(os.getenv('GROQ_TPM', '12000'))
+GROQ_MAX_IN_FLIGHT = int(os.getenv('GROQ_MAX_IN_FLIGHT', '8'))
+GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', '5'))
+GROQ_RETRY_BASE_SECONDS = float(os.getenv('GROQ_RETRY_BASE_SECONDS', '1.0'))
+GROQ_RETRY_MAX_SECONDS = float(os.getenv('GROQ_RETRY_MAX_SECONDS', '30'))
+GROQ_TIMEOUT_SECONDS = float(os.getenv('GROQ_TIMEOUT_SECONDS', '60'))
+
+# Status HTTP que valem nova tentativa
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira de tokens (~4 caracteres por token), usada antes da resposta."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Token bucket assíncrono: `rate_per_minute` unidades repostas por minuto,
+    acumulando até `capacity` (padrão: um minuto de cota).
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """
+        Aguarda até haver `amount` unidades e as consome.
+
+        Returns:
+            Segundos de espera
+        """
+        if self.unlimited:
+            return 0.0
+        # Pedidos maiores que a capacidade esperariam para sempre
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # O lock mantém a ordem de chegada: quem espera não é ultrapassado
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return waited
+                delay = (amount - self._level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, delta: float) -> None:
+        """Corrige o consumo (delta > 0 cobra mais, < 0 devolve); pode ficar negativo."""
+        if self.unlimited:
+            return
+        self._refill()
+        self._level = min(self.capacity, self._level - delta)
+
+
+class LLMDispatcher:
+    """Chamadas de chat ao LLM com limite de taxa, concorrência e novas tentativas."""
+
+    def __init__(
+        self,
+        provider: str = LLM_PROVIDER,
+        base_url: Optional[str] = None,
+        rpm: float = GROQ_RPM,
+        tpm: float = GROQ_TPM,
+        max_in_flight: int = GROQ_MAX_IN_FLIGHT,
+        max_retries: int = GROQ_MAX_RETRIES,
+        timeout: float = GROQ_TIMEOUT_SECONDS
+    ):
+        self.provider = provider
+        self.base_url = base_url
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max(0, max_retries)
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backend = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._request_bucket: Optional[TokenBucket] = None
+        self._token_bucket: Optional[TokenBucket] = None
+
+        self._requests = 0
+        self._failures = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._in_flight = 0
+        self._max_in_flight_seen = 0
+        self._tokens_used = 0
+        self._throttle_seconds = 0.0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Sobe (uma vez) o event loop da thread de fundo e os objetos presos a ele."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-dispatcher", daemon=True).start()
+
+                async def _init():
+                    self._semaphore = asyncio.Semaphore(self.max_in_flight)
+                    self._request_bucket = TokenBucket(self.rpm)
+                    self._token_bucket = TokenBucket(self.tpm)
+                    # Sem novas tentativas no cliente: são feitas aqui, passando pelo limitador
+                    self._backend = create_backend(self.provider, self.base_url, self.timeout)
+
+                asyncio.run_coroutine_threadsafe(_init(), loop).result()
+                self._loop = loop
+                log.info(
+                    f"Despachante LLM iniciado ({self.provider}, {self.rpm:g} req/min, {self.tpm:g} tokens/min, "
+                    f"{self.max_in_flight} simultâneas)"
+                )
+            return self._loop
+
+    def _retry_delay(self, attempt: int, error: LLMBackendError) -> float:
+        """Retry-After do servidor, se houver; senão backoff exponencial com jitter total."""
+        if error.retry_after:
+            try:
+                return min(float(error.retry_after), GROQ_RETRY_MAX_SECONDS) + random.uniform(0, GROQ_RETRY_BASE_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, min(GROQ_RETRY_MAX_SECONDS, GROQ_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.1,
+        max_tokens: int = 500
+    ) -> str:
+        """
+        Envia uma conversa ao LLM respeitando os limites (deve rodar no loop do despachante).
+
+        Args:
+            messages: Mensagens no formato da API de chat
+            model: Nome do modelo no provedor
+            temperature: Temperatura de amostragem
+            max_tokens: Máximo de tokens da resposta
+
+        Returns:
+            Conteúdo da resposta do modelo
+
+        Raises:
+            LLMBackendError: erro não recuperável ou tentativas esgotadas
+        """
+        estimated = sum(estimate_tokens(m['content']) for m in messages) + max_tokens
+
+        for attempt in range(self.max_retries + 1):
+            throttled = await self._request_bucket.acquire(1)
+            throttled += await self._token_bucket.acquire(estimated)
+
+            async with self._semaphore:
+                with self._lock:
+                    self._requests += 1
+                    self._throttle_seconds += throttled
+                    self._in_flight += 1
+                    self._max_in_flight_seen = max(self._max_in_flight_seen, self._in_flight)
+                try:
+                    content, used = await self._backend.complete(messages, model, temperature, max_tokens)
+                except LLMBackendError as e:
+                    status = e.status_code
+                    retryable = status is None or status in RETRYABLE_STATUS
+                    with self._lock:
+                        if status == 429:
+                            self._rate_limited += 1
+                        if not retryable or attempt == self.max_retries:
+                            self._failures += 1
+                    if not retryable or attempt == self.max_retries:
+                        raise
+                    delay = self._retry_delay(attempt, e)
+                    with self._lock:
+                        self._retries += 1
+                    log.warning(
+                        f"LLM {status or 'sem conexão'}; nova tentativa {attempt + 1}/{self.max_retries} "
+                        f"em {delay:.1f}s"
+                    )
+                else:
+                    used = used or estimated
+                    self._token_bucket.adjust(used - estimated)
+                    with self._lock:
+                        self._tokens_used += used
+                    return content
+                finally:
+                    with self._lock:
+                        self._in_flight -= 1
+
+            # Espera fora do semáforo: não ocupa vaga de requisição em andamento
+            await asyncio.sleep(delay)
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.1,
+        max_tokens: int = 500
+    ) -> str:
+        """Versão síncrona de acomplete, segura para chamar de várias threads."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self.acomplete(messages, model, temperature, max_tokens), loop
+        )
+        return future.result()
+
+    def submit(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.1,
+        max_tokens: int = 500
+    ):
+        """Agenda a chamada e devolve um concurrent.futures.Future (lotes sem threads extras)."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(
+            self.acomplete(messages, model, temperature, max_tokens), loop
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'failures': self._failures,
+                'retries': self._retries,
+                'rate_limited': self._rate_limited,
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight_seen,
+                'tokens_used': self._tokens_used,
+                'throttle_seconds': round(self._throttle_seconds, 2),
+                'provider': self.provider,
+                'limits': {'rpm': self.rpm, 'tpm': self.tpm, 'max_in_flight': self.max_in_flight},
+            }
+
+
+llm_dispatcher = LLMDispatcher()
@@ -0,0 +1,318 @@
+"""
+Provedores de LLM selecionáveis por configuração (LLM_PROVIDER).
+
+- groq: API do Groq (padrão, comportamento original);
+- openai: endpoint local compatível com a API da OpenAI (vLLM, llama.cpp,
+  Ollama em /v1, LM Studio...), em LLM_BASE_URL;
+- fake: modelo determinístico em processo, sem rede, com latência até o
+  primeiro token e taxa de tokens configuráveis. Serve para medir vazão e
+  latência do restante do pipeline (benchmark_offline.py) sem gasto de API.
+
+Dois pontos de uso:
+- build_chat_model(): modelo de chat LangChain da cadeia RAG (llm.py);
+- create_backend(): cliente assíncrono usado pelo despachante da extração
+  (llm_dispatcher.py), com erros normalizados em LLMBackendError.
+
+Este módulo não importa nada do projeto: é carregado tanto pela API
+(modules.*) quanto pelos scripts de extração (server.modules.*).
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+load_dotenv()
+
+LLM_PROVIDERS = ('groq', 'openai', 'fake')
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'groq').lower()
+LLM_MODEL = os.getenv('LLM_MODEL', 'llama-3.3-70b-versatile')
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL') or None
+# Endpoint compatível com OpenAI (LLM_PROVIDER=openai)
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'http://localhost:8000/v1')
+LLM_API_KEY = os.getenv('LLM_API_KEY', 'sem-chave')
+# Modelo fake: latência até o primeiro token, tokens/s (0 = instantâneo) e tamanho da resposta
+FAKE_LLM_LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', '300'))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '200'))
+FAKE_LLM_OUTPUT_TOKENS = int(os.getenv('FAKE_LLM_OUTPUT_TOKENS', '150'))
+
+
+def model_identity(provider: str = LLM_PROVIDER, model: str = LLM_MODEL) -> str:
+    """
+    Identificação do modelo para caches (ex.: cache de extração). O Groq mantém
+    o nome puro, compatível com as entradas já gravadas; os demais levam o
+    provedor, para que respostas fake/locais não se misturem às do Groq.
+    """
+    return model if provider == 'groq' else f"{provider}:{model}"
+
+
+# ===== Modelo determinístico =====
+
+def fake_response(prompt: str, output_tokens: int = FAKE_LLM_OUTPUT_TOKENS) -> str:
+    """
+    Resposta determinística para um prompt: o JSON de decisão para o prompt de
+    extração; para o prompt RAG, a pergunta seguida de palavras do contexto,
+    até output_tokens palavras.
+    """
+    lowered = prompt.lower()
+    if 'json' in lowered and '"decisao"' in lowered:
+        # Só o trecho do acórdão: as instruções citam todas as decisões possíveis
+        lowered = lowered.split('texto do acórdão:', 1)[-1].split('responda apenas', 1)[0]
+        if 'parcial' in lowered:
+            decisao = 'parcial'
+        elif 'negar provimento' in lowered or 'negou provimento' in lowered:
+            decisao = 'improvido'
+        elif 'dar provimento' in lowered or 'deu provimento' in lowered:
+            decisao = 'provido'
+        else:
+            decisao = 'improvido'
+        votacao = 'maioria' if 'maioria' in lowered else 'unanimidade'
+        return f'{{"decisao": "{decisao}", "votacao": "{votacao}", "participantes": []}}'
+
+    question = prompt
+    if 'PERGUNTA DO USUÁRIO:' in prompt:
+        question = prompt.split('PERGUNTA DO USUÁRIO:', 1)[1].split('---', 1)[0]
+    # Conteúdo após a linha "CONTEXTO DOS DOCUMENTOS (...):" e antes da pergunta
+    context = prompt.split('CONTEXTO DOS DOCUMENTOS', 1)[-1].split('PERGUNTA DO USUÁRIO:', 1)[0]
+    context_words = [w for w in context.split('\n', 1)[-1].split() if w != '---'] or ['...']
+    words = ['[Resposta', 'simulada]'] + question.split()
+    words += [context_words[i % len(context_words)] for i in range(max(0, output_tokens - len(words)))]
+    return ' '.join(words[:output_tokens])
+
+
+def _fake_tokens(text: str) -> List[str]:
+    """Palavras com o espaço seguinte, como 'tokens' do streaming."""
+    parts = text.split(' ')
+    return [p + ' ' for p in parts[:-1]] + parts[-1:]
+
+
+def _token_delay(tokens_per_second: float) -> float:
+    return 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+
+def _messages_text(messages: List[BaseMessage]) -> str:
+    return '\n'.join(str(m.content) for m in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """Modelo de chat determinístico com latência e taxa de tokens simuladas."""
+
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND
+    output_tokens: int = FAKE_LLM_OUTPUT_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-deterministic"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            'latency_ms': self.latency_ms,
+            'tokens_per_second': self.tokens_per_second,
+            'output_tokens': self.output_tokens,
+        }
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        return _fake_tokens(fake_response(_messages_text(messages), self.output_tokens))
+
+    def _duration(self, n_tokens: int) -> float:
+        return self.latency_ms / 1000 + n_tokens * _token_delay(self.tokens_per_second)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self._duration(len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=''.join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self._duration(len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=''.join(tokens)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            time.sleep(_token_delay(self.tokens_per_second))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            await asyncio.sleep(_token_delay(self.tokens_per_second))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def build_chat_model(temperature: float = 0.1, provider: str = LLM_PROVIDER) -> BaseChatModel:
+    """
+    Modelo de chat LangChain do provedor configurado.
+
+    Raises:
+        ValueError: provedor desconhecido
+    """
+    if provider == 'groq':
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            groq_api_key=os.getenv('GROQ_API_KEY'),
+            model_name=LLM_MODEL,
+            temperature=temperature
+        )
+    if provider == 'openai':
+        # Dependência opcional: só necessária com LLM_PROVIDER=openai
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            base_url=LLM_BASE_URL,
+            api_key=LLM_API_KEY,
+            model=LLM_MODEL,
+            temperature=temperature
+        )
+    if provider == 'fake':
+        return FakeChatModel()
+    raise ValueError(f"LLM_PROVIDER desconhecido: '{provider}' (opções: {', '.join(LLM_PROVIDERS)})")
+
+
+# ===== Clientes assíncronos para o despachante =====
+
+class LLMBackendError(Exception):
+    """Erro de chamada ao provedor; status_code None indica falha de conexão/timeout."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class SDKChatBackend:
+    """Cliente assíncrono dos SDKs groq/openai (mesma interface de chat.completions)."""
+
+    def __init__(self, client, status_error: type, connection_error: type):
+        self.client = client
+        self.status_error = status_error
+        self.connection_error = connection_error
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Returns:
+            Tupla (conteúdo da resposta, tokens consumidos ou None se não informado)
+        """
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except self.status_error as e:
+            raise LLMBackendError(str(e), e.status_code, e.response.headers.get('retry-after')) from e
+        except self.connection_error as e:
+            raise LLMBackendError(str(e)) from e
+        usage = getattr(response, 'usage', None)
+        return response.choices[0].message.content, getattr(usage, 'total_tokens', None)
+
+
+class FakeChatBackend:
+    """Versão assíncrona do modelo determinístico, para o despachante."""
+
+    def __init__(
+        self,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND,
+        output_tokens: int = FAKE_LLM_OUTPUT_TOKENS
+    ):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, Optional[int]]:
+        prompt = '\n'.join(m['content'] for m in messages)
+        content = fake_response(prompt, min(self.output_tokens, max_tokens))
+        n_tokens = len(content.split())
+        await asyncio.sleep(self.latency_ms / 1000 + n_tokens * _token_delay(self.tokens_per_second))
+        return content, len(prompt) // 4 + 1 + n_tokens
+
+
+def create_backend(
+    provider: str = LLM_PROVIDER,
+    base_url: Optional[str] = None,
+    timeout: float = 60.0
+):
+    """
+    Cliente assíncrono do provedor, sem novas tentativas próprias (o despachante
+    cuida delas). Deve ser criado dentro do event loop em que será usado.
+
+    Args:
+        provider: groq, openai ou fake
+        base_url: URL base (padrão: GROQ_BASE_URL ou LLM_BASE_URL)
+        timeout: Timeout por requisição, em segundos
+
+    Raises:
+        ValueError: provedor desconhecido
+    """
+    if provider == 'groq':
+        from groq import APIConnectionError, APIStatusError, AsyncGroq
+        client = AsyncGroq(
+            api_key=os.getenv('GROQ_API_KEY'),
+            base_url=base_url or GROQ_BASE_URL,
+            max_retries=0,
+            timeout=timeout
+        )
+        return SDKChatBackend(client, APIStatusError, APIConnectionError)
+    if provider == 'openai':
+        from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+        client = AsyncOpenAI(
+            api_key=LLM_API_KEY,
+            base_url=base_url or LLM_BASE_URL,
+            max_retries=0,
+            timeout=timeout
+        )
+        return SDKChatBackend(client, APIStatusError, APIConnectionError)
+    if provider == 'fake':
+        return FakeChatBackend()
+    raise ValueError(f"LLM_PROVIDER desconhecido: '{provider}' (opções: {', '.join(LLM_PROVIDERS)})")
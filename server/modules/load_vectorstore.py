@@ -1,19 +1,23 @@
 # Em server/modules/load_vectorstore.py
 
 import os
-import re
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from logger import setup_logger
+from modules.vectorstore_registry import PERSIST_DIR, EMBEDDING_BATCH_SIZE, get_vectorstore
+from modules.document_registry import document_registry, chunk_id_for_text, sha256_file
+from modules import extraction_patterns as patterns
+from modules.bm25_index import bm25_index
 
 log = setup_logger()
 
-PERSIST_DIR = "./chroma_store"
 EXTRACTED_JSON_DIR = "./extracted_json"
+# Máximo de chunks por escrita no Chroma (limite do SQLite ~5000 por operação)
+CHROMA_WRITE_BATCH_SIZE = 1024
 
 
 def detect_section_from_content(content: str) -> str:
@@ -26,14 +30,16 @@ def detect_section_from_content(content: str) -> str:
     Returns:
         Nome da seção: 'ementa', 'acordao', 'voto', 'relatorio', 'outros'
     """
+    # Uma cópia em maiúsculas e buscas sem IGNORECASE: mais rápido que os
+    # padrões case-insensitive sobre o chunk original
     content_upper = content.upper()
 
     # Detectar EMENTA (geralmente tem palavras-chave em caps)
-    if re.search(r'E\s*M\s*E\s*N\s*T\s*A', content_upper):
+    if patterns.EMENTA_MARKER.search(content_upper):
         return 'ementa'
 
     # Detectar ACÓRDÃO
-    if re.search(r'A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O', content_upper):
+    if patterns.ACORDAO_MARKER.search(content_upper):
         return 'acordao'
 
     # Detectar VOTO
@@ -65,6 +71,8 @@ def create_structural_chunks_from_json(json_data: Dict, source_file: str) -> Lis
     acordao_numero = json_data.get('acordao_numero', 'Desconhecido')
     processo = json_data.get('processo', 'Desconhecido')
     decisao = json_data.get('acordao', {}).get('decisao', None)
+    # Tributo também vai nos chunks do acórdão, para que o filtro por tributo os alcance
+    tipo_tributo = (json_data.get('ementa') or {}).get('tipo_tributo')
 
     # Extrair ano da data_sessao ou acordao_numero
     ano = None
@@ -143,6 +151,8 @@ def create_structural_chunks_from_json(json_data: Dict, source_file: str) -> Lis
                     metadata_acordao['votacao'] = acordao.get('votacao')
                 if ano:
                     metadata_acordao['ano'] = ano
+                if tipo_tributo:
+                    metadata_acordao['tipo_tributo'] = tipo_tributo
 
                 chunks.append(Document(
                     page_content=sub_chunk,
@@ -167,6 +177,8 @@ def create_structural_chunks_from_json(json_data: Dict, source_file: str) -> Lis
                 metadata_acordao_unico['votacao'] = acordao.get('votacao')
             if ano:
                 metadata_acordao_unico['ano'] = ano
+            if tipo_tributo:
+                metadata_acordao_unico['tipo_tributo'] = tipo_tributo
 
             chunks.append(Document(
                 page_content=texto_acordao,
@@ -178,24 +190,85 @@ def create_structural_chunks_from_json(json_data: Dict, source_file: str) -> Lis
     return chunks
 
 
-def add_documents_to_vectorstore(documents: List[Document]) -> Chroma | None:
+def add_chunks_deduplicated(chunks: List[Document]) -> Tuple[Chroma, List[str], Dict]:
     """
-    MODO LEGADO: Recebe documentos (páginas de PDF) e adiciona ao vectorstore
-    com chunking tradicional por tamanho.
+    Adiciona chunks ao vectorstore usando IDs determinísticos (SHA-256 do texto),
+    ignorando chunks repetidos no lote ou já presentes na coleção.
 
-    NOTA: Esta função é mantida para compatibilidade, mas o ideal é usar
-    add_documents_with_structured_chunking() com JSONs extraídos.
+    Os embeddings são calculados em lotes de EMBEDDING_BATCH_SIZE textos e
+    gravados no Chroma em escritas em bloco de até CHROMA_WRITE_BATCH_SIZE chunks.
 
     Args:
-        documents: Uma lista de objetos Document do LangChain.
+        chunks: Chunks a indexar.
 
     Returns:
-        O objeto vectorstore do Chroma atualizado.
+        Tupla (vectorstore, IDs de todos os chunks do lote, estatísticas da ingestão).
     """
-    if not documents:
-        log.warning("Nenhuma lista de documentos foi fornecida para adicionar ao vectorstore.")
-        return None
+    start = time.perf_counter()
+    vectorstore = get_vectorstore()
+
+    unique_chunks = {}
+    for chunk in chunks:
+        chunk_id = chunk_id_for_text(chunk.page_content)
+        chunk.metadata['chunk_id'] = chunk_id
+        if chunk_id not in unique_chunks:
+            unique_chunks[chunk_id] = chunk
+
+    all_ids = list(unique_chunks)
+    existing_ids = set(vectorstore.get(ids=all_ids, include=[])['ids']) if all_ids else set()
+    new_ids = [cid for cid in all_ids if cid not in existing_ids]
+
+    embeddings = vectorstore.embeddings
+    pending_ids, pending_texts, pending_metadatas, pending_vectors = [], [], [], []
+
+    def flush():
+        vectorstore._collection.upsert(
+            ids=pending_ids,
+            embeddings=pending_vectors,
+            metadatas=pending_metadatas,
+            documents=pending_texts
+        )
+        pending_ids.clear()
+        pending_texts.clear()
+        pending_metadatas.clear()
+        pending_vectors.clear()
+
+    for i in range(0, len(new_ids), EMBEDDING_BATCH_SIZE):
+        batch_ids = new_ids[i:i + EMBEDDING_BATCH_SIZE]
+        batch_texts = [unique_chunks[cid].page_content for cid in batch_ids]
+        pending_vectors.extend(embeddings.embed_documents(batch_texts))
+        pending_ids.extend(batch_ids)
+        pending_texts.extend(batch_texts)
+        pending_metadatas.extend(unique_chunks[cid].metadata for cid in batch_ids)
+        if len(pending_ids) >= CHROMA_WRITE_BATCH_SIZE:
+            flush()
+    if pending_ids:
+        flush()
+
+    # Índice BM25 (e postings do reranker) atualizado no mesmo lote; chunks já indexados são ignorados
+    if bm25_index.add(list(unique_chunks.values())):
+        bm25_index.save()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'chunks': len(chunks),
+        'new_chunks': len(new_ids),
+        'duplicate_chunks': len(chunks) - len(new_ids),
+        'seconds': round(elapsed, 3),
+        'chunks_per_second': round(len(new_ids) / elapsed, 1) if elapsed > 0 else None,
+    }
+    log.info(
+        f"Ingestão: {stats['new_chunks']} chunk(s) novo(s), {stats['duplicate_chunks']} duplicado(s) "
+        f"ignorado(s) em {stats['seconds']}s ({stats['chunks_per_second']} chunks/s)."
+    )
+    return vectorstore, all_ids, stats
+
 
+def split_page_documents(documents: List[Document]) -> List[Document]:
+    """
+    Divide páginas de PDF em chunks por tamanho (modo tradicional) e enriquece
+    os metadados básicos detectando a seção.
+    """
     # 1. Divide os Documentos recebidos em chunks (modo tradicional)
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
     chunks = splitter.split_documents(documents)
@@ -217,36 +290,80 @@ def add_documents_to_vectorstore(documents: List[Document]) -> Chroma | None:
             chunk.metadata['relevancia_juridica'] = weights.get(secao, 1.0)
 
     log.info(f"{len(documents)} página(s) dividida(s) em {len(chunks)} chunks.")
+    return chunks
 
-    # 3. Configura o modelo de embedding
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L12-v2",
-        model_kwargs={'device': 'cpu'}
-    )
 
-    # 4. Cria ou atualiza o banco de dados vetorial
-    if os.path.exists(PERSIST_DIR) and os.listdir(PERSIST_DIR):
-        log.info(f"Carregando ChromaDB existente de '{PERSIST_DIR}' e adicionando novos chunks.")
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings
-        )
-        vectorstore.add_documents(chunks)
-    else:
-        log.info(f"Criando um novo ChromaDB em '{PERSIST_DIR}'.")
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=PERSIST_DIR
-        )
+def add_page_documents(
+    documents: List[Tuple[List[Document], Optional[str]]]
+) -> Tuple[Chroma | None, Dict]:
+    """
+    MODO LEGADO em lote: indexa as páginas de vários PDFs em uma única
+    ingestão (embeddings em lotes grandes e escrita em bloco).
+
+    Args:
+        documents: Lista de (páginas do PDF, SHA-256 do PDF ou None).
+
+    Returns:
+        Tupla (vectorstore atualizado ou None, estatísticas da ingestão).
+    """
+    pending = []
+    all_chunks = []
+    for pages, doc_sha256 in documents:
+        if not pages:
+            continue
+        if doc_sha256 and document_registry.is_ingested(doc_sha256, 'legado'):
+            log.info("PDF já indexado (mesmo SHA-256), ingestão ignorada.")
+            continue
+        chunks = split_page_documents(pages)
+        source = os.path.basename(pages[0].metadata.get('source', ''))
+        pending.append((doc_sha256, source, chunks))
+        all_chunks.extend(chunks)
+
+    if not all_chunks:
+        return (get_vectorstore() if documents else None), {}
+
+    # 3. Adiciona ao banco de dados vetorial compartilhado, sem duplicar chunks
+    vectorstore, _, stats = add_chunks_deduplicated(all_chunks)
+    for doc_sha256, source, chunks in pending:
+        if doc_sha256:
+            document_registry.register(
+                doc_sha256, 'legado', source, [c.metadata['chunk_id'] for c in chunks]
+            )
 
     log.info("Banco de dados ChromaDB atualizado e salvo no disco.")
+    return vectorstore, stats
+
+
+def add_documents_to_vectorstore(
+    documents: List[Document],
+    doc_sha256: Optional[str] = None
+) -> Chroma | None:
+    """
+    MODO LEGADO: Recebe documentos (páginas de PDF) e adiciona ao vectorstore
+    com chunking tradicional por tamanho.
+
+    NOTA: Esta função é mantida para compatibilidade, mas o ideal é usar
+    add_documents_with_structured_chunking() com JSONs extraídos.
+
+    Args:
+        documents: Uma lista de objetos Document do LangChain.
+        doc_sha256: SHA-256 do PDF de origem. Se o PDF já foi indexado, nada é feito.
+
+    Returns:
+        O objeto vectorstore do Chroma atualizado.
+    """
+    if not documents:
+        log.warning("Nenhuma lista de documentos foi fornecida para adicionar ao vectorstore.")
+        return None
+
+    vectorstore, _ = add_page_documents([(documents, doc_sha256)])
     return vectorstore
 
 
 def add_documents_with_structured_chunking(
     pdf_path: Path,
-    json_data: Optional[Dict] = None
+    json_data: Optional[Dict] = None,
+    doc_sha256: Optional[str] = None
 ) -> Chroma | None:
     """
     MODO RECOMENDADO: Cria chunks estruturados a partir do JSON extraído.
@@ -254,6 +371,7 @@ def add_documents_with_structured_chunking(
     Args:
         pdf_path: Caminho do PDF original
         json_data: Dicionário com dados extraídos (se None, usa chunking legado)
+        doc_sha256: SHA-256 do PDF (calculado se None). PDFs já indexados são ignorados.
 
     Returns:
         Vectorstore atualizado
@@ -261,51 +379,60 @@ def add_documents_with_structured_chunking(
     if json_data:
         # Usar chunking estrutural baseado no JSON
         log.info(f"Usando chunking estrutural para {pdf_path.name}")
-        chunks = create_structural_chunks_from_json(json_data, pdf_path.name)
-    else:
-        # Fallback para chunking tradicional
-        log.warning(f"JSON não disponível para {pdf_path.name}, usando chunking tradicional")
-        from modules.pdf_handlers import process_uploaded_pdf
-
-        # Processar PDF para obter documentos
-        class MockUploadFile:
-            def __init__(self, path):
-                self.filename = path.name
-                with open(path, 'rb') as f:
-                    self.file = f
-                    self.content = f.read()
-
-        mock_file = MockUploadFile(pdf_path)
-        documents = process_uploaded_pdf(mock_file)
-
-        if not documents:
-            log.error(f"Falha ao processar {pdf_path.name}")
-            return None
-
-        # Usar função legado
-        return add_documents_to_vectorstore(documents)
-
-    # Configurar embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L12-v2",
-        model_kwargs={'device': 'cpu'}
-    )
+        vectorstore, _ = add_structured_documents([(pdf_path, json_data, doc_sha256)])
+        return vectorstore
 
-    # Adicionar ao vectorstore
-    if os.path.exists(PERSIST_DIR) and os.listdir(PERSIST_DIR):
-        log.info(f"Atualizando ChromaDB existente com chunks estruturados")
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings
-        )
-        vectorstore.add_documents(chunks)
-    else:
-        log.info(f"Criando novo ChromaDB com chunks estruturados")
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=PERSIST_DIR
+    # Fallback para chunking tradicional
+    log.warning(f"JSON não disponível para {pdf_path.name}, usando chunking tradicional")
+    from modules.pdf_handlers import load_pdf_documents
+
+    # Processar PDF (já em disco) para obter documentos
+    documents = load_pdf_documents(pdf_path)
+
+    if not documents:
+        log.error(f"Falha ao processar {pdf_path.name}")
+        return None
+
+    # Usar função legado
+    return add_documents_to_vectorstore(documents, doc_sha256=doc_sha256 or sha256_file(pdf_path))
+
+
+def add_structured_documents(
+    documents: List[Tuple[Path, Dict, Optional[str]]]
+) -> Tuple[Chroma, Dict]:
+    """
+    Indexa vários PDFs com chunking estrutural em uma única ingestão
+    (embeddings em lotes grandes e escrita em bloco), em vez de abrir o
+    Chroma e embedar 2-5 chunks por PDF.
+
+    Args:
+        documents: Lista de (caminho do PDF, JSON extraído, SHA-256 do PDF ou None).
+
+    Returns:
+        Tupla (vectorstore atualizado, estatísticas da ingestão).
+    """
+    pending = []
+    all_chunks = []
+    for pdf_path, json_data, doc_sha256 in documents:
+        doc_sha256 = doc_sha256 or sha256_file(pdf_path)
+        # Uploads ficam em disco como <sha256>.pdf; o nome original vem do JSON
+        filename = json_data.get('source_file') or pdf_path.name
+        if document_registry.is_ingested(doc_sha256, 'estrutural'):
+            log.info(f"{filename} já indexado com chunking estrutural (mesmo SHA-256), ignorado.")
+            continue
+        chunks = create_structural_chunks_from_json(json_data, filename)
+        pending.append((doc_sha256, filename, chunks))
+        all_chunks.extend(chunks)
+
+    if not all_chunks:
+        return get_vectorstore(), {}
+
+    # Adicionar ao vectorstore compartilhado, sem duplicar chunks
+    vectorstore, _, stats = add_chunks_deduplicated(all_chunks)
+    for doc_sha256, filename, chunks in pending:
+        document_registry.register(
+            doc_sha256, 'estrutural', filename, [c.metadata['chunk_id'] for c in chunks]
         )
 
-    log.info(f"Vectorstore atualizado com {len(chunks)} chunks estruturados")
-    return vectorstore
\ No newline at end of file
+    log.info(f"Vectorstore atualizado com {len(all_chunks)} chunks estruturados de {len(pending)} PDF(s)")
+    return vectorstore, stats
@@ -5,20 +5,26 @@ Pipeline: PDF → Markdown → Regex (estrutura) → LLM (fallback) → JSON val
 
 Abordagem híbrida:
 - Usa regex para campos estruturados conhecidos
-- Usa LLM (Groq) para textos complexos e variações
+- Classifica decisão/votação por regras (decision_classifier)
+- Usa LLM (Groq) só quando a confiança das regras é baixa
 """
 
-import re
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
 from pypdf import PdfReader
-from groq import Groq
 import os
 from dotenv import load_dotenv
 
+from server.modules import extraction_patterns as patterns
+from server.modules.decision_classifier import DECISAO_CONFIDENCE_THRESHOLD, classify_acordao
+from server.modules.extraction_cache import extraction_cache, pdf_sha256
+from server.modules.llm_dispatcher import llm_dispatcher
+from server.modules.llm_providers import LLM_MODEL, model_identity
 from server.modules.schemas import (
     AcordaoDocumento,
     Ementa,
@@ -32,34 +38,111 @@ from server.logger import setup_logger
 load_dotenv()
 log = setup_logger(__name__)
 
+# Modelo que compõe a chave do cache (provedor incluído, exceto no Groq)
+LLM_CACHE_MODEL = model_identity()
+# Versões que compõem a chave do cache de extração: incremente PARSER_VERSION ao
+# mudar a leitura/limpeza do PDF e EXTRACTOR_VERSION ao mudar regex ou prompt
+PARSER_VERSION = "1"
+EXTRACTOR_VERSION = "3"
+# O limiar decide se o LLM classifica a decisão: entra na chave junto com a
+# versão, para que mudar DECISAO_CONFIDENCE_THRESHOLD não sirva resultados antigos
+EXTRACTOR_CACHE_VERSION = f"{EXTRACTOR_VERSION}:decisao>={DECISAO_CONFIDENCE_THRESHOLD:g}"
+
+# Processos para ler páginas de um mesmo PDF em paralelo (1 = leitura serial)
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+# Abaixo deste número de páginas, o custo de subir processos não compensa
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '40'))
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extrai o texto das páginas [start, end) (função de topo, executável em outro processo)."""
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
 
 class AcordaoExtractor:
     """Extrator híbrido de acórdãos PDF."""
 
     def __init__(self):
-        """Inicializa extrator com cliente Groq."""
-        self.groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-        self.llm_model = "llama-3.3-70b-versatile"  # Modelo atualizado
+        """Inicializa extrator com o despachante LLM (limite de taxa e novas tentativas)."""
+        self.dispatcher = llm_dispatcher
+        self.llm_model = LLM_MODEL  # Nome do modelo no provedor (LLM_PROVIDER)
 
-    def pdf_to_text(self, pdf_path: Path) -> str:
+    @staticmethod
+    def extract_pages(pdf_path: Path, workers: Optional[int] = None) -> List[str]:
         """
-        Extrai texto bruto do PDF usando PyPDF.
+        Extrai o texto de cada página do PDF. PDFs com pelo menos
+        PDF_PARALLEL_MIN_PAGES páginas são lidos em paralelo, em faixas de
+        páginas distribuídas por um pool de processos.
 
         Args:
             pdf_path: Caminho do PDF
+            workers: Processos para a leitura (padrão: PDF_EXTRACTION_WORKERS; 1 = serial)
 
         Returns:
-            Texto completo extraído
+            Lista com o texto de cada página, na ordem do documento
         """
         log.info(f"Extraindo texto de: {pdf_path.name}")
+        start = time.perf_counter()
+        workers = PDF_EXTRACTION_WORKERS if workers is None else workers
         reader = PdfReader(str(pdf_path))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        num_pages = len(reader.pages)
+
+        if workers > 1 and num_pages >= PDF_PARALLEL_MIN_PAGES:
+            # Algumas faixas por processo equilibram páginas mais pesadas
+            range_size = max(1, -(-num_pages // (workers * 2)))
+            ranges = [(i, min(i + range_size, num_pages)) for i in range(0, num_pages, range_size)]
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+                futures = [pool.submit(_extract_page_range, str(pdf_path), a, b) for a, b in ranges]
+                pages = [page for future in futures for page in future.result()]
+        else:
+            pages = [page.extract_text() or "" for page in reader.pages]
+
+        elapsed = time.perf_counter() - start
+        log.info(
+            f"Extraídas {num_pages} páginas em {elapsed:.2f}s "
+            f"({num_pages / elapsed if elapsed > 0 else 0:.1f} páginas/s)"
+        )
+        return pages
+
+    @staticmethod
+    def pdf_to_text(pdf_path: Path, workers: Optional[int] = None) -> str:
+        """
+        Extrai texto bruto do PDF usando PyPDF.
+
+        Args:
+            pdf_path: Caminho do PDF
+            workers: Processos para a leitura (ver extract_pages)
+
+        Returns:
+            Texto completo extraído
+        """
+        text = ''.join(page + "\n" for page in AcordaoExtractor.extract_pages(pdf_path, workers))
         log.debug(f"Extraídos {len(text)} caracteres")
         return text
 
-    def clean_text(self, text: str) -> str:
+    @staticmethod
+    def clean_pages(pages: List[str]) -> Tuple[str, List[int]]:
+        """
+        Limpa cada página e junta o texto uma única vez, registrando onde
+        cada página começa (para citações com número de página).
+
+        Args:
+            pages: Texto bruto de cada página
+
+        Returns:
+            Tupla (texto limpo, offset inicial de cada página no texto limpo)
+        """
+        cleaned = [AcordaoExtractor.clean_text(page) for page in pages]
+        offsets = []
+        position = 0
+        for page in cleaned:
+            offsets.append(position)
+            position += len(page) + 1  # separador "\n" entre páginas
+        return "\n".join(cleaned), offsets
+
+    @staticmethod
+    def clean_text(text: str) -> str:
         """
         Remove ruído do texto (cabeçalhos, footers repetitivos).
 
@@ -70,11 +153,11 @@ class AcordaoExtractor:
             Texto limpo
         """
         # Remover múltiplos espaços/quebras de linha
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        text = re.sub(r' +', ' ', text)
+        text = patterns.BLANK_LINES.sub('\n\n', text)
+        text = patterns.MULTIPLE_SPACES.sub(' ', text)
 
         # Remover cabeçalhos visuais repetitivos
-        text = re.sub(r'ESTADO DO ACRE\s+Secretaria.*?Conselho.*?\n', '', text, flags=re.IGNORECASE)
+        text = patterns.PAGE_HEADER.sub('', text)
 
         return text.strip()
 
@@ -91,119 +174,99 @@ class AcordaoExtractor:
         metadata = {}
 
         # Acórdão número
-        match = re.search(r'ACÓRDÃO\s+N[º°]\s*(\d+/\d{4})', text, re.IGNORECASE)
+        match = patterns.ACORDAO_NUMERO.search(text)
         if match:
             metadata['acordao_numero'] = match.group(1)
 
         # Processo
-        match = re.search(r'PROCESSO\s+N[º°]\s*([\d/]+)', text, re.IGNORECASE)
+        match = patterns.PROCESSO.search(text)
         if match:
             metadata['processo'] = match.group(1)
 
         # Recorrente
-        match = re.search(r'RECORRENTE:\s*(.+?)(?:\n|ADVOGADO)', text, re.IGNORECASE)
+        match = patterns.RECORRENTE.search(text)
         if match:
             metadata['recorrente'] = match.group(1).strip()
 
         # Advogado
-        match = re.search(r'ADVOGADO[S]?:\s*(.+?)(?:\n|RECORRIDA)', text, re.IGNORECASE)
+        match = patterns.ADVOGADO.search(text)
         if match:
             metadata['advogado'] = match.group(1).strip()
 
         # Recorrida
-        match = re.search(r'RECORRIDA:\s*(.+?)(?:\n|PROCURADOR)', text, re.IGNORECASE)
+        match = patterns.RECORRIDA.search(text)
         if match:
             metadata['recorrida'] = match.group(1).strip()
 
         # Procurador Fiscal
-        match = re.search(r'PROCURADOR\s+FISCAL:\s*(.+?)(?:\n|RELATOR)', text, re.IGNORECASE)
+        match = patterns.PROCURADOR_FISCAL.search(text)
         if match:
             metadata['procurador_fiscal'] = match.group(1).strip()
 
         # Relator (pode ser RELATOR ou CONSELHEIRO RELATOR)
-        match = re.search(r'(?:CONSELHEIRO\s+)?RELATOR:\s*(?:Cons\.\s*)?(.+?)(?:\n|REDATOR|DATA)', text, re.IGNORECASE)
+        match = patterns.RELATOR.search(text)
         if match:
             nome_relator = match.group(1).strip()
             # Detectar tipo (Cons., CONSELHEIRO TITULAR, etc.)
-            tipo_match = re.search(r'(Cons\.|CONSELHEIRO\s+TITULAR)', nome_relator, re.IGNORECASE)
+            tipo_match = patterns.RELATOR_TIPO.search(nome_relator)
             tipo = tipo_match.group(1) if tipo_match else None
-            nome_limpo = re.sub(r'(Cons\.|CONSELHEIRO\s+TITULAR)\s*', '', nome_relator, flags=re.IGNORECASE).strip()
+            nome_limpo = patterns.RELATOR_TIPO_PREFIX.sub('', nome_relator).strip()
             metadata['relator'] = {'nome': nome_limpo, 'tipo': tipo}
 
         # Redator do Acórdão (se existir)
-        match = re.search(r'REDATOR\s+DO\s+AC[ÓO]RD[ÃA]O[:\s]+(?:Cons\.\s*)?(.+?)(?:\n|DATA)', text, re.IGNORECASE)
+        match = patterns.REDATOR.search(text)
         if match:
             nome_redator = match.group(1).strip()
-            tipo_match = re.search(r'(Cons\.|CONSELHEIRO)', nome_redator, re.IGNORECASE)
+            tipo_match = patterns.REDATOR_TIPO.search(nome_redator)
             tipo = tipo_match.group(1) if tipo_match else None
-            nome_limpo = re.sub(r'(Cons\.|CONSELHEIRO)\s*', '', nome_redator, flags=re.IGNORECASE).strip()
+            nome_limpo = patterns.REDATOR_TIPO_PREFIX.sub('', nome_redator).strip()
             metadata['redator'] = {'nome': nome_limpo, 'tipo': tipo}
 
         # Data da sessão (padrão: "10 de agosto de 2017" ou "30 de agosto de 2017")
-        match = re.search(r'(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})', text, re.IGNORECASE)
+        match = patterns.DATA_EXTENSO.search(text)
         if match:
             dia, mes_texto, ano = match.groups()
-            meses = {
-                'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
-                'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
-                'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
-            }
-            mes = meses.get(mes_texto.lower())
+            mes = patterns.MESES.get(mes_texto.lower())
             if mes:
                 metadata['data_sessao'] = f"{ano}-{mes:02d}-{int(dia):02d}"
 
         log.debug(f"Metadados extraídos via regex: {list(metadata.keys())}")
         return metadata
 
-    def extract_ementa(self, text: str) -> Optional[Dict]:
+    def extract_ementa(self, text: str, sections: Optional[patterns.SectionOffsets] = None) -> Optional[Dict]:
         """
         Extrai seção EMENTA usando regex.
 
         Args:
             text: Texto do PDF
+            sections: Offsets das seções (scan_sections); calculados se omitidos
 
         Returns:
             Dicionário com ementa
         """
-        # Regex para capturar ementa (entre "E M E N T A" e "A C Ó R D Ã O")
-        match = re.search(
-            r'E\s*M\s*E\s*N\s*T\s*A\s*(.+?)A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O',
-            text,
-            re.DOTALL | re.IGNORECASE
-        )
+        # Ementa: entre "E M E N T A" e "A C Ó R D Ã O"
+        sections = sections or patterns.scan_sections(text)
+        texto_ementa = sections.ementa_text(text)
 
-        if not match:
+        if texto_ementa is None:
             log.warning("Ementa não encontrada via regex")
             return None
 
-        texto_ementa = match.group(1).strip()
-
         # Extrair palavras-chave (primeira linha geralmente contém)
         primeira_linha = texto_ementa.split('\n')[0]
         palavras_chave = []
         tipo_tributo = None
 
         # Detectar tipo de tributo
-        if re.search(r'\bICMS\b', primeira_linha, re.IGNORECASE):
-            tipo_tributo = 'ICMS'
-            palavras_chave.append('ICMS')
-        elif re.search(r'\bIPVA\b', primeira_linha, re.IGNORECASE):
-            tipo_tributo = 'IPVA'
-            palavras_chave.append('IPVA')
-        elif re.search(r'\bITCD\b', primeira_linha, re.IGNORECASE):
-            tipo_tributo = 'ITCD'
-            palavras_chave.append('ITCD')
+        for tributo, padrao in patterns.TRIBUTOS:
+            if padrao.search(primeira_linha):
+                tipo_tributo = tributo
+                palavras_chave.append(tributo)
+                break
 
         # Detectar temas comuns
-        temas = {
-            'BENEFÍCIO FISCAL': r'BENEF[IÍ]CIO\s+FISCAL',
-            'ISENÇÃO': r'ISEN[ÇC][ÃA]O',
-            'SUBSTITUIÇÃO TRIBUTÁRIA': r'SUBSTITUI[ÇC][ÃA]O\s+TRIBUT[ÁA]RIA',
-            'OBRIGAÇÃO ACESSÓRIA': r'OBRIGA[ÇC][ÃA]O\s+ACESS[ÓO]RIA',
-        }
-
-        for tema, padrao in temas.items():
-            if re.search(padrao, texto_ementa, re.IGNORECASE):
+        for tema, padrao in patterns.TEMAS.items():
+            if padrao.search(texto_ementa):
                 palavras_chave.append(tema)
 
         return {
@@ -212,29 +275,25 @@ class AcordaoExtractor:
             'tipo_tributo': tipo_tributo
         }
 
-    def extract_acordao_llm(self, text: str) -> Optional[Dict]:
+    def extract_acordao_llm(self, text: str, sections: Optional[patterns.SectionOffsets] = None) -> Optional[Dict]:
         """
         Extrai conteúdo do acórdão usando LLM (decisão, votação, participantes).
 
         Args:
             text: Texto do PDF
+            sections: Offsets das seções (scan_sections); calculados se omitidos
 
         Returns:
             Dicionário com dados do acórdão
         """
-        # Primeiro, tentar extrair a seção ACÓRDÃO via regex
-        match = re.search(
-            r'A\s*C\s*[ÓO]\s*R\s*D\s*[ÃA]\s*O\s*(.+?)(?:Nabil|Sala\s+das\s+Sess)',
-            text,
-            re.DOTALL | re.IGNORECASE
-        )
+        # Primeiro, localizar a seção ACÓRDÃO (até as assinaturas / "Sala das Sessões")
+        sections = sections or patterns.scan_sections(text)
+        texto_acordao = sections.acordao_text(text)
 
-        if not match:
+        if texto_acordao is None:
             log.warning("Seção ACÓRDÃO não encontrada")
             return None
 
-        texto_acordao = match.group(1).strip()
-
         # Usar LLM para extrair decisão e votação
         prompt = f"""Analise este texto de acórdão e extraia:
 1. Decisão final: "provido", "improvido", "parcial"
@@ -252,17 +311,15 @@ Responda APENAS com JSON válido no formato:
 }}"""
 
         try:
-            response = self.groq_client.chat.completions.create(
+            llm_output = self.dispatcher.complete(
+                [{"role": "user", "content": prompt}],
                 model=self.llm_model,
-                messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
                 max_tokens=500
-            )
-
-            llm_output = response.choices[0].message.content.strip()
+            ).strip()
 
             # Extrair JSON da resposta (pode vir com markdown)
-            json_match = re.search(r'\{.*\}', llm_output, re.DOTALL)
+            json_match = patterns.JSON_OBJECT.search(llm_output)
             if json_match:
                 result = json.loads(json_match.group(0))
                 result['texto_completo'] = texto_acordao
@@ -276,6 +333,49 @@ Responda APENAS com JSON válido no formato:
             log.error(f"Erro ao usar LLM: {e}")
             return None
 
+    def extract_acordao_data(
+        self,
+        text: str,
+        sections: patterns.SectionOffsets,
+        assinaturas: Optional[List[Dict]] = None
+    ) -> Tuple[Optional[Dict], bool, Optional[float]]:
+        """
+        Extrai decisão, votação e participantes por regras, recorrendo ao LLM
+        apenas quando a confiança fica abaixo de DECISAO_CONFIDENCE_THRESHOLD.
+
+        Args:
+            text: Texto do PDF
+            sections: Offsets das seções (scan_sections)
+            assinaturas: Assinaturas extraídas, usadas na lista de participantes
+
+        Returns:
+            Tupla (dados do acórdão ou None, se o LLM foi chamado, confiança das regras)
+        """
+        texto_acordao = sections.acordao_text(text)
+        if texto_acordao is None:
+            log.warning("Seção ACÓRDÃO não encontrada")
+            return None, False, None
+
+        # As listas de conselheiros podem seguir além do fim da seção ("Nabil ...")
+        texto_participantes = text[sections.acordao[0]:]
+        classificacao = classify_acordao(texto_acordao, assinaturas, texto_participantes)
+        if classificacao.decisao and classificacao.confidence >= DECISAO_CONFIDENCE_THRESHOLD:
+            log.info(
+                f"Acórdão classificado por regras: {classificacao.decisao} "
+                f"(confiança {classificacao.confidence:.2f})"
+            )
+            return classificacao.to_acordao_dict(texto_acordao), False, classificacao.confidence
+
+        log.info(f"Confiança das regras baixa ({classificacao.confidence:.2f}), usando LLM")
+        acordao_data = self.extract_acordao_llm(text, sections)
+        if acordao_data is None and classificacao.decisao:
+            # LLM indisponível: melhor a classificação incerta que nenhuma
+            log.warning("LLM falhou, mantendo a classificação por regras")
+            acordao_data = classificacao.to_acordao_dict(texto_acordao)
+        elif acordao_data is not None and not acordao_data.get('participantes'):
+            acordao_data['participantes'] = classificacao.participantes
+        return acordao_data, True, classificacao.confidence
+
     def extract_assinaturas(self, text: str) -> List[Dict]:
         """
         Extrai assinaturas do final do documento.
@@ -299,16 +399,12 @@ Responda APENAS com JSON válido no formato:
 
         # Detectar padrão: Nome + Cargo (abaixo ou ao lado)
         # Padrão 1: Presidente
-        match = re.search(r'(\w[\w\s]+?)\s+Presidente', texto_assinaturas, re.IGNORECASE)
+        match = patterns.ASSINATURA_PRESIDENTE.search(texto_assinaturas)
         if match:
             assinaturas.append({'nome': match.group(1).strip(), 'cargo': 'Presidente'})
 
         # Padrão 2: Conselheiro - Relator ou Conselheiro Suplente
-        matches = re.finditer(
-            r'(\w[\w\s]+?)\s+(Conselheiro\s*-?\s*(?:Relator|Suplente|Redator(?:\s+do\s+Ac[óo]rd[ãa]o)?))',
-            texto_assinaturas,
-            re.IGNORECASE
-        )
+        matches = patterns.ASSINATURA_CONSELHEIRO.finditer(texto_assinaturas)
         for match in matches:
             nome = match.group(1).strip()
             cargo = match.group(2).strip()
@@ -317,7 +413,7 @@ Responda APENAS com JSON válido no formato:
                 assinaturas.append({'nome': nome, 'cargo': cargo})
 
         # Padrão 3: Procurador Fiscal
-        match = re.search(r'(\w[\w\s]+?)\s+Procurador\s+Fiscal', texto_assinaturas, re.IGNORECASE)
+        match = patterns.ASSINATURA_PROCURADOR.search(texto_assinaturas)
         if match:
             nome = match.group(1).strip()
             if not any(a['nome'] == nome for a in assinaturas):
@@ -326,6 +422,62 @@ Responda APENAS com JSON válido no formato:
         log.debug(f"Assinaturas extraídas: {len(assinaturas)}")
         return assinaturas
 
+    @staticmethod
+    def load_text(
+        pdf_path: Path,
+        sha256: Optional[str] = None,
+        workers: Optional[int] = None
+    ) -> Tuple[str, List[int]]:
+        """
+        Texto limpo e offsets das páginas, do cache de extração ou lendo o PDF.
+
+        Args:
+            pdf_path: Caminho do PDF
+            sha256: Hash do PDF, se já calculado
+            workers: Processos para a leitura (ver extract_pages)
+
+        Returns:
+            Tupla (texto limpo, offset inicial de cada página)
+        """
+        sha256 = sha256 or pdf_sha256(pdf_path)
+        cached = extraction_cache.get_text(sha256, PARSER_VERSION)
+        if cached is not None:
+            log.info(f"Texto de {pdf_path.name} reaproveitado do cache de extração")
+            return cached
+
+        cleaned_text, page_offsets = AcordaoExtractor.clean_pages(AcordaoExtractor.extract_pages(pdf_path, workers))
+        extraction_cache.put_text(sha256, PARSER_VERSION, cleaned_text, page_offsets)
+        return cleaned_text, page_offsets
+
+    @staticmethod
+    def cached_result(sha256: str, source_file: str, llm_model: str = LLM_CACHE_MODEL) -> Optional[ExtractionResult]:
+        """
+        Resultado de uma extração anterior do mesmo PDF (mesmo hash, versão do
+        extrator, limiar do classificador e modelo LLM), sem ler o PDF nem
+        chamar o LLM.
+
+        Returns:
+            ExtractionResult validado ou None se não houver no cache
+        """
+        cached = extraction_cache.get_result(sha256, EXTRACTOR_CACHE_VERSION, llm_model)
+        if cached is None:
+            return None
+        sections, documento = cached
+        classificacao = sections.get('classificacao') or {}
+        # O mesmo conteúdo pode ter sido enviado com outro nome de arquivo
+        documento['source_file'] = source_file
+        text = extraction_cache.get_text(sha256, PARSER_VERSION)
+        log.info(f"Extração de {source_file} reaproveitada do cache")
+        return ExtractionResult(
+            success=True,
+            documento=AcordaoDocumento(**documento),
+            raw_markdown=text[0] if text else None,
+            page_offsets=text[1] if text else None,
+            llm_used=classificacao.get('llm_used'),
+            decisao_confianca=classificacao.get('confianca'),
+            source_file=source_file
+        )
+
     def extract_acordao(self, pdf_path: Path) -> ExtractionResult:
         """
         Pipeline completo de extração de PDF → JSON.
@@ -337,19 +489,58 @@ Responda APENAS com JSON válido no formato:
             ExtractionResult com documento validado ou erros
         """
         log.info(f"Iniciando extração de: {pdf_path.name}")
+
+        try:
+            # 0. PDF inalterado e já extraído com esta versão: nada a fazer
+            sha256 = pdf_sha256(pdf_path)
+            cached = self.cached_result(sha256, pdf_path.name)
+            if cached is not None:
+                return cached
+
+            # 1. PDF → Texto (páginas limpas e juntadas uma vez, com offsets)
+            cleaned_text, page_offsets = self.load_text(pdf_path, sha256)
+        except Exception as e:
+            log.exception(f"Erro inesperado na extração: {e}")
+            return ExtractionResult(
+                success=False,
+                errors=[f"Erro inesperado: {str(e)}"],
+                source_file=pdf_path.name
+            )
+
+        return self.extract_from_text(cleaned_text, pdf_path.name, page_offsets, sha256)
+
+    def extract_from_text(
+        self,
+        cleaned_text: str,
+        source_file: str,
+        page_offsets: Optional[List[int]] = None,
+        sha256: Optional[str] = None
+    ) -> ExtractionResult:
+        """
+        Extrai os campos estruturados (regex + LLM) de um texto já limpo.
+        Separado de extract_acordao para que a leitura do PDF (CPU) e a
+        chamada ao LLM (rede) possam rodar em pools distintos.
+
+        Args:
+            cleaned_text: Texto do PDF após clean_text
+            source_file: Nome do arquivo PDF original
+            page_offsets: Offset inicial de cada página em cleaned_text (opcional)
+            sha256: Hash do PDF; se informado, o resultado validado vai para o cache
+
+        Returns:
+            ExtractionResult com documento validado ou erros
+        """
         errors = []
         warnings = []
 
         try:
-            # 1. PDF → Texto
-            text = self.pdf_to_text(pdf_path)
-            cleaned_text = self.clean_text(text)
-
             # 2. Extrair componentes
+            # Seções localizadas uma única vez e compartilhadas pelos extratores
+            sections = patterns.scan_sections(cleaned_text)
             metadata = self.extract_metadata_regex(cleaned_text)
-            ementa_data = self.extract_ementa(cleaned_text)
-            acordao_data = self.extract_acordao_llm(cleaned_text)
+            ementa_data = self.extract_ementa(cleaned_text, sections)
             assinaturas_data = self.extract_assinaturas(cleaned_text)
+            acordao_data, llm_used, confianca = self.extract_acordao_data(cleaned_text, sections, assinaturas_data)
 
             # 3. Validar campos obrigatórios
             campos_obrigatorios = ['acordao_numero', 'processo', 'recorrente']
@@ -375,7 +566,10 @@ Responda APENAS com JSON válido no formato:
                     errors=errors,
                     warnings=warnings,
                     raw_markdown=cleaned_text,
-                    source_file=pdf_path.name
+                    page_offsets=page_offsets,
+                    llm_used=llm_used,
+                    decisao_confianca=confianca,
+                    source_file=source_file
                 )
 
             # 5. Montar objeto Pydantic
@@ -384,19 +578,33 @@ Responda APENAS com JSON válido no formato:
                 'ementa': ementa_data,
                 'acordao': acordao_data,
                 'assinaturas': assinaturas_data,
-                'source_file': pdf_path.name
+                'source_file': source_file
             }
 
             # 6. Validar com Pydantic
             documento = AcordaoDocumento(**documento_dict)
 
-            log.info(f"✓ Extração bem-sucedida: {pdf_path.name}")
+            if sha256:
+                extraction_cache.put_result(
+                    sha256, EXTRACTOR_CACHE_VERSION, LLM_CACHE_MODEL,
+                    {
+                        'ementa': sections.ementa,
+                        'acordao': sections.acordao,
+                        'classificacao': {'llm_used': llm_used, 'confianca': confianca},
+                    },
+                    documento.model_dump(mode='json')
+                )
+
+            log.info(f"✓ Extração bem-sucedida: {source_file}")
             return ExtractionResult(
                 success=True,
                 documento=documento,
                 warnings=warnings,
                 raw_markdown=cleaned_text,
-                source_file=pdf_path.name
+                page_offsets=page_offsets,
+                llm_used=llm_used,
+                decisao_confianca=confianca,
+                source_file=source_file
             )
 
         except Exception as e:
@@ -404,7 +612,7 @@ Responda APENAS com JSON válido no formato:
             return ExtractionResult(
                 success=False,
                 errors=[f"Erro inesperado: {str(e)}"],
-                source_file=pdf_path.name
+                source_file=source_file
             )
 
 
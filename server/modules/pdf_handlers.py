@@ -1,5 +1,10 @@
 # Em server/modules/pdf_handler.py
 
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
 from typing import List
 from fastapi import UploadFile
@@ -9,40 +14,157 @@ from logger import setup_logger
 
 log = setup_logger()
 UPLOAD_DIR = Path("./uploaded_pdfs")
+# Tamanho do bloco lido/escrito por vez durante o upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Tamanho máximo aceito por arquivo (padrão: 200 MB)
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', '200')) * 1024 * 1024
 
-def process_uploaded_pdf(file: UploadFile) -> List[Document] | None:
+
+def metadata_path(pdf_path: Path) -> Path:
+    """Arquivo ao lado do PDF salvo com o nome original do upload."""
+    return pdf_path.with_suffix(".meta.json")
+
+
+def original_filename(pdf_path: Path) -> str:
+    """Nome original de um PDF salvo por save_uploaded_pdf (ou o próprio nome, se não houver)."""
+    try:
+        with open(metadata_path(pdf_path), encoding="utf-8") as f:
+            return json.load(f)["filename"]
+    except (OSError, ValueError, KeyError):
+        return pdf_path.name
+
+
+class UploadTooLargeError(ValueError):
+    """O arquivo enviado excede MAX_UPLOAD_BYTES."""
+
+
+@dataclass
+class SavedPdf:
+    """PDF salvo em disco, com hash SHA-256 calculado durante a escrita."""
+    path: Path
+    sha256: str
+    size: int
+    filename: str  # nome original do upload, usado como 'source' dos chunks
+    created: bool = True  # False se um upload anterior já havia gravado o mesmo conteúdo
+
+
+def save_uploaded_pdf(file: UploadFile) -> SavedPdf | None:
     """
-    Salva um arquivo PDF enviado, extrai o conteúdo de TODAS as páginas
-    e retorna uma lista de Documentos LangChain.
+    Salva um arquivo PDF enviado em UPLOAD_DIR, lendo-o em blocos de
+    UPLOAD_CHUNK_SIZE bytes para manter o uso de memória constante.
+
+    O arquivo é gravado em um temporário exclusivo e depois movido para
+    `<sha256>.pdf`: uploads simultâneos com o mesmo nome não se sobrescrevem
+    antes de o job enfileirado lê-los. O nome original fica em SavedPdf.filename
+    e em `<sha256>.meta.json` (lido pela reindexação via original_filename).
 
     Args:
         file: O objeto UploadFile vindo diretamente do FastAPI.
 
     Returns:
-        Uma lista de objetos Document, onde cada um representa uma página do PDF,
-        ou None se ocorrer um erro.
+        O PDF salvo (caminho, SHA-256, tamanho e nome original), ou None se ocorrer um erro.
+
+    Raises:
+        UploadTooLargeError: Se o arquivo exceder MAX_UPLOAD_BYTES.
     """
+    # Garante que o diretório de destino exista
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    filename = Path(file.filename).name
+    tmp_path = None
+
     try:
-        # Garante que o diretório de destino exista
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        
-        # Define o caminho completo para salvar o arquivo
-        file_path = UPLOAD_DIR / file.filename
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".part", delete=False) as f:
+            tmp_path = Path(f.name)
+            while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(
+                        f"Arquivo '{file.filename}' excede o limite de {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+                    )
+                hasher.update(chunk)
+                f.write(chunk)
+
+        # Mesmo conteúdo, mesmo destino: a troca atômica só regrava bytes idênticos
+        sha256 = hasher.hexdigest()
+        file_path = UPLOAD_DIR / f"{sha256}.pdf"
+        created = not file_path.exists()
+        tmp_path.replace(file_path)
+        with open(metadata_path(file_path), "w", encoding="utf-8") as f:
+            json.dump({"filename": filename}, f, ensure_ascii=False)
+        log.info(f"Arquivo '{filename}' salvo com sucesso em '{file_path}' ({size} bytes).")
+        return SavedPdf(path=file_path, sha256=sha256, size=size, filename=filename, created=created)
+
+    except UploadTooLargeError:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        log.error(f"Falha ao salvar o arquivo '{file.filename}': {e}")
+        return None
+
+
+def discard_saved_pdfs(uploads: List[SavedPdf]) -> None:
+    """
+    Apaga os PDFs gravados por uploads que não serão indexados (ex.: lote
+    rejeitado por um arquivo grande demais). Arquivos que já existiam antes
+    do upload (mesmo conteúdo enviado antes) são mantidos.
+    """
+    for upload in uploads:
+        if not upload.created:
+            continue
+        upload.path.unlink(missing_ok=True)
+        metadata_path(upload.path).unlink(missing_ok=True)
+        log.info(f"Arquivo '{upload.filename}' descartado ('{upload.path}').")
 
-        # Salva o conteúdo do arquivo no disco
-        with open(file_path, "wb") as f:
-            f.write(file.file.read())
-        log.info(f"Arquivo '{file.filename}' salvo com sucesso em '{file_path}'.")
 
+def load_pdf_documents(file_path: Path, filename: str | None = None) -> List[Document] | None:
+    """
+    Extrai o conteúdo de TODAS as páginas de um PDF já salvo em disco.
+
+    Args:
+        file_path: Caminho do PDF.
+        filename: Nome original do upload, gravado como 'source' das páginas
+            (o arquivo em disco tem o nome do hash).
+
+    Returns:
+        Uma lista de objetos Document, onde cada um representa uma página do PDF,
+        ou None se ocorrer um erro.
+    """
+    try:
         # Carrega o PDF salvo para extrair o texto
         loader = PyPDFLoader(str(file_path))
-        
+
         # .load() extrai TODAS as páginas do PDF e retorna uma lista de Documentos.
         documents = loader.load()
-        log.info(f"{len(documents)} páginas extraídas do arquivo '{file.filename}'.")
-        
+        if filename:
+            for document in documents:
+                document.metadata['source'] = filename
+        log.info(f"{len(documents)} páginas extraídas do arquivo '{filename or file_path.name}'.")
+
         return documents
 
     except Exception as e:
-        log.error(f"Falha ao processar o arquivo '{file.filename}': {e}")
-        return None
\ No newline at end of file
+        log.error(f"Falha ao processar o arquivo '{file_path.name}': {e}")
+        return None
+
+
+def process_uploaded_pdf(file: UploadFile) -> List[Document] | None:
+    """
+    Salva um arquivo PDF enviado, extrai o conteúdo de TODAS as páginas
+    e retorna uma lista de Documentos LangChain.
+
+    Args:
+        file: O objeto UploadFile vindo diretamente do FastAPI.
+
+    Returns:
+        Uma lista de objetos Document, onde cada um representa uma página do PDF,
+        ou None se ocorrer um erro.
+    """
+    saved = save_uploaded_pdf(file)
+    if saved is None:
+        return None
+    return load_pdf_documents(saved.path, saved.filename)
@@ -0,0 +1,101 @@
+"""
+Executor limitado para rodar o trabalho bloqueante das perguntas fora do event loop.
+
+A busca no Chroma, o embedding da pergunta, o reranking e a chamada HTTP ao Groq
+são síncronos; aqui eles rodam em um pool de threads dedicado com um limite
+configurável de concorrência, e a fila de espera é exposta como métrica.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from logger import setup_logger
+
+log = setup_logger()
+
+# Número máximo de perguntas processadas simultaneamente por worker do uvicorn
+ASK_MAX_CONCURRENCY = int(os.getenv('ASK_MAX_CONCURRENCY', '4'))
+
+
+class BoundedQueryExecutor:
+    """Pool de threads com limite de concorrência e métricas de fila."""
+
+    def __init__(self, max_concurrency: int = ASK_MAX_CONCURRENCY, name: str = "ask"):
+        self.max_concurrency = max(1, max_concurrency)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix=f"{name}-worker"
+        )
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+        self._total_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Criado sob demanda para pertencer ao event loop do servidor
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Executa func(*args, **kwargs) no pool sem bloquear o event loop.
+
+        Returns:
+            O retorno de func.
+        """
+        semaphore = self._get_semaphore()
+        with self._lock:
+            self._waiting += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._waiting)
+
+        try:
+            await semaphore.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        start = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, lambda: func(*args, **kwargs))
+            with self._lock:
+                self._completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self._total_seconds += elapsed
+            semaphore.release()
+
+    def metrics(self) -> Dict:
+        """Retorna profundidade da fila, execuções em andamento e latência média."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'max_concurrency': self.max_concurrency,
+                'queue_depth': self._waiting,
+                'max_queue_depth': self._max_queue_depth,
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_seconds': round(self._total_seconds / finished, 3) if finished else None,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
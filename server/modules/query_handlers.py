@@ -1,61 +1,387 @@
 # Em server/modules/query_handlers.py
 
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
 from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import format_document
 from logger import setup_logger
-from modules.reranker import rerank_by_relevance
+from modules.reranker import rerank_by_relevance, rerank_with_scores
+from modules.cross_encoder import CROSS_ENCODER_ENABLED, cross_encoder_reranker
+from modules.answer_cache import AnswerCache
+from modules.bm25_index import HYBRID_SEARCH_ENABLED, BM25_CANDIDATES, bm25_index, reciprocal_rank_fusion
+from modules.llm import PROMPT_VARIANT, RETRIEVAL_K, get_prompt, prompt_token_stats
+from modules.llm_providers import model_identity
+from modules.query_parser import merge_filters, build_where
+from modules.document_registry import chunk_id_for_text
+from modules.context_packer import context_packer
 
 log = setup_logger()
 
-def query_chain(chain: RetrievalQA, user_input: str) -> dict:
+# /search: resultados por página e teto de candidatos buscados (página x tamanho)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '10'))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '100'))
+# Metadados devolvidos pelo /search; campos internos do índice ficam de fora
+SEARCH_METADATA_FIELDS = (
+    'source', 'page', 'acordao_numero', 'processo', 'secao',
+    'tipo_tributo', 'ano', 'decisao', 'relevancia_juridica',
+)
+
+
+def retrieve_candidates(
+    chain: RetrievalQA,
+    user_input: str,
+    filters: Optional[Dict[str, str]] = None,
+    k: int = RETRIEVAL_K
+) -> List[Document]:
+    """
+    Busca vetorial (fundida com BM25, se habilitado), antes do reranking.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        filters: Filtros de metadados aplicados na busca (where do Chroma).
+        k: Número de candidatos.
+
+    Returns:
+        Os candidatos na ordem da busca.
+    """
+    # 1. Busca vetorial inicial (recupera k docs), filtrada no Chroma
+    docs_initial = []
+    where = build_where(filters or {})
+    if where is not None:
+        docs_initial = chain.retriever.vectorstore.similarity_search(
+            user_input, k=k, filter=where
+        )
+        log.info(f"Busca filtrada por {filters}: {len(docs_initial)} documento(s).")
+        if not docs_initial:
+            # Nenhum chunk com esses metadados (ex.: chunks do modo tradicional)
+            filters = None
+    if not docs_initial:
+        if k == RETRIEVAL_K:
+            docs_initial = chain.retriever.get_relevant_documents(user_input)
+        else:
+            docs_initial = chain.retriever.vectorstore.similarity_search(user_input, k=k)
+    log.debug(f"Documentos recuperados inicialmente: {len(docs_initial)}")
+
+    # 1b. Busca lexical (BM25) fundida com a vetorial via RRF; acompanha k
+    # para que as páginas do /search também tenham candidatos lexicais
+    if HYBRID_SEARCH_ENABLED:
+        bm25_k = max(BM25_CANDIDATES, k)
+        docs_bm25 = [
+            doc for doc, _ in bm25_index.search(user_input, chain.retriever.vectorstore, k=bm25_k, filters=filters)
+        ]
+        docs_initial = reciprocal_rank_fusion([docs_initial, docs_bm25], top_n=k)
+        log.debug(f"Documentos após fusão híbrida: {len(docs_initial)} ({len(docs_bm25)} do BM25)")
+    return docs_initial
+
+
+def retrieve_documents(
+    chain: RetrievalQA,
+    user_input: str,
+    filters: Optional[Dict[str, str]] = None
+) -> List[Document]:
+    """
+    Busca vetorial (fundida com BM25, se habilitado) seguida de reranking.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        filters: Filtros de metadados aplicados na busca (where do Chroma).
+
+    Returns:
+        Os documentos reranqueados (top 5).
+    """
+    docs_initial = retrieve_candidates(chain, user_input, filters)
+
+    # 2. Aplica reranking (retorna top 5)
+    if CROSS_ENCODER_ENABLED:
+        # Ordena todos os candidatos pela heurística e refina com o cross-encoder
+        candidates = rerank_by_relevance(docs_initial, user_input, top_k=len(docs_initial))
+        docs_reranked = [doc for doc, _ in cross_encoder_reranker.rerank(user_input, candidates, top_k=5)]
+    else:
+        docs_reranked = rerank_by_relevance(docs_initial, user_input, top_k=5)
+    log.info(f"Documentos após reranking: {len(docs_reranked)}")
+    return docs_reranked
+
+
+def search_documents(
+    chain: RetrievalQA,
+    user_input: str,
+    filters: Optional[Dict[str, str]] = None,
+    page: int = 1,
+    page_size: int = SEARCH_PAGE_SIZE
+) -> dict:
+    """
+    Busca sem LLM: mesma recuperação e reranking heurístico do /ask/, com os
+    scores e paginação. O cross-encoder fica de fora para manter a consulta
+    no custo de uma busca vetorial.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: O texto buscado.
+        filters: Filtros explícitos (tipo_tributo, ano, decisao, acordao_numero),
+            combinados com os detectados no texto.
+        page: Página (a partir de 1).
+        page_size: Resultados por página.
+
+    Returns:
+        Dicionário com os filtros aplicados, a paginação e os resultados
+        (rank, score, chunk_id, texto e os metadados de SEARCH_METADATA_FIELDS).
+    """
+    filters = merge_filters(user_input, filters)
+    start = (page - 1) * page_size
+    # Candidatos suficientes para a página pedida, até SEARCH_MAX_RESULTS
+    k = min(max(RETRIEVAL_K, start + page_size), SEARCH_MAX_RESULTS)
+
+    candidates = retrieve_candidates(chain, user_input, filters, k)
+    ranked = rerank_with_scores(candidates, user_input, top_k=len(candidates))
+    page_items = ranked[start:start + page_size]
+
+    return {
+        "query": user_input,
+        "filters": filters,
+        "page": page,
+        "page_size": page_size,
+        "total": len(ranked),
+        "has_more": start + page_size < len(ranked),
+        "results": [
+            {
+                "rank": start + i + 1,
+                "score": round(score, 4),
+                "chunk_id": doc.metadata.get('chunk_id') or chunk_id_for_text(doc.page_content),
+                "text": doc.page_content,
+                "metadata": {
+                    name: doc.metadata[name] for name in SEARCH_METADATA_FIELDS if name in doc.metadata
+                },
+            }
+            for i, (doc, score) in enumerate(page_items)
+        ],
+    }
+
+
+def build_messages(
+    chain: RetrievalQA,
+    user_input: str,
+    docs: List[Document],
+    prompt_variant: Optional[str] = None
+) -> Tuple[str, List[BaseMessage]]:
+    """
+    Monta as mensagens (sistema + usuário) que a cadeia 'stuff' enviaria ao LLM.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        docs: Documentos usados como contexto.
+        prompt_variant: 'full' ou 'compact'; None usa o prompt da cadeia (PROMPT_VARIANT).
+
+    Returns:
+        Tupla (variante usada, mensagens).
+    """
+    combine_chain = chain.combine_documents_chain
+    context = combine_chain.document_separator.join(
+        format_document(doc, combine_chain.document_prompt) for doc in docs
+    )
+    if prompt_variant is None:
+        prompt_variant, prompt = PROMPT_VARIANT, combine_chain.llm_chain.prompt
+    else:
+        prompt = get_prompt(prompt_variant)
+    return prompt_variant, prompt.format_messages(context=context, question=user_input)
+
+
+def generate_answer(
+    chain: RetrievalQA,
+    user_input: str,
+    docs: List[Document],
+    prompt_variant: Optional[str] = None
+) -> dict:
+    """
+    Executa o LLM com os documentos já reranqueados e formata a resposta.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        docs: Documentos usados como contexto.
+        prompt_variant: Variante do prompt ('full' ou 'compact'); None usa a padrão.
+
+    Returns:
+        Um dicionário com a resposta, as fontes, a variante e os tokens de prompt.
+    """
+    variant, messages = build_messages(chain, user_input, docs, prompt_variant)
+    message = chain.combine_documents_chain.llm_chain.llm.invoke(messages)
+    prompt_tokens = prompt_token_stats.record(variant, messages, getattr(message, 'usage_metadata', None))
+
+    # Formata a resposta de forma limpa
+    return {
+        "response": message.content or "Não foi possível gerar uma resposta.",
+        "sources": format_sources(docs),
+        "prompt_variant": variant,
+        "prompt_tokens": prompt_tokens,
+    }
+
+
+def chunk_ids_of(docs: List[Document]) -> List[str]:
+    """IDs dos chunks (metadata['chunk_id'] ou hash do texto para chunks antigos)."""
+    return [doc.metadata.get('chunk_id') or chunk_id_for_text(doc.page_content) for doc in docs]
+
+
+def format_sources(docs: List[Document]) -> List[str]:
+    return [doc.metadata.get("source", "Fonte desconhecida") for doc in docs]
+
+
+@dataclass
+class PreparedQuery:
+    """Resultado da etapa de recuperação, antes da geração pelo LLM."""
+    docs: List[Document] = field(default_factory=list)
+    chunk_ids: List[str] = field(default_factory=list)
+    query_vector: Optional[List[float]] = None
+    cached: Optional[dict] = None  # resposta do cache, se houver
+    context_tokens: Optional[int] = None  # tokens do contexto após o empacotamento
+    cache_scope: str = ''  # modelo + variante do prompt, parte da chave do cache
+
+
+def answer_cache_scope(prompt_variant: Optional[str] = None) -> str:
+    """Escopo do cache de respostas: respostas de outro modelo ou variante não servem."""
+    return f"{model_identity()}|{prompt_variant or PROMPT_VARIANT}"
+
+
+def prepare_query(
+    chain: RetrievalQA,
+    user_input: str,
+    answer_cache: Optional[AnswerCache] = None,
+    filters: Optional[Dict[str, str]] = None,
+    prompt_variant: Optional[str] = None
+) -> PreparedQuery:
+    """
+    Consulta o cache de respostas e, se necessário, faz a busca vetorial + reranking.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        answer_cache: Cache de respostas opcional.
+        filters: Filtros explícitos (tipo_tributo, ano, decisao, acordao_numero),
+            combinados com os detectados na pergunta.
+        prompt_variant: Variante do prompt que vai gerar a resposta; o cache só
+            devolve respostas geradas com a mesma variante e o mesmo modelo.
+
+    Returns:
+        PreparedQuery com os documentos (já empacotados no orçamento de
+        tokens) ou a resposta já em cache.
+    """
+    filters = merge_filters(user_input, filters)
+    scope = answer_cache_scope(prompt_variant)
+
+    # 1. Cache semântico: pergunta equivalente já respondida, sem nem buscar no Chroma.
+    # Perguntas com filtros (ex.: outro ano) não usam essa busca aproximada.
+    query_vector = None
+    if answer_cache is not None and answer_cache.similarity_enabled and not filters:
+        query_vector = chain.retriever.vectorstore.embeddings.embed_query(user_input)
+        cached = answer_cache.get_similar(query_vector, scope)
+        if cached is not None:
+            log.info("Resposta servida pelo cache (similaridade).")
+            return PreparedQuery(
+                query_vector=query_vector, cached={**cached, "cache": "similar"}, cache_scope=scope
+            )
+
+    # 2. Busca vetorial + reranking
+    docs_reranked = retrieve_documents(chain, user_input, filters)
+
+    # 3. Cache exato: mesma pergunta normalizada e mesmos chunks
+    chunk_ids = chunk_ids_of(docs_reranked)
+    prepared = PreparedQuery(
+        docs=docs_reranked, chunk_ids=chunk_ids, query_vector=query_vector, cache_scope=scope
+    )
+    if answer_cache is not None:
+        cached = answer_cache.get(user_input, chunk_ids, scope)
+        if cached is not None:
+            log.info("Resposta servida pelo cache (exato).")
+            prepared.cached = {**cached, "cache": "exact"}
+            return prepared
+
+    # 4. Frases mais relevantes dos chunks, dentro do orçamento de tokens.
+    # O cache continua indexado pelos chunk_ids originais.
+    prepared.docs, packing = context_packer.pack(docs_reranked, user_input)
+    prepared.context_tokens = packing['tokens_after']
+    return prepared
+
+
+async def astream_answer(
+    chain: RetrievalQA,
+    user_input: str,
+    docs: List[Document],
+    prompt_variant: Optional[str] = None,
+    usage: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Gera a resposta do LLM token a token, com o mesmo prompt e contexto
+    que a cadeia 'stuff' montaria.
+
+    Args:
+        chain: A instância da cadeia RetrievalQA.
+        user_input: A pergunta do usuário.
+        docs: Documentos usados como contexto.
+        prompt_variant: Variante do prompt ('full' ou 'compact'); None usa a padrão.
+        usage: Se informado, recebe prompt_variant e prompt_tokens ao final do streaming.
+
+    Yields:
+        Trechos de texto à medida que o LLM os produz.
+    """
+    variant, messages = build_messages(chain, user_input, docs, prompt_variant)
+    usage_metadata = None
+
+    async for chunk in chain.combine_documents_chain.llm_chain.llm.astream(messages):
+        if getattr(chunk, 'usage_metadata', None):
+            usage_metadata = chunk.usage_metadata
+        if chunk.content:
+            yield chunk.content
+
+    prompt_tokens = prompt_token_stats.record(variant, messages, usage_metadata)
+    if usage is not None:
+        usage.update(prompt_variant=variant, prompt_tokens=prompt_tokens)
+
+
+def query_chain(
+    chain: RetrievalQA,
+    user_input: str,
+    answer_cache: Optional[AnswerCache] = None,
+    filters: Optional[Dict[str, str]] = None,
+    prompt_variant: Optional[str] = None
+) -> dict:
     """
     Executa a cadeia RAG com a pergunta do usuário e formata a resposta.
     Aplica reranking aos documentos recuperados antes de enviar ao LLM.
+    Com answer_cache, perguntas repetidas são respondidas sem chamar o LLM.
 
     Args:
         chain: A instância da cadeia RetrievalQA.
         user_input: A pergunta do usuário.
+        answer_cache: Cache de respostas opcional.
+        filters: Filtros de metadados explícitos (opcional).
+        prompt_variant: Variante do prompt ('full' ou 'compact'); None usa a padrão.
 
     Returns:
-        Um dicionário com a resposta e as fontes, ou gera uma exceção em caso de erro.
+        Um dicionário com a resposta, as fontes, a variante e os tokens de prompt
+        (os da chamada original, em respostas do cache, que trazem também
+        'cache'), ou gera uma exceção em caso de erro.
     """
     try:
         log.debug(f"Executando a cadeia para a entrada: '{user_input}'")
 
-        # 1. Busca vetorial inicial (recupera k=8 docs)
-        docs_initial = chain.retriever.get_relevant_documents(user_input)
-        log.debug(f"Documentos recuperados inicialmente: {len(docs_initial)}")
+        prepared = prepare_query(chain, user_input, answer_cache, filters, prompt_variant)
+        if prepared.cached is not None:
+            return prepared.cached
 
-        # 2. Aplica reranking (retorna top 5)
-        docs_reranked = rerank_by_relevance(docs_initial, user_input, top_k=5)
-        log.info(f"Documentos após reranking: {len(docs_reranked)}")
-
-        # 3. Sobrescreve temporariamente os docs recuperados
-        # Cria um dicionário com inputs formatados para o chain
-        formatted_inputs = {
-            "query": user_input,
-            "source_documents": docs_reranked
-        }
-
-        # 4. Executa o LLM com docs reranqueados
-        # Vamos usar combine_documents_chain diretamente
-        context = "\n\n".join([doc.page_content for doc in docs_reranked])
-        llm_inputs = {
-            "context": context,
-            "question": user_input
-        }
-
-        llm_result = chain.combine_documents_chain.invoke(
-            {"input_documents": docs_reranked, "question": user_input}
-        )
+        # 5. Executa o LLM com o contexto empacotado
+        response = generate_answer(chain, user_input, prepared.docs, prompt_variant)
 
-        # 5. Formata a resposta de forma limpa
-        response = {
-            "response": llm_result.get("output_text", "Não foi possível gerar uma resposta."),
-            "sources": [
-                doc.metadata.get("source", "Fonte desconhecida")
-                for doc in docs_reranked
-            ]
-        }
+        if answer_cache is not None:
+            # Guarda a variante e os tokens da chamada que gerou a resposta
+            answer_cache.put(
+                user_input, prepared.chunk_ids, response, prepared.query_vector, prepared.cache_scope
+            )
 
         log.debug(f"Resposta da cadeia: {response}")
         return response
@@ -63,4 +389,4 @@ def query_chain(chain: RetrievalQA, user_input: str) -> dict:
     except Exception as e:
         log.exception("Ocorreu um erro ao executar a cadeia de consulta.")
         # Relança a exceção para que o endpoint do FastAPI possa tratá-la.
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,96 @@
+"""
+Extração de filtros de metadados a partir da pergunta do usuário.
+
+Detecta tributo, ano, decisão e número do acórdão no texto (ou recebe os
+filtros explícitos do /ask/) e monta o filtro `where` do Chroma, para que a
+busca vetorial considere apenas os chunks compatíveis.
+"""
+
+import re
+from typing import Dict, Optional
+
+# Campos de metadados aceitos como filtro (mesmos nomes de create_structural_chunks_from_json)
+FILTER_FIELDS = ('tipo_tributo', 'ano', 'decisao', 'acordao_numero')
+
+TRIBUTO_PATTERN = re.compile(r'\b(ICMS|IPVA|ITCD)\b', re.IGNORECASE)
+ACORDAO_PATTERN = re.compile(r'AC[ÓO]RD[ÃA]O\s*(?:N[º°O.]*\s*)?(\d{1,4}\s*/\s*\d{4})', re.IGNORECASE)
+PROCESSO_PATTERN = re.compile(r'\b\d{4}/\d{2}/\d+\b')
+# Ano isolado (não faz parte de "11/2017" nem de "2014/10/32144")
+ANO_PATTERN = re.compile(r'(?<![\d/])((?:19|20)\d{2})(?![\d/])')
+# Ordem importa: "parcialmente provido" e "improvido" contêm "provido".
+# "Parcial" sozinho não basta ("o pedido foi parcialmente analisado?")
+DECISAO_PATTERNS = (
+    ('parcial', re.compile(
+        r'\b(?:parcialmente\s+(?:provid[oa]s?|procedentes?)|provid[oa]s?\s+(?:parcialmente|em\s+parte)'
+        r'|parcial\s+(?:provimento|proced[êe]ncia)|(?:provimento|proced[êe]ncia)\s+parcial'
+        r'|procedentes?\s+em\s+parte)\b',
+        re.IGNORECASE
+    )),
+    ('improvido', re.compile(r'\b(?:improvid[oa]s?|n[ãa]o\s+provid[oa]s?|negad[oa]s?|negou|nega(?:do)?\s+provimento)\b', re.IGNORECASE)),
+    ('provido', re.compile(r'\b(?:provid[oa]s?|deu\s+provimento|deferid[oa]s?)\b', re.IGNORECASE)),
+)
+
+
+def parse_query_filters(question: str) -> Dict[str, str]:
+    """
+    Detecta filtros de metadados mencionados na pergunta.
+
+    Args:
+        question: Pergunta do usuário
+
+    Returns:
+        Dicionário campo -> valor (apenas os campos detectados)
+    """
+    filters = {}
+
+    tributo = TRIBUTO_PATTERN.search(question)
+    if tributo:
+        filters['tipo_tributo'] = tributo.group(1).upper()
+
+    acordao = ACORDAO_PATTERN.search(question)
+    if acordao:
+        # Mesmo formato de AcordaoDocumento.acordao_numero (sem espaços)
+        filters['acordao_numero'] = acordao.group(1).replace(' ', '')
+    else:
+        ano = ANO_PATTERN.search(question)
+        if ano:
+            filters['ano'] = ano.group(1)
+
+    # Em perguntas sobre um acórdão/processo específico a decisão é o que se quer
+    # saber ("o recurso do acórdão 11/2017 foi provido?"), não um filtro
+    if not acordao and not PROCESSO_PATTERN.search(question):
+        for decisao, pattern in DECISAO_PATTERNS:
+            if pattern.search(question):
+                filters['decisao'] = decisao
+                break
+
+    return filters
+
+
+def merge_filters(question: str, explicit: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, str]:
+    """Filtros detectados na pergunta, sobrescritos pelos filtros explícitos."""
+    filters = parse_query_filters(question)
+    for field, value in (explicit or {}).items():
+        if field in FILTER_FIELDS and value:
+            filters[field] = value.strip().upper() if field == 'tipo_tributo' else value.strip().lower()
+    return filters
+
+
+def build_where(filters: Dict[str, str]) -> Optional[Dict]:
+    """
+    Converte filtros em um `where` do Chroma.
+
+    Returns:
+        None sem filtros, a condição simples com um filtro ou um `$and`
+    """
+    conditions = [{field: value} for field, value in filters.items()]
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {'$and': conditions}
+
+
+def matches_filters(metadata: Dict, filters: Dict[str, str]) -> bool:
+    """Verifica se os metadados de um chunk satisfazem todos os filtros."""
+    return all(metadata.get(field) == value for field, value in filters.items())
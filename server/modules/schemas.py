@@ -136,4 +136,7 @@ class ExtractionResult(BaseModel):
     errors: List[str] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
     raw_markdown: Optional[str] = Field(None, description="Markdown bruto do PDF")
+    page_offsets: Optional[List[int]] = Field(None, description="Offset inicial de cada página em raw_markdown")
+    llm_used: Optional[bool] = Field(None, description="Se a decisão foi extraída pelo LLM (False = regras)")
+    decisao_confianca: Optional[float] = Field(None, description="Confiança do classificador de decisão por regras")
     source_file: str
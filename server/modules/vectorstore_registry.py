@@ -0,0 +1,127 @@
+"""
+Registro de processo para o modelo de embeddings e o vectorstore Chroma.
+
+O modelo all-MiniLM-L12-v2 é carregado uma única vez por processo e o mesmo
+handle do Chroma é compartilhado entre o startup da API, os uploads e o
+script de reindexação. Tempo de carga e memória consumida ficam disponíveis
+em get_registry_metrics().
+"""
+
+import os
+import resource
+import threading
+import time
+from typing import Dict, Optional
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from logger import setup_logger
+from modules.embedding_cache import CachedEmbeddings
+
+log = setup_logger()
+
+PERSIST_DIR = "./chroma_store"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L12-v2"
+# 'fake' troca o modelo por vetores determinísticos (hash do texto), para testes
+# de carga offline sem baixar o modelo; use um PERSIST_DIR separado
+EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'huggingface').lower()
+FAKE_EMBEDDING_SIZE = 384
+# Textos por lote enviado ao modelo de embeddings durante a ingestão
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '128'))
+# Cache persistente de embeddings na frente do modelo (desative com EMBEDDING_CACHE_ENABLED=false)
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+
+_lock = threading.RLock()
+_embeddings: Optional[Embeddings] = None
+_vectorstore: Optional[Chroma] = None
+_metrics: Dict[str, Optional[float]] = {
+    'embedding_model': EMBEDDING_MODEL_NAME if EMBEDDING_PROVIDER != 'fake' else 'fake',
+    'embedding_load_seconds': None,
+    'embedding_rss_delta_mb': None,
+    'vectorstore_open_seconds': None,
+    'embedding_requests': 0,
+    'vectorstore_requests': 0,
+}
+
+
+def _current_rss_mb() -> float:
+    """Retorna o pico de memória residente do processo em MB (Linux: KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Retorna o modelo de embeddings compartilhado, carregando-o na primeira chamada.
+
+    Returns:
+        Instância única de embeddings para o processo (com cache, se habilitado).
+    """
+    global _embeddings
+    with _lock:
+        _metrics['embedding_requests'] += 1
+        if _embeddings is None:
+            log.info(f"Carregando modelo de embeddings '{_metrics['embedding_model']}'...")
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            if EMBEDDING_PROVIDER == 'fake':
+                _embeddings = DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE)
+            else:
+                _embeddings = HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE}
+                )
+            if EMBEDDING_CACHE_ENABLED and EMBEDDING_PROVIDER != 'fake':
+                _embeddings = CachedEmbeddings(_embeddings, model_name=EMBEDDING_MODEL_NAME)
+            _metrics['embedding_load_seconds'] = round(time.perf_counter() - start, 3)
+            _metrics['embedding_rss_delta_mb'] = round(_current_rss_mb() - rss_before, 1)
+            log.info(
+                f"Modelo de embeddings carregado em {_metrics['embedding_load_seconds']}s "
+                f"(+{_metrics['embedding_rss_delta_mb']} MB)"
+            )
+        return _embeddings
+
+
+def get_vectorstore() -> Chroma:
+    """
+    Retorna o handle compartilhado do Chroma, criando a coleção se necessário.
+
+    Returns:
+        Instância única do Chroma persistida em PERSIST_DIR.
+    """
+    global _vectorstore
+    with _lock:
+        _metrics['vectorstore_requests'] += 1
+        if _vectorstore is None:
+            embeddings = get_embeddings()
+            start = time.perf_counter()
+            _vectorstore = Chroma(
+                persist_directory=PERSIST_DIR,
+                embedding_function=embeddings
+            )
+            _metrics['vectorstore_open_seconds'] = round(time.perf_counter() - start, 3)
+            log.info(f"ChromaDB aberto em '{PERSIST_DIR}'.")
+        return _vectorstore
+
+
+def reset_vectorstore() -> None:
+    """
+    Descarta o handle do Chroma (ex.: após apagar PERSIST_DIR na reindexação).
+    O modelo de embeddings permanece carregado.
+    """
+    global _vectorstore
+    with _lock:
+        _vectorstore = None
+
+
+def get_registry_metrics() -> Dict:
+    """Retorna uma cópia das métricas de carga do registro."""
+    with _lock:
+        return {
+            **_metrics,
+            'embedding_cache': _embeddings.stats() if isinstance(_embeddings, CachedEmbeddings) else None,
+            'embedding_loaded': _embeddings is not None,
+            'vectorstore_open': _vectorstore is not None,
+            'process_max_rss_mb': round(_current_rss_mb(), 1),
+        }
@@ -1,7 +1,8 @@
 """
 Script de teste para extração de acórdãos.
 
-Processa os 3 PDFs de teste e gera relatório de assertividade.
+Processa os 3 PDFs de teste e gera relatório de assertividade, incluindo a
+taxa de chamadas ao LLM evitadas pelo classificador de decisão por regras.
 """
 
 import sys
@@ -76,6 +77,8 @@ def test_single_pdf(pdf_path: Path) -> dict:
         'success': result.success,
         'errors': result.errors,
         'warnings': result.warnings,
+        'llm_usado': result.llm_used,
+        'decisao_confianca': result.decisao_confianca,
         'campos_obrigatorios': 0,
         'campos_opcionais': 0,
         'total_campos': 0
@@ -136,6 +139,9 @@ def test_single_pdf(pdf_path: Path) -> dict:
     print(f"\n{BOLD}Estatísticas:{RESET}")
     print(f"  Campos obrigatórios: {stats['campos_obrigatorios']}/{len(obrigatorios)} ({sucesso_obrigatorios:.1f}%)")
     print(f"  Campos opcionais: {stats['campos_opcionais']}/{len(opcionais)} ({sucesso_opcionais:.1f}%)")
+    if result.llm_used is not None:
+        origem = "LLM" if result.llm_used else "regras"
+        print(f"  Decisão extraída por: {origem} (confiança das regras: {result.decisao_confianca or 0:.2f})")
 
     stats['sucesso_obrigatorios_pct'] = sucesso_obrigatorios
     stats['sucesso_opcionais_pct'] = sucesso_opcionais
@@ -188,6 +194,13 @@ def main():
     if falhas > 0:
         print_error(f"  Falhas: {falhas}")
 
+    # Chamadas ao LLM evitadas pelo classificador por regras
+    classificados = [s for s in all_stats if s['llm_usado'] is not None]
+    evitadas = sum(1 for s in classificados if not s['llm_usado'])
+    taxa_evitadas = (evitadas / len(classificados)) * 100 if classificados else 0.0
+    if classificados:
+        print(f"  Chamadas ao LLM evitadas: {evitadas}/{len(classificados)} ({taxa_evitadas:.1f}%)")
+
     if sucessos > 0:
         # Média de assertividade
         media_obrigatorios = sum(s['sucesso_obrigatorios_pct'] for s in all_stats if s['success']) / sucessos
@@ -216,6 +229,8 @@ def main():
             'total_pdfs': len(all_stats),
             'sucessos': sucessos,
             'falhas': falhas,
+            'llm_chamadas_evitadas': evitadas,
+            'llm_taxa_evitadas_pct': taxa_evitadas,
             'detalhes': all_stats
         }, f, indent=2, ensure_ascii=False)
 
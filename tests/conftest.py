@@ -0,0 +1,14 @@
+"""
+Configuração dos testes unitários (pytest, a partir da raiz do repositório).
+
+Os módulos do servidor importam uns aos outros como 'modules.*' e 'logger',
+como quando o servidor roda de dentro de server/.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / 'server'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,50 @@
+"""Testes do índice de acórdãos estruturados (modules.acordao_store)."""
+
+import json
+
+import pytest
+
+from modules.acordao_store import AcordaoStore, normalize_numero
+
+
+@pytest.mark.parametrize(
+    "numero, esperado",
+    [
+        ("11/2017", "11/2017"),
+        ("011/2017", "11/2017"),
+        ("11 / 2017", "11/2017"),
+        (" 0011/2017 ", "11/2017"),
+        (None, ""),
+    ],
+)
+def test_normalize_numero(numero, esperado):
+    assert normalize_numero(numero) == esperado
+
+
+@pytest.fixture
+def store(tmp_path):
+    record = {
+        'acordao_numero': '011/2017',
+        'processo': '2014/10/32144',
+        'relator': {'tipo': 'Conselheiro', 'nome': 'Fulano de Tal'},
+        'acordao': {'decisao': 'improvido', 'votacao': 'unanimidade'},
+    }
+    (tmp_path / 'acordao.json').write_text(json.dumps(record), encoding='utf-8')
+    store = AcordaoStore(str(tmp_path))
+    store.load()
+    return store
+
+
+@pytest.mark.parametrize("numero", ["11/2017", "011/2017", "11 / 2017"])
+def test_get_ignora_zeros_e_espacos(store, numero):
+    assert store.get(numero)['processo'] == '2014/10/32144'
+
+
+def test_answer_com_numero_sem_zero(store):
+    answer = store.answer("Qual a decisão do acórdão 11/2017?")
+    assert answer['fast_path'] == ['decisao']
+    assert 'improvido' in answer['response']
+
+
+def test_answer_pedido_de_explicacao_vai_para_o_rag(store):
+    assert store.answer("Por que o acórdão 011/2017 negou provimento?") is None
@@ -0,0 +1,85 @@
+"""Testes do empacotamento de contexto (modules.context_packer)."""
+
+from langchain_core.documents import Document
+
+from modules.context_packer import OMISSION, ContextPacker
+
+DISPOSITIVO = "ACORDAM os membros da Câmara, à unanimidade, em negar provimento ao recurso."
+
+
+def _doc(text, acordao_numero=None, source="acordao.pdf"):
+    metadata = {'source': source}
+    if acordao_numero:
+        metadata['acordao_numero'] = acordao_numero
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_dispositivo_igual_em_acordaos_diferentes_e_mantido():
+    docs = [
+        _doc(f"Acórdão 10/2020. {DISPOSITIVO}", '10/2020', 'a.pdf'),
+        _doc(f"Acórdão 11/2021. {DISPOSITIVO}", '11/2021', 'b.pdf'),
+    ]
+    packed, stats = ContextPacker(budget=1000).pack(docs, "decisão do acórdão 11/2021")
+    assert [doc.page_content for doc in packed] == [doc.page_content for doc in docs]
+    assert stats['duplicates_removed'] == 0
+
+
+def test_overlap_no_mesmo_documento_e_removido():
+    docs = [
+        _doc(f"Relatório do processo. {DISPOSITIVO}", '10/2020'),
+        _doc(f"{DISPOSITIVO} Votaram os conselheiros.", '10/2020'),
+    ]
+    packed, stats = ContextPacker(budget=1000).pack(docs, "decisão")
+    assert packed[1].page_content == "Votaram os conselheiros."
+    assert stats['duplicates_removed'] == 1
+
+
+def test_trecho_so_conta_como_repetido_em_limite_de_termo():
+    docs = [
+        _doc("O recurso foi improvido pela Câmara.", '10/2020'),
+        _doc("Provido.", '10/2020'),
+    ]
+    packed, stats = ContextPacker(budget=1000).pack(docs, "recurso")
+    assert packed[1].page_content == "Provido."
+    assert stats['duplicates_removed'] == 0
+
+
+def test_chunk_todo_repetido_mantem_uma_frase():
+    docs = [
+        _doc(f"Relatório do processo. {DISPOSITIVO}", '10/2020'),
+        _doc(DISPOSITIVO, '10/2020'),
+    ]
+    packed, _ = ContextPacker(budget=1000).pack(docs, "decisão")
+    assert len(packed) == len(docs)
+    assert packed[1].page_content == DISPOSITIVO
+    assert packed[1].metadata == docs[1].metadata
+
+
+def test_orcamento_mantem_uma_frase_por_chunk_na_ordem_original():
+    frases = [f"Frase número {i} sobre tema diverso do processo." for i in range(6)]
+    relevante = "O ICMS da substituição tributária foi recolhido."
+    docs = [
+        _doc(' '.join(frases[:3] + [relevante] + frases[3:]), '10/2020', 'a.pdf'),
+        _doc("Outro acórdão sem relação com a pergunta.", '11/2021', 'b.pdf'),
+    ]
+    packed, stats = ContextPacker(budget=20).pack(docs, "ICMS substituição tributária")
+    assert len(packed) == 2
+    assert relevante in packed[0].page_content
+    assert packed[1].page_content == docs[1].page_content
+    assert stats['tokens_after'] < stats['tokens_before']
+
+
+def test_frases_omitidas_sao_marcadas():
+    docs = [_doc(
+        "Primeira frase com ICMS. Segunda frase longa sobre outro assunto qualquer do relatório. "
+        "Terceira frase com ICMS."
+    )]
+    packed, _ = ContextPacker(budget=14).pack(docs, "ICMS")
+    assert packed[0].page_content == f"Primeira frase com ICMS. {OMISSION} Terceira frase com ICMS."
+
+
+def test_desabilitado_devolve_os_documentos():
+    docs = [_doc(DISPOSITIVO), _doc(DISPOSITIVO)]
+    packed, stats = ContextPacker(enabled=False).pack(docs, "decisão")
+    assert packed is docs
+    assert stats['tokens_before'] == stats['tokens_after']
@@ -0,0 +1,87 @@
+"""Testes do classificador de decisão por regras (modules.decision_classifier)."""
+
+import pytest
+
+from modules.decision_classifier import DECISAO_CONFIDENCE_THRESHOLD, classify_acordao
+
+PREFIXO = "ACORDAM os membros da Câmara, à unanimidade de votos, em "
+
+
+@pytest.mark.parametrize(
+    "dispositivo, decisao",
+    [
+        # Formas diretas
+        ("dar provimento ao recurso.", "provido"),
+        ("negar provimento ao recurso.", "improvido"),
+        ("dar provimento parcial ao recurso.", "parcial"),
+        ("dar parcial provimento ao recurso.", "parcial"),
+        # Negações vêm antes das formas positivas
+        ("não dar provimento ao recurso.", "improvido"),
+        ("não se dar provimento ao recurso.", "improvido"),
+        ("considerar o recurso não provido.", "improvido"),
+        # Clíticos
+        ("negar-lhe provimento.", "improvido"),
+        ("dar-lhe provimento.", "provido"),
+        ("dá-se-lhe provimento.", "provido"),
+        # "provido" dentro de outras palavras não conta
+        ("julgar o recurso improvido.", "improvido"),
+        ("julgar o recurso desprovido.", "improvido"),
+        # Palavras quebradas pelo PDF
+        ("negar pro vimento ao recurso.", "improvido"),
+        # Procedência parcial
+        ("julgar procedente em parte o auto de infração.", "parcial"),
+        ("julgar parcialmente procedente o lançamento.", "parcial"),
+    ],
+)
+def test_decisao_do_dispositivo(dispositivo, decisao):
+    result = classify_acordao(PREFIXO + dispositivo + " Participaram do julgamento.")
+    assert result.decisao == decisao
+    assert result.votacao == "unanimidade"
+    assert result.confidence >= DECISAO_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize(
+    "dispositivo",
+    [
+        # Procedente/improcedente dizem respeito ao auto, não ao recurso
+        "julgar procedente o auto de infração.",
+        "julgar improcedente o lançamento.",
+        "adotar as providências cabíveis.",
+    ],
+)
+def test_procedencia_do_auto_nao_e_decisao_do_recurso(dispositivo):
+    assert classify_acordao(PREFIXO + dispositivo).decisao is None
+
+
+def test_indicio_fraco_fica_abaixo_do_limiar():
+    # Só "mantendo a decisão" aponta para a decisão: o LLM deve ser consultado
+    result = classify_acordao(
+        PREFIXO + "julgar procedente o auto de infração, mantendo a decisão recorrida."
+    )
+    assert result.decisao == "improvido"
+    assert 0 < result.confidence < DECISAO_CONFIDENCE_THRESHOLD
+
+
+def test_evidencias_conflitantes_ficam_abaixo_do_limiar():
+    result = classify_acordao(PREFIXO + "dar provimento ao recurso de ofício e negar provimento ao voluntário.")
+    assert result.confidence == 0.5
+    assert result.confidence < DECISAO_CONFIDENCE_THRESHOLD
+
+
+def test_sem_votacao_reduz_a_confianca():
+    com_votacao = classify_acordao(PREFIXO + "negar provimento ao recurso.")
+    sem_votacao = classify_acordao("ACORDAM os membros da Câmara em negar provimento ao recurso.")
+    assert sem_votacao.votacao is None
+    assert sem_votacao.confidence < com_votacao.confidence
+
+
+def test_maioria_com_palavra_quebrada():
+    result = classify_acordao("ACORDAM os membros, por maior ia de votos, em dar provimento ao recurso.")
+    assert result.decisao == "provido"
+    assert result.votacao == "maioria"
+
+
+def test_texto_sem_decisao():
+    result = classify_acordao("Relatório do processo, sem dispositivo.")
+    assert result.decisao is None
+    assert result.confidence == 0.0
@@ -0,0 +1,48 @@
+"""Testes da gravação de uploads (modules.pdf_handlers)."""
+
+import io
+
+import pytest
+
+from modules import pdf_handlers
+
+
+class _Upload:
+    """Substituto mínimo do UploadFile do FastAPI."""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.file = io.BytesIO(data)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_handlers, 'UPLOAD_DIR', tmp_path)
+    return tmp_path
+
+
+def test_upload_grava_pelo_hash_com_nome_original(upload_dir):
+    saved = pdf_handlers.save_uploaded_pdf(_Upload('acordao.pdf', b'%PDF-1.4 a'))
+    assert saved.path == upload_dir / f"{saved.sha256}.pdf"
+    assert pdf_handlers.original_filename(saved.path) == 'acordao.pdf'
+    assert saved.created
+
+
+def test_upload_grande_demais_nao_deixa_arquivo(upload_dir, monkeypatch):
+    monkeypatch.setattr(pdf_handlers, 'MAX_UPLOAD_BYTES', 4)
+    with pytest.raises(pdf_handlers.UploadTooLargeError):
+        pdf_handlers.save_uploaded_pdf(_Upload('grande.pdf', b'%PDF-1.4 grande'))
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_descarte_mantem_arquivos_de_uploads_anteriores(upload_dir):
+    anterior = pdf_handlers.save_uploaded_pdf(_Upload('a.pdf', b'%PDF-1.4 a'))
+    repetido = pdf_handlers.save_uploaded_pdf(_Upload('a-copia.pdf', b'%PDF-1.4 a'))
+    novo = pdf_handlers.save_uploaded_pdf(_Upload('b.pdf', b'%PDF-1.4 b'))
+    assert not repetido.created
+
+    pdf_handlers.discard_saved_pdfs([repetido, novo])
+
+    assert anterior.path.exists()
+    assert not novo.path.exists()
+    assert not pdf_handlers.metadata_path(novo.path).exists()
@@ -0,0 +1,29 @@
+"""Testes da detecção de filtros na pergunta (modules.query_parser)."""
+
+import pytest
+
+from modules.query_parser import parse_query_filters
+
+
+@pytest.mark.parametrize(
+    "question, decisao",
+    [
+        ("quais recursos de ICMS foram parcialmente providos?", "parcial"),
+        ("casos de provimento parcial em 2019", "parcial"),
+        ("decisões com parcial procedência", "parcial"),
+        ("recursos providos em parte", "parcial"),
+        ("quais recursos foram improvidos?", "improvido"),
+        ("recursos não providos de IPVA", "improvido"),
+        ("recursos providos de ITCD", "provido"),
+        # "parcial" fora do contexto de decisão não vira filtro
+        ("o pedido foi parcialmente analisado?", None),
+        ("qual o valor do pagamento parcial?", None),
+    ],
+)
+def test_decisao(question, decisao):
+    assert parse_query_filters(question).get('decisao') == decisao
+
+
+def test_decisao_nao_filtra_pergunta_sobre_acordao_especifico():
+    filters = parse_query_filters("o recurso do acórdão 11/2017 foi provido?")
+    assert filters == {'acordao_numero': '11/2017'}